@@ -50,21 +50,31 @@ def comment_on_issue(repository, issue, prompt_function, **kwargs):
         The function to generate the comment.
     """
     Log().log(f"-> comment_on_issue({repository}, {issue})")
+    from functools import partial
     from ._utilities import text_to_json, modify_discussion, clean_output, redact_text, Config
+    from ._concurrency import run_concurrently
 
+    # the discussion, the diff and the list of files are retrieved concurrently
+    calls = [partial(Config.git_utilities.get_conversation_on_issue, repository, issue),
+             partial(Config.git_utilities.list_repository_files, repository)]
     if Config.pull_request is not None:
-        file_changes = "\n## Changed files\n\n" + Config.git_utilities.get_diff_of_pull_request(repository, issue) + "\n\n"
-        print("file_changes:", file_changes)
+        calls.append(partial(Config.git_utilities.get_diff_of_pull_request, repository, issue))
+    conversation, files, *diff = run_concurrently(calls)
+
+    if Config.pull_request is not None:
+        diff = diff[0]
+        file_changes = "\n## Changed files\n\n" + str(diff) + "\n\n"
+        print("file_changes:", diff.summary())
         conversation_type = "pull-request"
     else:
         file_changes = ""
         conversation_type = "issue"
 
-    discussion = modify_discussion(Config.git_utilities.get_conversation_on_issue(repository, issue), 
+    discussion = modify_discussion(conversation, 
                                    prompt_visionlm=prompt_function, repository=repository, branch_name="main")
     print("Discussion:", discussion)
 
-    all_files = "* " + "\n* ".join(Config.git_utilities.list_repository_files(repository))
+    all_files = "* " + "\n* ".join(files)
 
     relevant_files = prompt_function(f"""
 {SYSTEM_PROMPT}
@@ -146,20 +156,26 @@ def review_pull_request(repository, issue, prompt_function, **kwargs):
         The function to generate the review comment.
     """
     Log().log(f"-> review_pull_request({repository}, {issue})")
+    from functools import partial
     from ._utilities import modify_discussion, clean_output, redact_text, Config
+    from ._concurrency import run_concurrently
 
     if Config.pull_request is None: # it's not a PR
         return comment_on_issue(repository, issue, prompt_function)
 
-    discussion = modify_discussion(Config.git_utilities.get_conversation_on_issue(repository, issue), 
+    # the discussion and the diff are retrieved concurrently
+    conversation, diff = run_concurrently([partial(Config.git_utilities.get_conversation_on_issue, repository, issue),
+                                           partial(Config.git_utilities.get_diff_of_pull_request, repository, issue)])
+
+    discussion = modify_discussion(conversation, 
                                    prompt_visionlm=prompt_function, 
                                    repository=repository, 
                                    branch_name="main")
     print("Discussion:", discussion)
 
-    file_changes = Config.git_utilities.get_diff_of_pull_request(repository, issue)
+    file_changes = str(diff)
 
-    print("file_changes:", file_changes)
+    print("file_changes:", diff.summary())
 
     comment = prompt_function(f"""
 {SYSTEM_PROMPT}
@@ -218,6 +234,7 @@ def fix_error_in_notebook(new_content, error_message, prompt_function):
     Log().log(f"-> fix_error_in_notebook(..., ...)")
     from ._utilities import erase_outputs_of_code_cells
     from ._utilities import split_content_and_summary
+    from ._prompt_cache import bypass_prompt_cache
 
     notebook_without_output = erase_outputs_of_code_cells(new_content)
 
@@ -236,7 +253,9 @@ def fix_error_in_notebook(new_content, error_message, prompt_function):
     Respond ONLY the content of the file and afterwards a single line summarizing the changes you made (without mentioning the issue).
     """
     print("Prompting for bug-fixed file content...")
-    response = prompt_function(prompt)
+    # the same notebook and error may come up again, then a different fix is needed
+    with bypass_prompt_cache():
+        response = prompt_function(prompt)
 
     new_content, commit_message = split_content_and_summary(response)
 
@@ -307,7 +326,9 @@ def create_or_modify_file(repository, issue, filename, branch_name, issue_summar
     import docx2markdown
     from ._utilities import read_text_file, write_text_file, write_binary_file, read_binary_file
     from datetime import datetime
-    from ._endpoints import text_to_speech_openai
+    from ._endpoints import text_to_speech_openai, stream_prompt
+    from ._prompt_cache import bypass_prompt_cache
+    from ._streaming import StreamingContent, checkpoint_path
 
     current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
@@ -441,19 +462,32 @@ Respond ONLY the content of the file and afterwards a single line summarizing th
 
         print("Prompting for new file content...")
         
-        response = prompt_function(prompt)
-
-        new_content, commit_message = split_content_and_summary(response)
-
-        if "<original_part>" in new_content and "<new_part>" in new_content:
-            print("handling <tags> in:\n", new_content)
-            for part in new_content.split("</new_part>")[:-1]:
-                original_part = part.split("<original_part>")[1].split("</original_part>")[0].strip("\n")
-                new_part = part.split("<new_part>")[1].strip("\n")
-                print("replace this:\n", original_part)
-                print("replace by:\n", new_part)
-                
-                new_content = file_content.replace(original_part, new_part)
+        # the response is streamed, replacements are parsed and partial output is checkpointed as it arrives
+        stream = StreamingContent(checkpoint_path(repository, issue, filename))
+        keep_checkpoint = False
+        try:
+            # when retrying, the cached response of the failed attempt must not be used again
+            with bypass_prompt_cache(attempt > 0):
+                response = stream.consume(stream_prompt(prompt_function, prompt))
+
+            new_content, commit_message = split_content_and_summary(response)
+
+            if "<original_part>" in new_content and "<new_part>" in new_content:
+                print("handling <tags> in:\n", new_content)
+                modified_content = file_content
+                for original_part, new_part in stream.replacements:
+                    print("replace this:\n", original_part)
+                    print("replace by:\n", new_part)
+
+                    modified_content = modified_content.replace(original_part, new_part)
+                new_content = modified_content
+        except BaseException as e:
+            # the partial output of responses interrupted by a timeout is kept, see git_bob._streaming
+            keep_checkpoint = not isinstance(e, Exception)
+            raise
+        finally:
+            if not keep_checkpoint:
+                stream.done()
 
         print("New file content", len(new_content), "\n------------\n", new_content[:200], "\n------------")
 
@@ -609,16 +643,22 @@ def solve_github_issue(repository, issue, prompt_function, base_branch=None):
     from github.GithubException import GithubException
     from gitlab.exceptions import GitlabCreateError
     import traceback
+    from functools import partial
+    from ._concurrency import run_concurrently
 
     repo = Config.git_utilities.get_repository_handle(repository)
 
-    discussion = modify_discussion(Config.git_utilities.get_conversation_on_issue(repository, issue), 
+    # the discussion and the list of files are retrieved concurrently
+    conversation, files = run_concurrently([partial(Config.git_utilities.get_conversation_on_issue, repository, issue),
+                                            partial(Config.git_utilities.list_repository_files, repository, branch_name=base_branch)])
+
+    discussion = modify_discussion(conversation, 
                                    prompt_visionlm=prompt_function,
                                    repository=repository,
                                    branch_name=base_branch)
     print("Discussion:", discussion)
 
-    all_files = "* " + "\n* ".join(Config.git_utilities.list_repository_files(repository, branch_name=base_branch))
+    all_files = "* " + "\n* ".join(files)
 
     modifications = prompt_function(f"""
 Given a list of files in the repository {repository} and a github issues description (# {issue}), determine which files need to be modified, renamed or deleted to solve the issue.
@@ -669,66 +709,83 @@ Respond with the actions as JSON list.
     instructions = sorted(instructions, key=lambda x: x.get('action') != 'download')
     print("sorted instructions", instructions)
 
+    # collect all modifications and commit them at once in the end
+    from ._changeset import start_changeset, stop_changeset
+    changeset = start_changeset(repository, branch_name)
+
     errors = []
     commit_messages = {}
-    for instruction in instructions:
-        action = instruction.get('action')
+    completed = False
+    try:
+        for instruction in instructions:
+            action = instruction.get('action')
 
-        # special case: svg files are not painted
-        if action == "paint" and instruction['filename'].endswith(".svg"):
-            action = "create"
+            # special case: svg files are not painted
+            if action == "paint" and instruction['filename'].endswith(".svg"):
+                action = "create"
 
-        for filename_key in ["filename", "new_filename", "old_filename", "target_filename"]:
-            if filename_key in instruction.keys():
-                filename = instruction[filename_key]
-                if is_ignored(filename, repository, branch_name):
-                    errors.append(f"Error processing {filename}: Access is restricted by .gitbobignore")
-                    continue
+            for filename_key in ["filename", "new_filename", "old_filename", "target_filename"]:
+                if filename_key in instruction.keys():
+                    filename = instruction[filename_key]
+                    if is_ignored(filename, repository, branch_name):
+                        errors.append(f"Error processing {filename}: Access is restricted by .gitbobignore")
+                        continue
 
-        try:
-            if action == 'create' or action == 'modify':
-                filename = instruction['filename'].strip("/")
-
-                created_files = create_or_modify_file(repository, issue, filename, branch_name, discussion,
-                                                                      prompt_function)
-                for filename, commit_message in created_files.items():
-                    commit_messages[filename] = commit_message
-            elif action == 'download':
-                source_url = instruction['source_url']
-                url_type = is_github_url(source_url)
-                if url_type in ["image", "data"]:
-                    source_url = source_url.replace("/blob/", "/raw/")
-                    target_filename = instruction['target_filename'].strip("/")
-                    Config.git_utilities.download_to_repository(repository, branch_name, source_url, target_filename)
-                    commit_messages[target_filename] = f"Downloaded {source_url}, saved as {target_filename}."
-                # else: otherwise we have it already in the text
-            elif action == 'rename':
-                old_filename = instruction['old_filename'].strip("/")
-                new_filename = instruction['new_filename'].strip("/")
-                Config.git_utilities.rename_file_in_repository(repository, branch_name, old_filename, new_filename)
-                commit_messages[new_filename] = f"Renamed {old_filename} to {new_filename}."
-            elif action == 'delete':
-                filename = instruction['filename'].strip("/")
-                Config.git_utilities.delete_file_from_repository(repository, branch_name, filename)
-                commit_messages[filename] = f"Deleted {filename}."
-            elif action == 'copy':
-                old_filename = instruction['old_filename'].strip("/")
-                new_filename = instruction['new_filename'].strip("/")
-                Config.git_utilities.copy_file_in_repository(repository, branch_name, old_filename, new_filename)
-                commit_messages[new_filename] = f"Copied {old_filename} to {new_filename}."
-            elif action == "paint":
-                filename = instruction['filename'].strip("/")
-                imagen_prompt = prompt_function("From the following discussion, extract a prompt to paint a picture as discussed:\n\n" + discussion + "\n\nNow extract a prompt for painting a picture as discussed:")
-                commit_messages[filename] = paint_picture(repository, branch_name, prompt=imagen_prompt, output_filename=filename)
-
-        except Exception as e:
-            traces = "    " + remove_ansi_escape_sequences(traceback.format_exc()).replace("\n", "\n    ")
-            summary = f"""<details>
+            try:
+                if action == 'create' or action == 'modify':
+                    filename = instruction['filename'].strip("/")
+
+                    created_files = create_or_modify_file(repository, issue, filename, branch_name, discussion,
+                                                                          prompt_function)
+                    for filename, commit_message in created_files.items():
+                        commit_messages[filename] = commit_message
+                elif action == 'download':
+                    source_url = instruction['source_url']
+                    url_type = is_github_url(source_url)
+                    if url_type in ["image", "data"]:
+                        source_url = source_url.replace("/blob/", "/raw/")
+                        target_filename = instruction['target_filename'].strip("/")
+                        Config.git_utilities.download_to_repository(repository, branch_name, source_url, target_filename)
+                        commit_messages[target_filename] = f"Downloaded {source_url}, saved as {target_filename}."
+                    # else: otherwise we have it already in the text
+                elif action == 'rename':
+                    old_filename = instruction['old_filename'].strip("/")
+                    new_filename = instruction['new_filename'].strip("/")
+                    Config.git_utilities.rename_file_in_repository(repository, branch_name, old_filename, new_filename)
+                    commit_messages[new_filename] = f"Renamed {old_filename} to {new_filename}."
+                elif action == 'delete':
+                    filename = instruction['filename'].strip("/")
+                    Config.git_utilities.delete_file_from_repository(repository, branch_name, filename)
+                    commit_messages[filename] = f"Deleted {filename}."
+                elif action == 'copy':
+                    old_filename = instruction['old_filename'].strip("/")
+                    new_filename = instruction['new_filename'].strip("/")
+                    Config.git_utilities.copy_file_in_repository(repository, branch_name, old_filename, new_filename)
+                    commit_messages[new_filename] = f"Copied {old_filename} to {new_filename}."
+                elif action == "paint":
+                    filename = instruction['filename'].strip("/")
+                    imagen_prompt = prompt_function("From the following discussion, extract a prompt to paint a picture as discussed:\n\n" + discussion + "\n\nNow extract a prompt for painting a picture as discussed:")
+                    commit_messages[filename] = paint_picture(repository, branch_name, prompt=imagen_prompt, output_filename=filename)
+
+            except Exception as e:
+                traces = "    " + remove_ansi_escape_sequences(traceback.format_exc()).replace("\n", "\n    ")
+                summary = f"""<details>
     <summary>Error during {instruction}: {e}</summary>
     <pre>{traces}</pre>
 </details>
             """
-            errors.append(summary)
+                errors.append(summary)
+        completed = True
+    finally:
+        stop_changeset(changeset)
+        if completed:
+            Config.git_utilities.commit_changeset(repository, changeset)
+        else:
+            # on timeout or unexpected errors, the modifications made so far are published nevertheless
+            try:
+                Config.git_utilities.commit_changeset(repository, changeset)
+            except Exception:
+                traceback.print_exc()
 
     error_messages = ""
     if len(errors) > 0:
@@ -738,7 +795,7 @@ Respond with the actions as JSON list.
     print(error_messages)
 
     # get a diff of all changes
-    diffs_prompt = Config.git_utilities.get_diff_of_branches(repository, branch_name, base_branch=base_branch)
+    diffs_prompt = str(Config.git_utilities.get_diff_of_branches(repository, branch_name, base_branch=base_branch))
 
     # summarize the changes
     commit_messages_prompt = "* " + "\n* ".join([f"{k}: {v}" for k,v in commit_messages.items()])
@@ -913,10 +970,10 @@ Do not explain your response or anything else. Just respond the relevant informa
 def paint_picture(repository, branch_name, prompt, output_filename="image.png", model="dall-e-3", image_width=1024, image_height=1024, style='natural', quality='standard'):
     """Generate an image using DALL-E3 based on a prompt and save it to the repository using PIL."""
     Log().log(f"-> paint_image({repository}, {branch_name}, ..., {output_filename}, {model}, ...)")
-    from openai import OpenAI
     import io
     from ._utilities import images_from_url_responses, Config
-    client = OpenAI()
+    from ._client_pool import get_openai_client
+    client = get_openai_client()
 
     size_str = f"{image_width}x{image_height}"
 
@@ -0,0 +1,181 @@
+# This module runs git-bob on many issues of a repository in one process, e.g. to triage all open issues.
+# The issues are handled concurrently (GIT_BOB_MAX_CONCURRENT_EVENTS, default 4) and share the HTTP sessions,
+# caches and the rate limit budget of this process (see git_bob._client_pool, git_bob._rate_limit), instead of
+# starting one CI job per issue. In the end, a throughput report is printed.
+#
+# Usage:
+#     git-bob-batch <task> <organization>/<repository> [filter]
+#
+# The task is one of comment-on-issue, solve-issue, try-issue or split-issue. The filter is either a list of
+# issue numbers and ranges (e.g. "12,15-20") or a regular expression, which is searched in the issue titles
+# (case-insensitive). Without filter, all open issues are handled.
+#
+# Each issue is handled in its own task context (see git_bob._utilities.task_context), hence remarks and log
+# messages of one issue don't end up in the comments of another one.
+#
+# Note: tasks executing notebooks temporarily change the working directory of the process; for these,
+# consider running one issue at a time (GIT_BOB_MAX_CONCURRENT_EVENTS=1).
+#
+import os
+import re
+import time
+
+# tasks of the command line interface and the corresponding triggers
+TASK_TRIGGERS = {"comment-on-issue": "comment", "solve-issue": "solve", "try-issue": "try", "split-issue": "split"}
+
+
+def filter_issues(issues, issue_filter=None):
+    """
+    Select issues by number or title.
+
+    Parameters
+    ----------
+    issues : dict
+        Issue numbers and titles, as returned by list_issues.
+    issue_filter : str, optional
+        Numbers and ranges, e.g. "12,15-20", or a regular expression searched in the titles.
+
+    Returns
+    -------
+    list of int
+        The selected issue numbers, in ascending order.
+    """
+    if issue_filter is None or len(issue_filter.strip()) == 0:
+        return sorted(issues.keys())
+
+    if re.fullmatch(r"\s*\d+(\s*-\s*\d+)?(\s*,\s*\d+(\s*-\s*\d+)?)*\s*", issue_filter):
+        selected = set()
+        for part in issue_filter.split(","):
+            bounds = [int(b) for b in part.split("-")]
+            selected.update(range(bounds[0], bounds[-1] + 1))
+        return sorted([number for number in issues.keys() if number in selected])
+
+    pattern = re.compile(issue_filter, re.IGNORECASE)
+    return sorted([number for number, title in issues.items() if pattern.search(title)])
+
+
+def run_batch(repository, task, issues, prompt_function, max_concurrency=None):
+    """
+    Run the trigger corresponding to a task on the given issues concurrently.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository.
+    task : str
+        see TASK_TRIGGERS
+    issues : list of int
+    prompt_function : function
+    max_concurrency : int, optional
+        Number of issues handled at the same time, default: GIT_BOB_MAX_CONCURRENT_EVENTS or 4
+
+    Returns
+    -------
+    dict
+        The throughput report, see format_report.
+    """
+    from functools import partial
+    from ._utilities import Config, task_context
+    from ._logger import Log
+    from ._rate_limit import RateLimitScheduler
+    from ._endpoints import TokenUsage
+    from ._concurrency import run_concurrently
+    from ._terminal import init_triggers
+    from ._prompt_cache import bypass_prompt_cache, bypassed_triggers
+
+    if max_concurrency is None:
+        max_concurrency = int(os.environ.get("GIT_BOB_MAX_CONCURRENT_EVENTS", "4"))
+    handler = init_triggers()[TASK_TRIGGERS[task]]
+
+    # like when running from the terminal, issues are not handled as pull-requests
+    Config.repository = repository
+    Config.pull_request = None
+    Config.is_pull_request = False
+    base_branch = Config.git_utilities.get_default_branch_name(repository)
+    # the file list is retrieved once here, the handlers are then served from the caches
+    Config.git_utilities.list_repository_files(repository)
+
+    def handle(issue):
+        start = time.time()
+        with task_context(issue=issue), bypass_prompt_cache(TASK_TRIGGERS[task] in bypassed_triggers()):
+            Log().log(f"-> batch {task} #{issue}")
+            handler(repository=repository, issue=issue, prompt_function=prompt_function, base_branch=base_branch)
+        return time.time() - start
+
+    requests_before = RateLimitScheduler().request_count()
+    tokens_before = TokenUsage().total_tokens
+    prompts_before = TokenUsage().requests
+    start = time.time()
+    durations = run_concurrently([partial(handle, issue) for issue in issues],
+                                 max_concurrency=max_concurrency, return_exceptions=True)
+    seconds = time.time() - start
+
+    failed = {issue: str(result) for issue, result in zip(issues, durations) if isinstance(result, Exception)}
+    return {
+        "repository": repository,
+        "task": task,
+        "issues": len(issues),
+        "failed": failed,
+        "seconds": seconds,
+        "issues_per_minute": 60 * (len(issues) - len(failed)) / seconds if seconds > 0 else 0,
+        "api_calls": RateLimitScheduler().request_count() - requests_before,
+        "llm_requests": TokenUsage().requests - prompts_before,
+        "tokens": TokenUsage().total_tokens - tokens_before,
+        "max_concurrency": max_concurrency,
+    }
+
+
+def format_report(report):
+    """Return the throughput report of run_batch as readable text."""
+    handled = report["issues"] - len(report["failed"])
+    lines = [f"Batch {report['task']} on {report['repository']}: {handled} of {report['issues']} issues handled "
+             f"in {report['seconds']:.1f} s ({report['issues_per_minute']:.2f} issues per minute, "
+             f"{report['max_concurrency']} at a time)",
+             f"API calls: {report['api_calls']}" + (f" ({report['api_calls'] / report['issues']:.1f} per issue)"
+                                                    if report["issues"] > 0 else ""),
+             f"LLM requests: {report['llm_requests']}, tokens: {report['tokens']}"]
+    for issue, error in report["failed"].items():
+        lines.append(f"Failed #{issue}: {error}")
+    return "\n".join(lines)
+
+
+def batch_interface():
+    """
+    Entry point of git-bob-batch, see module description.
+    """
+    import sys
+    from ._utilities import Config
+    from ._terminal import select_prompt_function
+    from ._rate_limit import RateLimitScheduler
+    from ._prompt_cache import get_prompt_cache
+
+    if len(sys.argv) < 3 or sys.argv[1] not in TASK_TRIGGERS:
+        print("Usage: git-bob-batch <task> <organization>/<repository> [filter]")
+        print("Tasks: " + ", ".join(TASK_TRIGGERS.keys()))
+        sys.exit(1)
+    task, repository = sys.argv[1], sys.argv[2]
+    issue_filter = sys.argv[3] if len(sys.argv) > 3 else None
+
+    Config.llm_name = os.environ.get("GIT_BOB_LLM_NAME", "gpt-4o-2024-08-06")
+    Config.git_server_url = os.environ.get("GIT_SERVER_URL", "https://github.com/")
+    if "https://github.com" in Config.git_server_url:
+        import git_bob._github_utilities as gu
+    else:
+        import git_bob._gitlab_utilities as gu
+    Config.git_utilities = gu
+    Config.running_in_github_ci = False
+    Config.running_in_gitlab_ci = False
+
+    agent_name = os.environ.get("GIT_BOB_AGENT_NAME", "git-bob")
+    _, prompt_function = select_prompt_function("", agent_name)
+
+    issues = filter_issues(Config.git_utilities.list_issues(repository), issue_filter)
+    print(f"Handling {len(issues)} issues:", ", ".join([f"#{i}" for i in issues]))
+
+    report = run_batch(repository, task, issues, prompt_function)
+    print(format_report(report))
+    print(RateLimitScheduler().summary())
+    if get_prompt_cache() is not None:
+        print(get_prompt_cache().summary())
+    if len(report["failed"]) > 0:
+        sys.exit(1)
@@ -0,0 +1,255 @@
+# This module records the traffic of a run into a cassette file and replays it later without network access,
+# e.g. to reproduce a slow run on a large repository on a laptop, or to compare timings between versions.
+# Recorded are all HTTP exchanges with the git hosts (through the sessions of git_bob._client_pool) and all
+# responses of the language model (prompt handlers of git_bob._endpoints). Secrets listed in
+# git_bob._utilities.SENSIBLE_ENV_KEYS are redacted, authentication headers are not stored.
+#
+# The cassette is configured using the environment variables
+# * GIT_BOB_CASSETTE: path of the cassette file, compressed if it ends with ".gz"
+# * GIT_BOB_CASSETTE_MODE: "record" or "replay"
+# * GIT_BOB_CASSETTE_TIME_SCALE: factor for the recorded durations during replay (default 1, 0 replays instantly)
+#
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# headers which are not stored, because they contain credentials or describe the transfer only
+_SKIPPED_HEADERS = ["authorization", "private-token", "cookie", "set-cookie", "content-encoding", "content-length",
+                    "transfer-encoding", "connection", "keep-alive"]
+
+_cassette = None
+
+
+class Cassette:
+    """
+    Recorded HTTP exchanges and prompt responses, see module description.
+
+    Parameters
+    ----------
+    path : str
+        The cassette file.
+    mode : str
+        "record" or "replay"
+    time_scale : float, optional
+        During replay, recorded durations are multiplied by this factor.
+    """
+
+    def __init__(self, path, mode, time_scale=1.0):
+        if mode not in ["record", "replay"]:
+            raise ValueError(f"Unknown cassette mode '{mode}', use 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self.sleep = time.sleep
+        self.entries = []
+        self._start = time.time()
+        self._lock = threading.Lock()
+        # recorded entries by key, served in the order they were recorded
+        self._queues = {}
+        if mode == "replay":
+            self.entries = self._read()
+            for entry in self.entries:
+                self._queues.setdefault(entry["key"], deque()).append(entry)
+
+    def _read(self):
+        import gzip
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            return json.load(f)["entries"]
+
+    def save(self):
+        """Write the recorded entries to the cassette file."""
+        import gzip
+        if self.mode != "record":
+            return
+        folder = os.path.dirname(self.path)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with self._lock:
+            entries = sorted(self.entries, key=lambda e: e["start"])
+        with opener(self.path, "wt", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f, separators=(",", ":"))
+
+    def record(self, entry, start, duration):
+        """Add an entry (dict with at least "type" and "key") with the time it was started and its duration (s)."""
+        entry["start"] = round(start - self._start, 4)
+        entry["duration"] = round(duration, 4)
+        with self._lock:
+            self.entries.append(entry)
+
+    def replay(self, key, fallback_type=None):
+        """
+        Return the next entry recorded for a key, after waiting for its (scaled) duration.
+
+        Parameters
+        ----------
+        key : str
+        fallback_type : str, optional
+            If nothing was recorded for the key, the next entry of this type is returned, in the recorded order.
+            E.g. prompts may contain time stamps, hence they differ between recording and replay.
+
+        Raises
+        ------
+        LookupError
+            If nothing (more) was recorded for the key.
+        """
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                entry = queue.popleft()
+            else:
+                remaining = [e for q in self._queues.values() for e in q if e["type"] == fallback_type]
+                if len(remaining) == 0:
+                    raise LookupError(f"No recorded response in cassette {self.path} for {key}")
+                entry = min(remaining, key=lambda e: e["start"])
+                self._queues[entry["key"]].remove(entry)
+        if self.time_scale > 0 and entry["duration"] > 0:
+            self.sleep(entry["duration"] * self.time_scale)
+        return entry
+
+
+def start_cassette(path=None, mode=None, time_scale=None):
+    """
+    Start recording or replaying, by default configured from environment variables (see module description).
+
+    Returns
+    -------
+    Cassette or None
+        None if no cassette is configured.
+    """
+    import atexit
+    global _cassette
+    if path is None:
+        path = os.environ.get("GIT_BOB_CASSETTE", "")
+    if len(path) == 0:
+        return None
+    if mode is None:
+        mode = os.environ.get("GIT_BOB_CASSETTE_MODE", "replay")
+    if time_scale is None:
+        time_scale = float(os.environ.get("GIT_BOB_CASSETTE_TIME_SCALE", "1"))
+    _cassette = Cassette(path, mode, time_scale)
+    if mode == "record":
+        # also save the recording if the run ends early, e.g. with sys.exit()
+        atexit.register(_cassette.save)
+    print(f"Cassette {path}: {mode}")
+    return _cassette
+
+
+def get_cassette():
+    """Return the active cassette or None."""
+    return _cassette
+
+
+def stop_cassette():
+    """Stop recording / replaying and save the recording."""
+    global _cassette
+    if _cassette is not None:
+        _cassette.save()
+    _cassette = None
+
+
+def _request_key(method, url, body):
+    from ._utilities import redact_text
+    key = f"{method} {redact_text(url)}"
+    if hasattr(body, "read"):
+        # streamed uploads (e.g. to Git LFS) are identified by the url only
+        body = None
+    if body:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        key += " " + hashlib.sha1(redact_text(body.decode("utf-8", errors="replace")).encode("utf-8")).hexdigest()[:12]
+    return key
+
+
+def _encode_body(content):
+    from ._utilities import redact_text
+    try:
+        return {"text": redact_text(content.decode("utf-8"))}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("utf-8")}
+
+
+def _decode_body(entry):
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    return entry["text"].encode("utf-8")
+
+
+class CassetteMixin:
+    """
+    Mixin for requests transport adapters, which records exchanges into the active cassette or replays them.
+
+    It must be the outermost mixin, hence replayed requests are neither rate limited nor cached.
+    """
+
+    def send(self, request, stream=False, **kwargs):
+        from requests.structures import CaseInsensitiveDict
+        from ._utilities import redact_text
+        cassette = get_cassette()
+        if cassette is None:
+            return super(CassetteMixin, self).send(request, stream=stream, **kwargs)
+
+        key = _request_key(request.method, request.url, request.body)
+        if cassette.mode == "replay":
+            import requests
+            entry = cassette.replay(key)
+            response = requests.Response()
+            response.status_code = entry["status"]
+            response.reason = entry.get("reason")
+            response.headers = CaseInsensitiveDict(entry["headers"])
+            response.encoding = entry.get("encoding")
+            response.url = request.url
+            response.request = request
+            response._content = _decode_body(entry["body"])
+            response._content_consumed = True
+            response.connection = self
+            return response
+
+        start = time.time()
+        response = super(CassetteMixin, self).send(request, stream=stream, **kwargs)
+        # reading the content here is fine for streamed responses, iter_content() then serves it from memory
+        content = response.content
+        cassette.record({
+            "type": "http",
+            "key": key,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: redact_text(v) for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS},
+            "encoding": response.encoding,
+            "body": _encode_body(content),
+        }, start, time.time() - start)
+        return response
+
+
+def cassette_prompt_function(prompt_function):
+    """
+    Wrap a prompt function, so that its responses are recorded into / replayed from the active cassette.
+
+    Returns the prompt function unchanged if no cassette is active.
+    """
+    import functools
+    from ._utilities import redact_text
+
+    if get_cassette() is None:
+        return prompt_function
+
+    @functools.wraps(prompt_function)
+    def wrapper(message, *args, **kwargs):
+        cassette = get_cassette()
+        key = "prompt " + hashlib.sha1(redact_text(str(message)).encode("utf-8")).hexdigest()[:12]
+        if cassette is None:
+            return prompt_function(message, *args, **kwargs)
+        if cassette.mode == "replay":
+            return cassette.replay(key, fallback_type="prompt")["response"]
+
+        start = time.time()
+        response = prompt_function(message, *args, **kwargs)
+        cassette.record({"type": "prompt", "key": key, "response": redact_text(response) if isinstance(response, str) else response},
+                        start, time.time() - start)
+        return response
+    return wrapper
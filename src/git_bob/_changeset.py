@@ -0,0 +1,142 @@
+# This module collects modifications of files in a branch (writes, renames, copies and deletions)
+# while git-bob is working on an issue. The GitHub and GitLab utilities publish them afterwards as
+# a single commit instead of one commit per modified file.
+#
+from ._file_cache import CachedFile, git_blob_sha
+
+# changesets which are currently collecting modifications, keyed by (repository, branch)
+_active_changesets = {}
+
+
+class BlobReference:
+    """Marks a file whose content is identical to another file in the branch, e.g. after a rename or copy."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return f"BlobReference({self.path})"
+
+
+class Changeset:
+    """
+    Pending modifications of files in a branch.
+
+    Modifications are stored per file path in `files`:
+    * bytes: the new content of the file
+    * BlobReference: the file has the same content as another file in the branch (before the changeset is applied)
+    * None: the file is deleted
+    """
+
+    def __init__(self, repository, branch_name):
+        self.repository = repository
+        self.branch_name = branch_name
+        self.files = {}
+        self.messages = []
+
+    def _source(self, path):
+        """Determine the pending content of a file which is renamed or copied."""
+        if path in self.files:
+            if self.files[path] is None:
+                raise FileNotFoundError(f"{path} was deleted in branch {self.branch_name}")
+            return self.files[path]
+        return BlobReference(path)
+
+    def _add_message(self, commit_message):
+        if commit_message not in self.messages:
+            self.messages.append(commit_message)
+
+    def write(self, file_path, new_content, commit_message):
+        if isinstance(new_content, str):
+            new_content = new_content.encode("utf-8")
+        self.files[file_path] = new_content
+        self._add_message(commit_message)
+
+    def delete(self, file_path, commit_message):
+        self.files[file_path] = None
+        self._add_message(commit_message)
+
+    def rename(self, old_file_path, new_file_path, commit_message):
+        self.files[new_file_path] = self._source(old_file_path)
+        self.files[old_file_path] = None
+        self._add_message(commit_message)
+
+    def copy(self, src_file_path, dest_file_path, commit_message):
+        self.files[dest_file_path] = self._source(src_file_path)
+        self._add_message(commit_message)
+
+    def is_empty(self):
+        return len(self.files) == 0
+
+    def is_modified(self, file_path):
+        return file_path in self.files
+
+    def get_file(self, file_path, read_from_branch):
+        """
+        Return the pending version of a modified file.
+
+        Parameters
+        ----------
+        file_path : str
+            The path of the file, see is_modified().
+        read_from_branch : function
+            Reads a file from the branch as it was before the changeset, given its path.
+        """
+        content = self.files[file_path]
+        if content is None:
+            raise FileNotFoundError(f"{file_path} was deleted in branch {self.branch_name}")
+        if isinstance(content, BlobReference):
+            return read_from_branch(content.path)
+        return CachedFile(file_path, git_blob_sha(content), content)
+
+    def apply_to_file_list(self, file_paths):
+        """Modify a list of files in the branch as if the changeset was committed."""
+        result = [f for f in file_paths if f not in self.files]
+        result += [f for f, content in self.files.items() if content is not None]
+        return result
+
+    def commit_message(self):
+        """Combine the messages of all modifications into a single commit message."""
+        if len(self.messages) == 1:
+            return self.messages[0]
+        return f"Modify {len(self.files)} files\n\n" + "\n".join([f"* {m}" for m in self.messages])
+
+
+def start_changeset(repository, branch_name):
+    """
+    Start collecting modifications of files in a branch.
+
+    While the changeset is active, the write, rename, copy and delete functions of the GitHub and GitLab
+    utilities record modifications in the changeset instead of committing them. Reads reflect the pending
+    modifications. Use commit_changeset() of the respective utilities to publish them.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+    branch_name : str
+        The name of the branch the modifications are made in.
+
+    Returns
+    -------
+    Changeset
+    """
+    changeset = Changeset(repository, branch_name)
+    _active_changesets[(repository, branch_name)] = changeset
+    return changeset
+
+
+def get_changeset(repository, branch_name):
+    """Return the active changeset of a branch or None."""
+    return _active_changesets.get((repository, branch_name))
+
+
+def forget_changesets():
+    """Stop all active changesets without committing them, e.g. before a long-running process handles the next event."""
+    _active_changesets.clear()
+
+
+def stop_changeset(changeset):
+    """Stop collecting modifications. Afterwards, writes are committed directly again."""
+    if _active_changesets.get((changeset.repository, changeset.branch_name)) is changeset:
+        del _active_changesets[(changeset.repository, changeset.branch_name)]
@@ -0,0 +1,327 @@
+# This module holds the authenticated API clients of the git hosts (GitHub, GitLab) used during a run.
+# There is one HTTP session (with keep-alive connection pool and rate limit scheduling) per host, one client
+# per host and access token, and the handles of recently used repositories are kept in a bounded
+# least-recently-used cache. Thus, when git-bob follows links to other repositories, the handle of the
+# repository it works on is not evicted.
+# The clients of the language model providers are kept for the whole process as well, one per provider,
+# base url and API key. The OpenAI-compatible clients share one HTTP connection pool (HTTP/2 if the h2
+# package is installed), and so do the Anthropic clients.
+#
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# HTTP sessions, keyed by host name
+_sessions = {}
+
+# repository handles, keyed by (host, repository), ordered from least to most recently used
+_repository_handles = OrderedDict()
+
+_lock = threading.RLock()
+
+# clients of language model providers, keyed by (provider, base url, hash of the API key)
+_llm_clients = {}
+
+# HTTP clients shared by the clients of the language model SDKs, keyed by SDK
+_llm_http_clients = {}
+
+# the API key the Google generative AI SDK is configured with
+_googleai_api_key = None
+
+
+def _max_repository_handles():
+    return int(os.environ.get("GIT_BOB_MAX_REPOSITORY_HANDLES", "32"))
+
+
+def get_session(host, max_retries=None):
+    """
+    Return the HTTP session used for all requests to a given host.
+
+    All requests are scheduled according to the rate limits of the host, see git_bob._rate_limit.
+    If a cassette is active, requests are recorded or replayed, see git_bob._cassette.
+    If caching is enabled (see git_bob._utilities.get_cache_directory), GET requests are answered
+    using conditional requests, see git_bob._http_cache.
+
+    Parameters
+    ----------
+    host : str
+        Host name, e.g. "api.github.com"
+    max_retries : int or urllib3.util.Retry, optional
+        Retry strategy, only used when the session is created.
+
+    Returns
+    -------
+    requests.Session
+    """
+    import requests
+    from ._utilities import get_cache_directory
+    from ._http_cache import CachingHTTPAdapter
+    from ._rate_limit import RateLimitMixin
+    from ._cassette import CassetteMixin
+
+    # the cassette (if any) records / replays what the application sends, before rate limiting and caching
+    class RateLimitedHTTPAdapter(CassetteMixin, RateLimitMixin, requests.adapters.HTTPAdapter):
+        pass
+
+    class RateLimitedCachingHTTPAdapter(CassetteMixin, RateLimitMixin, CachingHTTPAdapter):
+        pass
+
+    with _lock:
+        if host not in _sessions:
+            if max_retries is None:
+                max_retries = requests.adapters.DEFAULT_RETRIES
+            cache_directory = get_cache_directory("http")
+            if cache_directory is None:
+                adapter = RateLimitedHTTPAdapter(max_retries=max_retries)
+            else:
+                adapter = RateLimitedCachingHTTPAdapter(cache_directory, max_retries=max_retries)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return _sessions[host]
+
+
+def _pooled_connection_classes():
+    """Connection classes for PyGithub which send requests through the sessions of this pool."""
+    from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+    class PooledConnectionMixin:
+        # PyGithub creates a connection per request when connection classes are injected,
+        # hence all connections to a host share the same session (and connection pool)
+        def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+            self.port = port if port else self.default_port
+            self.host = host
+            self.timeout = timeout
+            self.verify = kwargs.get("verify", True)
+            self.session = get_session(host, retry)
+            # disables falling back to the .netrc file, see HTTPSRequestsConnectionClass
+            self.session.auth = Requester.noopAuth
+
+        def close(self):
+            pass
+
+    class PooledHTTPConnectionClass(PooledConnectionMixin, HTTPRequestsConnectionClass):
+        protocol = "http"
+        default_port = 80
+
+    class PooledHTTPSConnectionClass(PooledConnectionMixin, HTTPSRequestsConnectionClass):
+        protocol = "https"
+        default_port = 443
+
+    return PooledHTTPConnectionClass, PooledHTTPSConnectionClass
+
+
+@lru_cache(maxsize=None)
+def get_github_client(base_url, access_token):
+    """
+    Return the PyGithub client for a GitHub (Enterprise) API url and access token.
+
+    Parameters
+    ----------
+    base_url : str
+        e.g. "https://api.github.com"
+    access_token : str
+
+    Returns
+    -------
+    github.Github
+    """
+    from github import Github
+    from github.Auth import Token
+    from github.Requester import Requester
+    from urllib3.util import Retry
+
+    Requester.injectConnectionClasses(*_pooled_connection_classes())
+    # lists (e.g. contributors, issues) are retrieved with as few requests as possible;
+    # rate limits are handled by git_bob._rate_limit, hence PyGithub's own throttling (which serializes all requests)
+    # and rate limit retries are disabled, only server errors are retried
+    return Github(base_url=base_url, auth=Token(access_token), per_page=100,
+                  seconds_between_requests=None, seconds_between_writes=None,
+                  retry=Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504], respect_retry_after_header=False))
+
+
+@lru_cache(maxsize=None)
+def get_gitlab_client(url, access_token):
+    """
+    Return the python-gitlab client for a GitLab server url and access token.
+
+    Parameters
+    ----------
+    url : str
+        e.g. "https://gitlab.com"
+    access_token : str
+
+    Returns
+    -------
+    gitlab.Gitlab
+    """
+    import gitlab
+    from urllib.parse import urlparse
+
+    # the maximum page size allowed by GitLab is 100
+    per_page = min(100, int(os.environ.get("GIT_BOB_GITLAB_PER_PAGE", "100")))
+    return gitlab.Gitlab(url=url, private_token=access_token, session=get_session(urlparse(url).hostname), per_page=per_page)
+
+
+def _get_repository_handle(host, repository, open_repository):
+    """Return a cached repository handle or open it using the given function and cache it."""
+    key = (host, repository)
+    with _lock:
+        if key in _repository_handles:
+            _repository_handles.move_to_end(key)
+            return _repository_handles[key]
+
+    handle = open_repository()
+
+    with _lock:
+        _repository_handles[key] = handle
+        _repository_handles.move_to_end(key)
+        while len(_repository_handles) > max(1, _max_repository_handles()):
+            _repository_handles.popitem(last=False)
+    return handle
+
+
+def get_github_repository(repository):
+    """
+    Return the handle of a GitHub repository.
+
+    The API url can be configured using the environment variable GITHUB_API_URL (set in GitHub Actions),
+    the access token is read from GITHUB_API_KEY.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the GitHub repository (e.g., "username/repo-name").
+
+    Returns
+    -------
+    github.Repository.Repository
+    """
+    base_url = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+    client = get_github_client(base_url, os.getenv('GITHUB_API_KEY'))
+    return _get_repository_handle(base_url, repository, lambda: client.get_repo(repository))
+
+
+def get_gitlab_project(url, repository):
+    """
+    Return the handle of a GitLab project.
+
+    The access token is read from GITLAB_API_KEY.
+
+    Parameters
+    ----------
+    url : str
+        The GitLab server url, e.g. "https://gitlab.com"
+    repository : str
+        The full name of the GitLab project (e.g., "username/repo-name").
+
+    Returns
+    -------
+    gitlab.v4.objects.Project
+    """
+    client = get_gitlab_client(url, os.getenv('GITLAB_API_KEY'))
+    return _get_repository_handle(url, repository, lambda: client.projects.get(repository))
+
+
+def forget_repository_handles():
+    """Remove all repository handles from the cache, e.g. after settings of a repository changed."""
+    with _lock:
+        _repository_handles.clear()
+
+
+def _http2_supported():
+    import importlib.util
+    return importlib.util.find_spec("h2") is not None
+
+
+def _shared_http_client(sdk):
+    """Return the HTTP client (connection pool with keep-alive) shared by all clients of an SDK (openai, anthropic)."""
+    import importlib
+    with _lock:
+        if sdk not in _llm_http_clients:
+            _llm_http_clients[sdk] = importlib.import_module(sdk).DefaultHttpxClient(http2=_http2_supported())
+        return _llm_http_clients[sdk]
+
+
+def _get_llm_client(provider, base_url, api_key, create_client):
+    """Return the cached client for a provider, base url and API key, or create it using the given function."""
+    import hashlib
+    key = (provider, base_url, None if api_key is None else hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+    with _lock:
+        if key not in _llm_clients:
+            _llm_clients[key] = create_client()
+        return _llm_clients[key]
+
+
+def get_openai_client(base_url=None, api_key=None):
+    """
+    Return an OpenAI client for the OpenAI API or an OpenAI-compatible server.
+
+    Parameters
+    ----------
+    base_url : str, optional
+        Default: the OpenAI API
+    api_key : str, optional
+        Default: the environment variable OPENAI_API_KEY
+
+    Returns
+    -------
+    openai.OpenAI
+    """
+    import openai
+    if api_key is None:
+        api_key = os.environ.get("OPENAI_API_KEY")
+    return _get_llm_client("openai", base_url, api_key, lambda: openai.OpenAI(
+        base_url=base_url, api_key=api_key, http_client=_shared_http_client("openai")))
+
+
+def get_anthropic_client(api_key=None):
+    """
+    Return an Anthropic client, by default using the API key in the environment variable ANTHROPIC_API_KEY.
+    """
+    import anthropic
+    if api_key is None:
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+    return _get_llm_client("anthropic", None, api_key, lambda: anthropic.Anthropic(
+        api_key=api_key, http_client=_shared_http_client("anthropic")))
+
+
+def get_mistral_client(api_key):
+    """Return a Mistral client for the given API key."""
+    from mistralai import Mistral
+    return _get_llm_client("mistral", None, api_key, lambda: Mistral(api_key=api_key))
+
+
+def get_azure_inference_client(endpoint, api_key):
+    """Return an Azure AI inference client (e.g. for GitHub models) for the given endpoint and API key."""
+    from azure.ai.inference import ChatCompletionsClient
+    from azure.core.credentials import AzureKeyCredential
+    return _get_llm_client("azure", endpoint, api_key, lambda: ChatCompletionsClient(
+        endpoint=endpoint, credential=AzureKeyCredential(api_key)))
+
+
+def configure_googleai(api_key):
+    """Configure the Google generative AI SDK, unless it is configured with this API key already."""
+    global _googleai_api_key
+    from google import generativeai as genai
+    with _lock:
+        if api_key != _googleai_api_key:
+            genai.configure(api_key=api_key)
+            _googleai_api_key = api_key
+
+
+def forget_llm_clients():
+    """Close and remove all language model clients, e.g. when API keys changed."""
+    global _googleai_api_key
+    with _lock:
+        _googleai_api_key = None
+        for client in list(_llm_clients.values()) + list(_llm_http_clients.values()):
+            if hasattr(client, "close"):
+                try:
+                    client.close()
+                except Exception:
+                    pass
+        _llm_clients.clear()
+        _llm_http_clients.clear()
@@ -0,0 +1,123 @@
+# This module runs independent requests to the git hosts concurrently, using asyncio.
+# The functions of git_bob._github_utilities and git_bob._gitlab_utilities are synchronous; their coroutine
+# versions run them in worker threads, sharing the HTTP sessions (and rate limit scheduling) of
+# git_bob._client_pool. The number of requests in flight is bounded by GIT_BOB_MAX_CONCURRENT_REQUESTS (default 8).
+# Hence, reading e.g. a discussion, a diff and a list of files takes as long as the slowest of these requests
+# instead of the sum of all of them.
+#
+import asyncio
+import functools
+import os
+
+# functions of the git utilities which only read from the host, and can hence be called in any order
+READ_FUNCTIONS = ["get_conversation_on_issue", "get_diff_of_pull_request", "get_diff_of_branches",
+                  "list_repository_files", "get_repository_file_contents", "get_file_in_repository",
+                  "check_if_file_exists", "get_default_branch_name", "list_issues", "get_issue_details"]
+
+
+def max_concurrent_requests():
+    return max(1, int(os.environ.get("GIT_BOB_MAX_CONCURRENT_REQUESTS", "8")))
+
+
+def as_coroutine_function(function):
+    """Return a coroutine function which runs the given (blocking) function in a worker thread."""
+    @functools.wraps(function)
+    async def coroutine_function(*args, **kwargs):
+        return await asyncio.to_thread(function, *args, **kwargs)
+    return coroutine_function
+
+
+class AsyncGitUtilities:
+    """
+    Coroutine versions of the read functions of a git utilities module, e.g. Config.git_utilities.
+
+    Examples
+    --------
+    >>> host = AsyncGitUtilities(Config.git_utilities)
+    >>> discussion, diff = await asyncio.gather(host.get_conversation_on_issue(repository, issue),
+    ...                                         host.get_diff_of_pull_request(repository, issue))
+    """
+
+    def __init__(self, git_utilities):
+        self.git_utilities = git_utilities
+
+    def __getattr__(self, name):
+        if name not in READ_FUNCTIONS:
+            raise AttributeError(f"{name} is not a read function, see git_bob._concurrency.READ_FUNCTIONS")
+        return as_coroutine_function(getattr(self.git_utilities, name))
+
+
+async def gather_bounded(calls, max_concurrency=None, return_exceptions=False):
+    """
+    Run functions without arguments (e.g. functools.partial objects) concurrently in worker threads.
+
+    Parameters
+    ----------
+    calls : list of callable
+    max_concurrency : int, optional
+        Maximum number of functions running at the same time, default: GIT_BOB_MAX_CONCURRENT_REQUESTS
+    return_exceptions : bool, optional
+        If True, exceptions are returned in place of the results of failed calls instead of being raised.
+
+    Returns
+    -------
+    list
+        The results, in the order of the calls.
+    """
+    if max_concurrency is None:
+        max_concurrency = max_concurrent_requests()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def bounded(call):
+        async with semaphore:
+            return await asyncio.to_thread(call)
+
+    return await asyncio.gather(*[bounded(call) for call in calls], return_exceptions=return_exceptions)
+
+
+def run_concurrently(calls, max_concurrency=None, return_exceptions=False):
+    """
+    Synchronous facade of gather_bounded: run functions without arguments concurrently and return their results.
+
+    Can also be called while an event loop is running in the current thread, e.g. from a coroutine.
+
+    Parameters
+    ----------
+    calls : list of callable
+        e.g. [partial(get_file_in_repository, repository, branch, filename) for filename in filenames]
+    max_concurrency : int, optional
+        Maximum number of functions running at the same time, default: GIT_BOB_MAX_CONCURRENT_REQUESTS
+    return_exceptions : bool, optional
+        If True, exceptions are returned in place of the results of failed calls instead of being raised.
+
+    Returns
+    -------
+    list
+        The results, in the order of the calls.
+    """
+    calls = list(calls)
+    if len(calls) == 0:
+        return []
+    if len(calls) == 1 or (max_concurrency is not None and max_concurrency <= 1):
+        results = []
+        for call in calls:
+            try:
+                results.append(call())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    coroutine = gather_bounded(calls, max_concurrency, return_exceptions)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    # asyncio.run() can't be nested in a running event loop, hence a separate thread runs it,
+    # in the context of the caller (see git_bob._utilities.task_context)
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
@@ -0,0 +1,221 @@
+# This module collects diffs of pull-requests and branches file by file while applying size budgets.
+# Large diffs (e.g. lockfiles, generated notebooks) would otherwise exceed the context of the language model.
+# The budgets can be configured using the environment variables
+# * GIT_BOB_DIFF_MAX_FILE_LINES: maximum number of diff lines shown per file (default 400)
+# * GIT_BOB_DIFF_MAX_FILE_BYTES: maximum size of the diff shown per file (default 20000)
+# * GIT_BOB_DIFF_MAX_TOTAL_BYTES: maximum size of the entire diff (default 200000)
+# Lockfiles and binary files are summarized in a single line.
+#
+import os
+
+LOCKFILE_NAMES = ["package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock", "uv.lock",
+                  "pixi.lock", "conda-lock.yml", "Cargo.lock", "Gemfile.lock", "composer.lock", "go.sum"]
+
+
+class FileDiff:
+    """The diff of a single file, see Diff."""
+
+    def __init__(self, path, status="modified", old_path=None):
+        self.path = path
+        self.status = status
+        self.old_path = old_path if old_path != path else None
+        self.binary = False
+        self.added = 0
+        self.removed = 0
+        self.lines = []
+        self.omitted_lines = 0
+        self.size = 0
+
+    @property
+    def is_lockfile(self):
+        return os.path.basename(self.path) in LOCKFILE_NAMES
+
+    @property
+    def collapsed(self):
+        """Whether the file is only summarized (lockfiles, binary files)."""
+        return self.binary or self.is_lockfile
+
+    @property
+    def patch(self):
+        return "\n".join(self.lines)
+
+    def __str__(self):
+        name = self.path if self.old_path is None else f"{self.old_path} -> {self.path}"
+        output = [f"\nFile: {name}", f"Status: {self.status} (+{self.added} -{self.removed})", "-" * 40]
+        if self.binary:
+            output.append("Binary file, diff not shown.")
+        elif self.is_lockfile:
+            output.append("Lockfile, diff not shown.")
+        else:
+            output.extend(self.lines)
+            if self.omitted_lines > 0:
+                output.append(f"[... {self.omitted_lines} more lines of this diff not shown]")
+        return "\n".join(output)
+
+
+class Diff:
+    """
+    Diff of multiple files, limited to configurable budgets.
+
+    Use str(diff) to render it, e.g. for prompts.
+
+    Parameters
+    ----------
+    max_file_lines : int, optional
+    max_file_bytes : int, optional
+    max_total_bytes : int, optional
+        Budgets, by default read from environment variables, see module description.
+    """
+
+    def __init__(self, max_file_lines=None, max_file_bytes=None, max_total_bytes=None):
+        if max_file_lines is None:
+            max_file_lines = int(os.environ.get("GIT_BOB_DIFF_MAX_FILE_LINES", "400"))
+        if max_file_bytes is None:
+            max_file_bytes = int(os.environ.get("GIT_BOB_DIFF_MAX_FILE_BYTES", "20000"))
+        if max_total_bytes is None:
+            max_total_bytes = int(os.environ.get("GIT_BOB_DIFF_MAX_TOTAL_BYTES", "200000"))
+        self.max_file_lines = max_file_lines
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+
+        self.files = []
+        self.omitted_files = 0
+        # True if reading the diff was stopped early, hence the number of omitted files is unknown
+        self.truncated = False
+        self.size = 0
+        # True once a line did not fit into the total budget anymore
+        self._full = False
+
+    @property
+    def exhausted(self):
+        """Whether the total budget is used up."""
+        return self._full or self.size >= self.max_total_bytes
+
+    def add_file(self, path, status="modified", old_path=None):
+        """Start the diff of another file. Returns None if the total budget is used up."""
+        if self.exhausted:
+            self.omitted_files += 1
+            return None
+        file = FileDiff(path, status, old_path)
+        self.files.append(file)
+        return file
+
+    def add_line(self, file, line):
+        """Add a line of the unified diff of a file, if the budgets allow."""
+        if line.startswith("+") and not line.startswith("+++ "):
+            file.added += 1
+        elif line.startswith("-") and not line.startswith("--- "):
+            file.removed += 1
+
+        if file.collapsed:
+            return
+        size = len(line) + 1
+        if self.size + size > self.max_total_bytes:
+            self._full = True
+        if len(file.lines) >= self.max_file_lines or file.size + size > self.max_file_bytes or self._full:
+            file.omitted_lines += 1
+            return
+        file.lines.append(line)
+        file.size += size
+        self.size += size
+
+    def add_patch(self, path, patch, status="modified", old_path=None):
+        """Add the diff of a file, e.g. from a "patch" provided by the API. A patch of None indicates a binary file."""
+        file = self.add_file(path, status, old_path)
+        if file is None:
+            return None
+        if patch is None:
+            file.binary = True
+            return file
+        for line in patch.split("\n"):
+            self.add_line(file, line)
+        return file
+
+    def summary(self):
+        """Describe the diff in one line, e.g. for logging."""
+        added = sum([f.added for f in self.files])
+        removed = sum([f.removed for f in self.files])
+        text = f"{len(self.files) + self.omitted_files} files changed (+{added} -{removed})"
+        if self.omitted_files > 0 or self.truncated:
+            text += ", diff truncated"
+        return text
+
+    def __str__(self):
+        output = "\n".join([str(f) for f in self.files])
+        if self.omitted_files > 0:
+            output += f"\n\n[... {self.omitted_files} more files not shown]"
+        elif self.truncated:
+            output += "\n\n[... further files not shown]"
+        return output
+
+
+def parse_unified_diff(lines, diff=None):
+    """
+    Parse a unified diff as produced by `git diff` line by line, e.g. while it is downloaded.
+
+    Reading stops as soon as the total budget is used up, also within the diff of a file, hence the rest of a
+    downloaded diff is not transferred.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Lines of the diff without line endings
+    diff : Diff, optional
+        The diff to add the files to, by default a new Diff with default budgets.
+
+    Returns
+    -------
+    Diff
+    """
+    if diff is None:
+        diff = Diff()
+
+    file = None
+    in_header = False
+    for line in lines:
+        if line.startswith("diff --git "):
+            if diff.exhausted:
+                diff.truncated = True
+                break
+            # "diff --git a/path b/path", the file names are confirmed by the header lines below
+            paths = line[len("diff --git "):]
+            path = paths.split(" b/")[-1]
+            old_path = paths.split(" b/")[0][2:]
+            file = diff.add_file(path, "modified", old_path)
+            in_header = True
+            continue
+        if file is None:
+            continue
+        if in_header:
+            if line.startswith("@@"):
+                in_header = False
+            elif line.startswith("new file mode"):
+                file.status = "added"
+                continue
+            elif line.startswith("deleted file mode"):
+                file.status = "removed"
+                continue
+            elif line.startswith("rename from "):
+                file.status = "renamed"
+                file.old_path = line[len("rename from "):]
+                continue
+            elif line.startswith("rename to "):
+                file.path = line[len("rename to "):]
+                continue
+            elif line.startswith("Binary files ") or line.startswith("GIT binary patch"):
+                file.binary = True
+                continue
+            elif line.startswith("+++ b/"):
+                file.path = line[len("+++ b/"):]
+                continue
+            else:
+                continue
+        diff.add_line(file, line)
+        if diff.exhausted:
+            diff.truncated = True
+            break
+
+    for file in diff.files:
+        if file.old_path == file.path:
+            file.old_path = None
+    return diff
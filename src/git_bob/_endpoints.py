@@ -1,38 +1,59 @@
 """
 This module provides helper functions to interact with different language models.
 """
+import threading
 
-def prompt_anthropic(message: str, model="claude-3-5-sonnet-20241022", image=None):
-    """
-    A prompt helper function that sends a message to anthropic
-    and returns only the text response.
 
-    Example models: claude-3-5-sonnet-20240620 or claude-3-opus-20240229
+class TokenUsage():
     """
-    from anthropic import Anthropic
-    from ._utilities import image_to_url
-    import base64
-    import numpy as np
+    Counts the requests to language models and the tokens used, as reported by the providers.
+    """
+    _instance = None
 
-    model = model.replace("anthropic:", "")
-    model = model.replace("claude:", "")
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(TokenUsage, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.clear()
+        return cls._instance
 
-    def encode_image(image_array):
-        """
-        Encode a numpy image array to base64 string.
+    def clear(self):
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
 
-        Parameters
-        ----------
-        image_array : numpy.ndarray
-            A numpy array representing the image.
-
-        Returns
-        -------
-        str
-            Base64 encoded string of the image.
+    def add(self, usage):
+        """
+        Count a response of a language model, given its usage information (e.g. response.usage), which may be None.
         """
-        if isinstance(image_array, np.ndarray):
-            return base64.b64encode(image_array.tobytes()).decode('utf-8')
+        input_tokens, output_tokens = 0, 0
+        if usage is not None:
+            # openai, mistral, azure: prompt_tokens / completion_tokens, anthropic: input_tokens / output_tokens,
+            # google: prompt_token_count / candidates_token_count
+            for name in ["prompt_tokens", "input_tokens", "prompt_token_count"]:
+                input_tokens = input_tokens or getattr(usage, name, None) or 0
+            for name in ["completion_tokens", "output_tokens", "candidates_token_count"]:
+                output_tokens = output_tokens or getattr(usage, name, None) or 0
+        with self._lock:
+            self.requests += 1
+            self.input_tokens += int(input_tokens)
+            self.output_tokens += int(output_tokens)
+
+    @property
+    def total_tokens(self):
+        return self.input_tokens + self.output_tokens
+
+    def summary(self):
+        """Describe the usage, e.g. for the final log summary."""
+        return f"LLM usage: {self.requests} requests, {self.input_tokens} input tokens, {self.output_tokens} output tokens"
+
+
+def _anthropic_request(message, model, image):
+    """Return the arguments of a request to anthropic for a message, the model and an optional image."""
+    from ._utilities import image_to_url
+
+    model = model.replace("anthropic:", "")
+    model = model.replace("claude:", "")
 
     # convert message in the right format if necessary
     if image is None:
@@ -57,80 +78,157 @@ def prompt_anthropic(message: str, model="claude-3-5-sonnet-20241022", image=Non
             ]
         }]
 
-    # setup connection to the LLM
-    client = Anthropic()
-
-    message = client.messages.create(
+    return dict(
         max_tokens=8192 if "claude-3-5" in model else 4096,
         messages=message,
         model=model,
         extra_headers={"anthropic-beta": "max-tokens-3-5-sonnet-2024-07-15"} if model == "claude-3-5-20240620" else None,
     )
 
+
+def prompt_anthropic(message: str, model="claude-3-5-sonnet-20241022", image=None):
+    """
+    A prompt helper function that sends a message to anthropic
+    and returns only the text response.
+
+    Example models: claude-3-5-sonnet-20240620 or claude-3-opus-20240229
+    """
+    from ._client_pool import get_anthropic_client
+
+    # setup connection to the LLM
+    client = get_anthropic_client()
+
+    message = client.messages.create(**_anthropic_request(message, model, image))
+
+    TokenUsage().add(getattr(message, "usage", None))
+
     # extract answer
     return message.content[0].text
 
 
+def stream_anthropic(message: str, model="claude-3-5-sonnet-20241022", image=None):
+    """
+    Streaming variant of prompt_anthropic: yields the text response in chunks, as they arrive.
+    """
+    from ._client_pool import get_anthropic_client
+
+    client = get_anthropic_client()
+    with client.messages.stream(**_anthropic_request(message, model, image)) as stream:
+        for text in stream.text_stream:
+            yield text
+        TokenUsage().add(getattr(stream.get_final_message(), "usage", None))
+
+
+def _openai_messages(message, image):
+    """Return the messages of a request to openai for a message and an optional image."""
+    from ._utilities import image_to_url
+
+    if image is None:
+        return [{"role": "user", "content": message}]
+    image_url = image_to_url(image)
+    return [{"role": "user", "content": [{
+                "type": "text",
+                "text": message,
+            },{
+                "type": "image_url",
+                "image_url": {"url": "data:image/png;base64," + image_url}
+            }]}]
+
+
 def prompt_openai(message: str, model="gpt-4o-2024-08-06", image=None, max_accumulated_responses=10, max_response_tokens=16384, base_url=None, api_key=None):
     """A prompt helper function that sends a message to openAI
     and returns only the text response.
     """
+    return "".join(_openai_responses(message, model, image, max_accumulated_responses, max_response_tokens,
+                                     base_url, api_key, stream=False))
+
+
+def stream_openai(message: str, model="gpt-4o-2024-08-06", image=None, max_accumulated_responses=10, max_response_tokens=16384, base_url=None, api_key=None):
+    """
+    Streaming variant of prompt_openai: yields the text response in chunks, as they arrive.
+    Long outputs are continued like in prompt_openai.
+    """
+    yield from _openai_responses(message, model, image, max_accumulated_responses, max_response_tokens,
+                                 base_url, api_key, stream=True)
+
+
+def _openai_responses(message, model, image, max_accumulated_responses, max_response_tokens, base_url, api_key, stream):
+    """
+    Send a message to openAI (or a compatible server) and yield the text response in chunks, see prompt_openai.
+
+    If the response is cut because of its length, the conversation is continued up to max_accumulated_responses
+    times. Without streaming, each response is yielded as one chunk.
+    """
     # convert message in the right format if necessary
-    from ._utilities import image_to_url
-    import openai
     import warnings
-    from ._utilities import append_result
+    from ._utilities import append_result, POSSBILE_MARKDOWN_FENCES
+    from ._client_pool import get_openai_client
 
     model = model.replace("openai:", "")
 
-    if image is None:
-        message = [{"role": "user", "content": message}]
-    else:
-        image_url = image_to_url(image)
-        message = [{"role": "user", "content": [{
-                    "type": "text",
-                    "text": message,
-                },{
-                    "type": "image_url",
-                    "image_url": {"url": "data:image/png;base64," + image_url}
-                }]}]
+    message = _openai_messages(message, image)
     original_message = message
 
     # setup connection to the LLM
     if base_url is not None and api_key is not None:
-        client = openai.OpenAI(base_url=base_url, api_key=api_key)
+        client = get_openai_client(base_url=base_url, api_key=api_key)
     else:
-        client = openai.OpenAI()
+        client = get_openai_client()
 
-    result = ""
+    if model.startswith("gpt-5"):
+        if max_response_tokens == 16384: # overwrite default becasue gpt-5 is more capable
+            max_response_tokens = 128000
+        token_limit = {"max_completion_tokens": max_response_tokens}
+    else:
+        token_limit = {"max_tokens": max_response_tokens}
 
     print("model", model[1:])
     print("base_url", base_url)
     print("api_key", len(api_key) if api_key is not None else 0)
 
-    for _ in range(0, max_accumulated_responses):
+    def submit(messages):
+        """Submit the prompt and yield text and finish reason of the response."""
+        if not stream:
+            response = client.chat.completions.create(model=model, messages=messages, **token_limit)
+            TokenUsage().add(getattr(response, "usage", None))
+            yield response.choices[0].message.content, response.choices[0].finish_reason
+            return
+        for chunk in client.chat.completions.create(model=model, messages=messages, stream=True,
+                                                    stream_options={"include_usage": True}, **token_limit):
+            if getattr(chunk, "usage", None) is not None:
+                TokenUsage().add(chunk.usage)
+            if len(chunk.choices) > 0:
+                yield chunk.choices[0].delta.content, chunk.choices[0].finish_reason
+
+    # the beginning of continued responses is held back until it is clear whether append_result removes a fence
+    longest_fence = max([len(f) for f in POSSBILE_MARKDOWN_FENCES]) + 1
 
-        # submit prompt
-        if model.startswith("gpt-5"):
-            if max_response_tokens == 16384: # overwrite default becasue gpt-5 is more capable
-                max_response_tokens=128000
-            response = client.chat.completions.create(
-                model=model,
-                messages=message,
-                max_completion_tokens=max_response_tokens,
-            )
-        else:
-            response = client.chat.completions.create(
-                model=model,
-                messages=message,
-                max_tokens=max_response_tokens,
-            )
-
-        result = append_result(result, response.choices[0].message.content)
-        print("finish_reason", response.choices[0].finish_reason)
+    result = ""
+    for _ in range(0, max_accumulated_responses):
+        response = ""
+        head = None if len(result) == 0 else ""
+        finish_reason = None
+        for text, reason in submit(message):
+            finish_reason = reason or finish_reason
+            if text is None or len(text) == 0:
+                continue
+            if head is not None:
+                head = head + text
+                if len(head) < longest_fence and "\n" not in head:
+                    continue
+                text = append_result(result, head)[len(result):]
+                head = None
+            response = response + text
+            yield text
+        if head is not None and len(head) > 0:
+            text = append_result(result, head)[len(result):]
+            response = response + text
+            yield text
+        result = result + response
+        print("finish_reason", finish_reason)
         print("len", len(result))
 
-        if response.choices[0].finish_reason == "length":
+        if finish_reason == "length":
             message = original_message.copy()
             message.append({"role": "assistant", "content": result})
             message.append({"role": "user", "content": "Continue!"})
@@ -139,8 +237,31 @@ def prompt_openai(message: str, model="gpt-4o-2024-08-06", image=None, max_accum
         else:
             break
 
-    # extract answer
-    return result
+
+# handlers with a streaming variant, see stream_prompt
+prompt_openai.stream = stream_openai
+prompt_anthropic.stream = stream_anthropic
+
+
+def stream_prompt(prompt_function, message: str, **kwargs):
+    """
+    Send a message using a prompt function and yield the response in chunks, as they arrive.
+
+    Prompt functions (or functools.partial of them) which have a streaming variant (the `stream` attribute,
+    e.g. prompt_openai) are streamed; for all others, the complete response is yielded as one chunk.
+    """
+    from functools import partial
+
+    func, arguments = prompt_function, {}
+    while isinstance(func, partial):
+        arguments = {**func.keywords, **arguments}
+        func = func.func
+    stream = getattr(func, "stream", None)
+    if stream is None or (isinstance(prompt_function, partial) and len(prompt_function.args) > 0):
+        yield prompt_function(message, **kwargs)
+        return
+    yield from stream(message, **{**arguments, **kwargs})
+
 
 def prompt_scads(message: str, model="openai/gpt-oss-120b", image=None, max_accumulated_responses=10, max_response_tokens=128000, base_url=None, api_key=None):
     import os
@@ -198,18 +319,20 @@ def prompt_googleai(request, model="gemini-2.5-pro", image=None):
     """Send a prompt to Google Gemini and return the response"""
     from google import generativeai as genai
     import os
+    from ._client_pool import configure_googleai
 
     model = model.replace("googleai:", "")
     model = model.replace("gemini:", "")
 
-    genai.configure(api_key=os.environ['GOOGLE_API_KEY'])
+    configure_googleai(os.environ['GOOGLE_API_KEY'])
     client = genai.GenerativeModel(model)
     
     if image is not None:
         response = client.generate_content([image, request])
     else:
         response = client.generate_content(request)
-        
+
+    TokenUsage().add(getattr(response, "usage_metadata", None))
     return response.text
 
 
@@ -226,14 +349,10 @@ def prompt_azure(message: str, model="gpt-4o", image=None):
     model = model.replace("azure:", "")
 
     if "gpt" not in model and "o1" not in model:
-        from azure.ai.inference import ChatCompletionsClient
         from azure.ai.inference.models import SystemMessage, UserMessage, TextContentItem, ImageContentItem
-        from azure.core.credentials import AzureKeyCredential
+        from ._client_pool import get_azure_inference_client
 
-        client = ChatCompletionsClient(
-            endpoint=endpoint,
-            credential=AzureKeyCredential(token),
-        )
+        client = get_azure_inference_client(endpoint, token)
 
 
         if image is not None:
@@ -258,7 +377,7 @@ def prompt_azure(message: str, model="gpt-4o", image=None):
         )
 
     else:
-        from openai import OpenAI
+        from ._client_pool import get_openai_client
 
         if image is None:
             message = [{"role": "user", "content": message}]
@@ -271,10 +390,7 @@ def prompt_azure(message: str, model="gpt-4o", image=None):
                 }
             }]}]
 
-        client = OpenAI(
-            base_url=endpoint,
-            api_key=token,
-        )
+        client = get_openai_client(base_url=endpoint, api_key=token)
 
         response = client.chat.completions.create(
             model=model,
@@ -284,6 +400,7 @@ def prompt_azure(message: str, model="gpt-4o", image=None):
             max_tokens=4096
         )
 
+    TokenUsage().add(getattr(response, "usage", None))
     return response.choices[0].message.content
 
 
@@ -291,7 +408,7 @@ def prompt_mistral(message: str, model="mistral-large-2411", image=None):
     """A prompt helper function that sends a message to Mistral.
     If an image is provided, it will use the Pixtral model."""
     import os
-    from mistralai import Mistral
+    from ._client_pool import get_mistral_client
     from ._utilities import image_to_url
 
     model = model.replace("mistral:", "")
@@ -309,7 +426,7 @@ def prompt_mistral(message: str, model="mistral-large-2411", image=None):
     api_key = os.environ["MISTRAL_API_KEY"]
 
     # Initialize the Mistral client
-    client = Mistral(api_key=api_key)
+    client = get_mistral_client(api_key)
 
     # Define the messages for the chat
     if image is None:
@@ -344,14 +461,16 @@ def prompt_mistral(message: str, model="mistral-large-2411", image=None):
         messages=messages
     )
 
+    TokenUsage().add(getattr(chat_response, "usage", None))
+
     # Print the content of the response
     return chat_response.choices[0].message.content
 
 
 def text_to_speech_openai(text:str, filename:str, model:str="tts-1", voice:str="alloy"):
-    from openai import OpenAI
+    from ._client_pool import get_openai_client
 
-    client = OpenAI()
+    client = get_openai_client()
     response = client.audio.speech.create(
         model=model,
         voice=voice,
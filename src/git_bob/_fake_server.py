@@ -0,0 +1,930 @@
+# This module provides a local stand-in for the GitHub and GitLab APIs, holding repositories, issues and
+# pull-/merge-requests in memory. It implements the REST endpoints (and the GraphQL query) used by
+# git_bob._github_utilities and git_bob._gitlab_utilities, hence the host layer can be tested, benchmarked and
+# profiled without network access or access tokens. Latency and rate-limit responses can be injected to
+# reproduce the behaviour of the real servers.
+#
+# Usage:
+#     with FakeServer(latency=0.05) as server:
+#         repository = server.add_repository("someone/something", {"README.md": "# Hello"})
+#         os.environ.update(server.environment())
+#         ...
+#
+# The same server answers GitHub requests (GITHUB_API_URL) and GitLab requests (GIT_SERVER_URL, below /api/v4).
+#
+import base64
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+
+def _sha(*parts):
+    return hashlib.sha1("\0".join([str(p) for p in parts]).encode("utf-8")).hexdigest()
+
+
+def _blob_sha(content):
+    from ._file_cache import git_blob_sha
+    return git_blob_sha(content)
+
+
+def _user_id(username):
+    return int(hashlib.sha1(username.encode("utf-8")).hexdigest()[:6], 16)
+
+
+def _is_binary(content):
+    try:
+        content.decode("utf-8")
+    except UnicodeDecodeError:
+        return True
+    return b"\0" in content
+
+
+def _hunks(old_content, new_content):
+    """Unified diff lines of two file contents, without the ---/+++ header."""
+    import difflib
+    lines = difflib.unified_diff(old_content.decode("utf-8").splitlines(), new_content.decode("utf-8").splitlines(), lineterm="")
+    return list(lines)[2:]
+
+
+class FakeRepository:
+    """
+    A repository held in memory by the FakeServer, with branches, issues and pull-requests.
+
+    Parameters
+    ----------
+    full_name : str
+        e.g. "someone/something"
+    files : dict, optional
+        Initial content (str or bytes) of the default branch by path.
+    default_branch : str, optional
+    collaborators : list of str, optional
+        Users with write access; the owner is always a collaborator.
+    """
+
+    def __init__(self, full_name, files=None, default_branch="main", collaborators=None, project_id=1):
+        self.full_name = full_name
+        self.project_id = project_id
+        self.default_branch = default_branch
+        self.collaborators = set([full_name.split("/")[0]] + list(collaborators or []))
+        self._clock = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        # blob sha -> content (bytes)
+        self.blobs = {}
+        # tree sha -> {path: blob sha}
+        self.trees = {}
+        # commit sha -> {"tree", "parents", "message"}
+        self.commits = {}
+        # branch name -> commit sha
+        self.branches = {}
+        # number -> dict, pull-requests are issues with a "pull_request" entry on GitHub
+        self.issues = {}
+        # GitLab numbers merge requests separately
+        self.merge_requests = {}
+        self.comment_ids = 0
+
+        tree = self._store_tree({path: self._store_blob(content) for path, content in (files or {}).items()})
+        self.branches[default_branch] = self._store_commit(tree, [], "Initial commit")
+
+    def now(self):
+        """Time stamps increase with every modification, so that sorting by time is deterministic."""
+        self._clock += timedelta(seconds=1)
+        return self._clock.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _store_blob(self, content):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        sha = _blob_sha(content)
+        self.blobs[sha] = content
+        return sha
+
+    def _store_tree(self, files):
+        sha = _sha("tree", *sorted(files.items()))
+        self.trees[sha] = dict(files)
+        return sha
+
+    def _store_commit(self, tree, parents, message):
+        sha = _sha("commit", tree, parents, message, len(self.commits))
+        self.commits[sha] = {"tree": tree, "parents": list(parents), "message": message}
+        return sha
+
+    def resolve(self, ref):
+        """Return the commit sha of a branch name or commit sha, or None."""
+        if ref in self.branches:
+            return self.branches[ref]
+        if ref in self.commits:
+            return ref
+        return None
+
+    def files(self, ref):
+        """Return the files of a branch, commit or tree as {path: blob sha}, or None if the ref is unknown."""
+        commit = self.resolve(ref)
+        if commit is not None:
+            return self.trees[self.commits[commit]["tree"]]
+        return self.trees.get(ref)
+
+    def read(self, ref, path):
+        """Return the content of a file, or None."""
+        files = self.files(ref)
+        if files is None or path not in files:
+            return None
+        return self.blobs[files[path]]
+
+    def commit(self, branch, changes, message):
+        """
+        Commit changes to a branch.
+
+        Parameters
+        ----------
+        branch : str
+        changes : dict
+            New content (str or bytes) by path, None deletes a file.
+        message : str
+
+        Returns
+        -------
+        str
+            The sha of the new commit
+        """
+        parent = self.branches[branch]
+        files = dict(self.files(parent))
+        for path, content in changes.items():
+            if content is None:
+                files.pop(path, None)
+            else:
+                files[path] = self._store_blob(content)
+        self.branches[branch] = self._store_commit(self._store_tree(files), [parent], message)
+        return self.branches[branch]
+
+    def add_issue(self, title, body="", author="someone", pull_request=None):
+        """Create an issue (or pull-request if pull_request is a (head, base) tuple) and return its number."""
+        number = max(list(self.issues.keys()) + [0]) + 1
+        created_at = self.now()
+        self.issues[number] = {"number": number, "title": title, "body": body, "author": author, "state": "open",
+                               "created_at": created_at, "updated_at": created_at, "closed_at": None,
+                               "comments": [], "reactions": [], "pull_request": pull_request}
+        return number
+
+    def add_pull_request(self, title, head, base=None, body="", author="someone"):
+        """Create a pull-request from branch head into branch base and return its number."""
+        if base is None:
+            base = self.default_branch
+        return self.add_issue(title, body, author, pull_request=(head, base))
+
+    def add_merge_request(self, title, head, base=None, body="", author="someone"):
+        """Create a GitLab merge request from branch head into branch base and return its number."""
+        if base is None:
+            base = self.default_branch
+        iid = max(list(self.merge_requests.keys()) + [0]) + 1
+        self.merge_requests[iid] = {"iid": iid, "title": title, "description": body, "author": author,
+                                    "source_branch": head, "target_branch": base}
+        return iid
+
+    def add_comment(self, number, body, author="someone"):
+        """Comment on an issue and return the comment."""
+        self.comment_ids += 1
+        comment = {"id": self.comment_ids, "issue": number, "body": body, "author": author,
+                   "created_at": self.now(), "reactions": []}
+        self.issues[number]["comments"].append(comment)
+        self.issues[number]["updated_at"] = comment["created_at"]
+        return comment
+
+    def changes(self, base, head):
+        """
+        Compare two refs.
+
+        Returns
+        -------
+        list of dict
+            Changed files with old_path, new_path, status (added, removed, renamed, modified) and
+            hunks (list of str, None for binary files).
+        """
+        old_files, new_files = self.files(base), self.files(head)
+        removed = {path: sha for path, sha in old_files.items() if path not in new_files}
+        changes = []
+        for path in sorted(new_files.keys()):
+            sha = new_files[path]
+            if path in old_files:
+                if old_files[path] == sha:
+                    continue
+                change = {"old_path": path, "new_path": path, "status": "modified", "old": self.blobs[old_files[path]]}
+            else:
+                renamed_from = [old for old, old_sha in removed.items() if old_sha == sha]
+                if len(renamed_from) > 0:
+                    del removed[renamed_from[0]]
+                    changes.append({"old_path": renamed_from[0], "new_path": path, "status": "renamed", "hunks": []})
+                    continue
+                change = {"old_path": path, "new_path": path, "status": "added", "old": b""}
+            change["new"] = self.blobs[sha]
+            changes.append(change)
+        for path, sha in sorted(removed.items()):
+            changes.append({"old_path": path, "new_path": path, "status": "removed", "old": self.blobs[sha], "new": b""})
+
+        for change in changes:
+            if "hunks" not in change:
+                old, new = change.pop("old"), change.pop("new")
+                change["hunks"] = None if _is_binary(old) or _is_binary(new) else _hunks(old, new)
+        return changes
+
+    def unified_diff(self, base, head):
+        """The changes between two refs in the format of `git diff`."""
+        lines = []
+        for change in self.changes(base, head):
+            old_path, new_path = change["old_path"], change["new_path"]
+            lines.append(f"diff --git a/{old_path} b/{new_path}")
+            if change["status"] == "added":
+                lines.append("new file mode 100644")
+            elif change["status"] == "removed":
+                lines.append("deleted file mode 100644")
+            elif change["status"] == "renamed":
+                lines += ["similarity index 100%", f"rename from {old_path}", f"rename to {new_path}"]
+                continue
+            old_name = "/dev/null" if change["status"] == "added" else "a/" + old_path
+            new_name = "/dev/null" if change["status"] == "removed" else "b/" + new_path
+            if change["hunks"] is None:
+                lines.append(f"Binary files {old_name} and {new_name} differ")
+                continue
+            lines += [f"--- {old_name}", f"+++ {new_name}"] + change["hunks"]
+        return "\n".join(lines) + "\n"
+
+
+class _Response:
+    def __init__(self, status=200, body=None, headers=None, content_type="application/json"):
+        self.status = status
+        self.headers = dict(headers or {})
+        if body is None:
+            self.content = b""
+        elif isinstance(body, bytes):
+            self.content = body
+        elif isinstance(body, str):
+            self.content = body.encode("utf-8")
+            content_type = "text/plain; charset=utf-8" if content_type == "application/json" else content_type
+        else:
+            self.content = json.dumps(body).encode("utf-8")
+        if len(self.content) > 0:
+            self.headers.setdefault("Content-Type", content_type)
+
+
+class _NotFound(Exception):
+    pass
+
+
+class FakeServer:
+    """
+    An in-process HTTP server imitating the GitHub and GitLab APIs, see module description.
+
+    Parameters
+    ----------
+    latency : float, optional
+        Seconds every request is delayed, to imitate the round trip to a remote server.
+    rate_limit : int, optional
+        Number of requests allowed per rate_limit_window; further requests are rejected as rate limited.
+    rate_limit_window : float, optional
+        Seconds until the rate limit is reset.
+    user : str, optional
+        The user owning the access token, used as author of comments etc.
+    gitlab_version : tuple of int, optional
+        The GitLab version imitated, e.g. (15, 6) for a server without the merge request diffs endpoint.
+    """
+
+    def __init__(self, latency=0.0, rate_limit=None, rate_limit_window=3600, user="git-bob", gitlab_version=(17, 0)):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.user = user
+        self.gitlab_version = tuple(gitlab_version)
+        self.repositories = {}
+        # (method, path) of all requests received, e.g. for counting requests in benchmarks
+        self.requests = []
+        self._lock = threading.RLock()
+        self._injected = []
+        self._window_start = time.time()
+        self._used = 0
+        self._server = None
+
+    # ---- setup ----
+
+    def add_repository(self, full_name, files=None, default_branch="main", collaborators=None):
+        """Create a repository, see FakeRepository, and return it."""
+        with self._lock:
+            repository = FakeRepository(full_name, files, default_branch, collaborators,
+                                        project_id=len(self.repositories) + 1)
+            self.repositories[full_name] = repository
+            return repository
+
+    def inject_rate_limit(self, count=1, status=429, retry_after=0):
+        """Reject the next count requests as rate limited, asking clients to retry after the given seconds."""
+        with self._lock:
+            self._injected += [(status, retry_after)] * count
+
+    def start(self):
+        """Start serving in a background thread and return the server url."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length > 0 else b""
+                response = server.handle(self.command, self.path, dict(self.headers.items()), body)
+                self.send_response(response.status)
+                for key, value in response.headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(response.content)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(response.content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def environment(self):
+        """Environment variables which make git-bob use this server, for GitHub and GitLab."""
+        return {
+            "GITHUB_API_URL": self.url,
+            "GIT_SERVER_URL": self.url + "/",
+            "GITHUB_API_KEY": "fake-token",
+            "GITLAB_API_KEY": "fake-token",
+        }
+
+    # ---- request handling ----
+
+    def handle(self, method, path, headers, body):
+        """Answer a request, returns a _Response."""
+        if self.latency > 0:
+            time.sleep(self.latency)
+        split = urlsplit(path)
+        query = {key: values[-1] for key, values in parse_qs(split.query).items()}
+        gitlab = split.path.startswith("/api/v4/")
+
+        with self._lock:
+            self.requests.append((method, split.path))
+            rate_limit_headers = self._rate_limit_headers(gitlab)
+            rejection = self._reject(gitlab, rate_limit_headers)
+            if rejection is not None:
+                return rejection
+            try:
+                data = json.loads(body) if len(body) > 0 and body[:1] in b"[{" else {}
+                segments = [unquote(s) for s in split.path.strip("/").split("/")]
+                if gitlab:
+                    response = self._gitlab(method, segments[2:], query, data)
+                elif segments == ["graphql"]:
+                    response = self._graphql(data)
+                else:
+                    response = self._github(method, segments, query, data, headers)
+            except _NotFound:
+                response = _Response(404, {"message": "Not Found"})
+            except Exception as e:
+                response = _Response(500, {"message": f"{type(e).__name__}: {e}"})
+
+        response.headers.update(rate_limit_headers)
+        return self._conditional(method, headers, response)
+
+    def _rate_limit_headers(self, gitlab):
+        if self.rate_limit is None:
+            return {}
+        now = time.time()
+        if now - self._window_start >= self.rate_limit_window:
+            self._window_start, self._used = now, 0
+        self._used += 1
+        prefix = "RateLimit-" if gitlab else "X-RateLimit-"
+        return {prefix + "Limit": str(self.rate_limit),
+                prefix + "Remaining": str(max(0, self.rate_limit - self._used)),
+                prefix + "Reset": str(int(self._window_start + self.rate_limit_window))}
+
+    def _reject(self, gitlab, rate_limit_headers):
+        if len(self._injected) > 0:
+            status, retry_after = self._injected.pop(0)
+            return _Response(status, {"message": "API rate limit exceeded (secondary rate limit)"},
+                             {"Retry-After": str(retry_after), **rate_limit_headers})
+        if self.rate_limit is not None and self._used > self.rate_limit:
+            return _Response(429 if gitlab else 403, {"message": "API rate limit exceeded"}, rate_limit_headers)
+        return None
+
+    def _conditional(self, method, headers, response):
+        # ETags allow clients to send conditional requests, see git_bob._http_cache
+        if method != "GET" or response.status != 200:
+            return response
+        etag = '"' + hashlib.sha1(response.content).hexdigest() + '"'
+        response.headers["ETag"] = etag
+        if headers.get("If-None-Match") == etag:
+            return _Response(304, None, {k: v for k, v in response.headers.items() if k != "Content-Type"})
+        return response
+
+    def _repository(self, name):
+        if name not in self.repositories:
+            raise _NotFound()
+        return self.repositories[name]
+
+    def _paginate(self, url, query, items, default_per_page):
+        """Return a page of a list, with a Link header pointing to the next page."""
+        per_page = int(query.get("per_page", default_per_page))
+        page = int(query.get("page", 1))
+        headers = {}
+        if page * per_page < len(items):
+            next_query = "&".join([f"{k}={quote(str(v))}" for k, v in {**query, "page": page + 1, "per_page": per_page}.items()])
+            headers["Link"] = f'<{self.url}{url}?{next_query}>; rel="next"'
+            headers["X-Next-Page"] = str(page + 1)
+        headers["X-Page"] = str(page)
+        headers["X-Total"] = str(len(items))
+        return _Response(200, items[(page - 1) * per_page:page * per_page], headers)
+
+    # ---- GitHub ----
+
+    def _github(self, method, segments, query, data, headers):
+        if len(segments) == 2 and segments[0] == "users":
+            return _Response(200, {"login": segments[1], "id": 1, "type": "User"})
+        if segments[:1] == ["user"]:
+            return _Response(200, {"login": self.user, "id": 1, "type": "User"})
+        if len(segments) < 3 or segments[0] != "repos":
+            raise _NotFound()
+
+        full_name = segments[1] + "/" + segments[2]
+        repository = self._repository(full_name)
+        base = f"{self.url}/repos/{full_name}"
+        route = segments[3:]
+        request = (method, "/".join(route))
+
+        def issue_json(issue):
+            result = {"number": issue["number"], "id": issue["number"], "title": issue["title"], "body": issue["body"],
+                      "state": issue["state"], "user": {"login": issue["author"]}, "assignees": [], "labels": [],
+                      "comments": len(issue["comments"]), "created_at": issue["created_at"],
+                      "updated_at": issue["updated_at"], "closed_at": issue["closed_at"],
+                      "url": f"{base}/issues/{issue['number']}",
+                      "html_url": f"{self.url}/{full_name}/issues/{issue['number']}"}
+            if issue["pull_request"] is not None:
+                result["pull_request"] = {"url": f"{base}/pulls/{issue['number']}"}
+            return result
+
+        def comment_json(comment):
+            return {"id": comment["id"], "body": comment["body"], "user": {"login": comment["author"]},
+                    "created_at": comment["created_at"], "updated_at": comment["created_at"],
+                    "url": f"{base}/issues/comments/{comment['id']}",
+                    "issue_url": f"{base}/issues/{comment['issue']}"}
+
+        def content_json(path, sha):
+            content = repository.blobs[sha]
+            return {"type": "file", "encoding": "base64", "path": path, "name": path.split("/")[-1], "sha": sha,
+                    "size": len(content), "content": base64.b64encode(content).decode("utf-8"),
+                    "url": f"{base}/contents/{quote(path)}", "git_url": f"{base}/git/blobs/{sha}",
+                    "download_url": None}
+
+        def commit_json(sha):
+            commit = repository.commits[sha]
+            return {"sha": sha, "url": f"{base}/git/commits/{sha}", "message": commit["message"],
+                    "tree": {"sha": commit["tree"], "url": f"{base}/git/trees/{commit['tree']}"},
+                    "parents": [{"sha": p, "url": f"{base}/git/commits/{p}"} for p in commit["parents"]]}
+
+        def ref_json(branch):
+            return {"ref": f"refs/heads/{branch}", "url": f"{base}/git/refs/heads/{branch}",
+                    "object": {"sha": repository.branches[branch], "type": "commit",
+                               "url": f"{base}/git/commits/{repository.branches[branch]}"}}
+
+        def tree_json(sha, files):
+            return {"sha": sha, "url": f"{base}/git/trees/{sha}", "truncated": False,
+                    "tree": [{"path": path, "mode": "100644", "type": "blob", "sha": blob,
+                              "size": len(repository.blobs[blob]), "url": f"{base}/git/blobs/{blob}"}
+                             for path, blob in sorted(files.items())]}
+
+        def issue(number):
+            number = int(number)
+            if number not in repository.issues:
+                raise _NotFound()
+            return repository.issues[number]
+
+        if request == ("GET", ""):
+            owner = full_name.split("/")[0]
+            return _Response(200, {"id": repository.project_id, "name": full_name.split("/")[1], "full_name": full_name,
+                                   "owner": {"login": owner}, "default_branch": repository.default_branch,
+                                   "url": base, "html_url": f"{self.url}/{full_name}", "private": False})
+
+        # branches, refs, commits, trees, blobs
+        if method == "GET" and route[:1] == ["branches"]:
+            branch = "/".join(route[1:])
+            if branch not in repository.branches:
+                raise _NotFound()
+            sha = repository.branches[branch]
+            return _Response(200, {"name": branch, "commit": {"sha": sha, "url": f"{base}/commits/{sha}",
+                                                              "commit": {"message": repository.commits[sha]["message"]}}})
+        if route[:2] in [["git", "ref"], ["git", "refs"]] and len(route) > 2:
+            branch = "/".join(route[3:]) if route[2] == "heads" else None
+            if branch not in repository.branches:
+                raise _NotFound()
+            if method == "PATCH":
+                if data["sha"] not in repository.commits:
+                    return _Response(422, {"message": "Object does not exist"})
+                repository.branches[branch] = data["sha"]
+            return _Response(200, ref_json(branch))
+        if request == ("POST", "git/refs"):
+            branch = data["ref"][len("refs/heads/"):]
+            if branch in repository.branches:
+                return _Response(422, {"message": "Reference already exists"})
+            repository.branches[branch] = data["sha"]
+            return _Response(201, ref_json(branch))
+        if method == "GET" and route[:2] == ["git", "commits"]:
+            if route[2] not in repository.commits:
+                raise _NotFound()
+            return _Response(200, commit_json(route[2]))
+        if request == ("POST", "git/commits"):
+            sha = repository._store_commit(data["tree"], data["parents"], data["message"])
+            return _Response(201, commit_json(sha))
+        if method == "GET" and route[:2] == ["git", "trees"]:
+            ref = "/".join(route[2:])
+            files = repository.files(ref)
+            if files is None:
+                raise _NotFound()
+            sha = ref if ref in repository.trees else repository.commits[repository.resolve(ref)]["tree"]
+            if "recursive" in query:
+                return _Response(200, tree_json(sha, files))
+            # like GitHub, without `recursive` only the top level is listed, directories are sub-trees
+            result = tree_json(sha, {path: blob for path, blob in files.items() if "/" not in path})
+            directories = sorted(set([path.split("/")[0] for path in files.keys() if "/" in path]))
+            for directory in directories:
+                subtree = repository._store_tree({path[len(directory) + 1:]: blob for path, blob in files.items()
+                                                  if path.startswith(directory + "/")})
+                result["tree"].append({"path": directory, "mode": "040000", "type": "tree", "sha": subtree,
+                                       "url": f"{base}/git/trees/{subtree}"})
+            return _Response(200, result)
+        if request == ("POST", "git/trees"):
+            files = dict(repository.trees[data["base_tree"]]) if "base_tree" in data else {}
+            for element in data["tree"]:
+                if "content" in element:
+                    files[element["path"]] = repository._store_blob(element["content"])
+                elif element.get("sha") is None:
+                    files.pop(element["path"], None)
+                else:
+                    files[element["path"]] = element["sha"]
+            sha = repository._store_tree(files)
+            return _Response(201, tree_json(sha, files))
+        if method == "GET" and route[:2] == ["git", "blobs"]:
+            if route[2] not in repository.blobs:
+                raise _NotFound()
+            content = repository.blobs[route[2]]
+            return _Response(200, {"sha": route[2], "size": len(content), "encoding": "base64",
+                                   "content": base64.b64encode(content).decode("utf-8")})
+        if request == ("POST", "git/blobs"):
+            content = base64.b64decode(data["content"]) if data.get("encoding") == "base64" else data["content"]
+            sha = repository._store_blob(content)
+            return _Response(201, {"sha": sha, "url": f"{base}/git/blobs/{sha}"})
+
+        # contents
+        if route[:1] == ["contents"]:
+            path = "/".join(route[1:])
+            branch = query.get("ref", data.get("branch", repository.default_branch))
+            files = repository.files(branch)
+            if files is None:
+                raise _NotFound()
+            if method == "GET":
+                if path in files:
+                    return _Response(200, content_json(path, files[path]))
+                folder = [p for p in files if p.startswith(path + "/")]
+                if len(folder) == 0:
+                    raise _NotFound()
+                return _Response(200, [content_json(p, files[p]) for p in sorted(folder) if "/" not in p[len(path) + 1:]])
+            if method == "PUT":
+                if path in files and data.get("sha") != files[path]:
+                    return _Response(409, {"message": f"{path} does not match {data.get('sha')}"})
+                commit = repository.commit(branch, {path: base64.b64decode(data["content"])}, data["message"])
+                return _Response(200 if "sha" in data else 201,
+                                 {"content": content_json(path, repository.files(branch)[path]), "commit": commit_json(commit)})
+            if method == "DELETE":
+                if path not in files:
+                    raise _NotFound()
+                if data.get("sha") != files[path]:
+                    return _Response(409, {"message": f"{path} does not match {data.get('sha')}"})
+                commit = repository.commit(branch, {path: None}, data["message"])
+                return _Response(200, {"content": None, "commit": commit_json(commit)})
+
+        # issues and comments
+        if request == ("GET", "issues"):
+            state = query.get("state", "open")
+            issues = [issue_json(i) for n, i in sorted(repository.issues.items(), reverse=True) if state in ["all", i["state"]]]
+            return self._paginate(f"/repos/{full_name}/issues", query, issues, 30)
+        if request == ("POST", "issues"):
+            number = repository.add_issue(data["title"], data.get("body", ""), self.user)
+            return _Response(201, issue_json(repository.issues[number]))
+        if request == ("GET", "issues/comments"):
+            comments = [c for i in repository.issues.values() for c in i["comments"]
+                        if "since" not in query or c["created_at"] >= query["since"]]
+            comments.sort(key=lambda c: (c["created_at"], c["id"]), reverse=query.get("direction") == "desc")
+            return self._paginate(f"/repos/{full_name}/issues/comments", query, [comment_json(c) for c in comments], 30)
+        if len(route) == 4 and route[:2] == ["issues", "comments"] and route[3] == "reactions" and method == "POST":
+            comments = [c for i in repository.issues.values() for c in i["comments"] if c["id"] == int(route[2])]
+            if len(comments) == 0:
+                raise _NotFound()
+            comments[0]["reactions"].append((self.user, data["content"]))
+            return _Response(201, {"id": len(comments[0]["reactions"]), "content": data["content"], "user": {"login": self.user}})
+        if len(route) == 2 and route[0] == "issues":
+            if method == "PATCH":
+                for key in ["title", "body", "state"]:
+                    if key in data:
+                        issue(route[1])[key] = data[key]
+                issue(route[1])["updated_at"] = repository.now()
+                if data.get("state") == "closed":
+                    issue(route[1])["closed_at"] = issue(route[1])["updated_at"]
+            return _Response(200, issue_json(issue(route[1])))
+        if len(route) == 3 and route[0] == "issues" and route[2] == "comments":
+            if method == "POST":
+                return _Response(201, comment_json(repository.add_comment(int(route[1]), data["body"], self.user)))
+            comments = [comment_json(c) for c in issue(route[1])["comments"]]
+            return self._paginate(f"/repos/{full_name}/issues/{route[1]}/comments", query, comments, 30)
+        if len(route) == 3 and route[0] == "issues" and route[2] == "reactions" and method == "POST":
+            issue(route[1])["reactions"].append((self.user, data["content"]))
+            return _Response(201, {"id": len(issue(route[1])["reactions"]), "content": data["content"], "user": {"login": self.user}})
+
+        # pull-requests
+        if request == ("POST", "pulls"):
+            if data["head"] not in repository.branches or data["base"] not in repository.branches:
+                return _Response(422, {"message": "Validation Failed"})
+            number = repository.add_pull_request(data["title"], data["head"], data["base"], data.get("body", ""), self.user)
+            return _Response(201, {"number": number, "id": number, "title": data["title"], "body": data.get("body", ""),
+                                   "state": "open", "url": f"{base}/pulls/{number}",
+                                   "html_url": f"{self.url}/{full_name}/pull/{number}"})
+        if request[0] == "GET" and len(route) == 2 and route[0] == "pulls":
+            pull = issue(route[1])
+            if pull["pull_request"] is None:
+                raise _NotFound()
+            head, base_branch = pull["pull_request"]
+            if "diff" in headers.get("Accept", ""):
+                return _Response(200, repository.unified_diff(base_branch, head), content_type="text/plain")
+            return _Response(200, {"number": pull["number"], "title": pull["title"], "body": pull["body"],
+                                   "state": pull["state"], "head": {"ref": head}, "base": {"ref": base_branch},
+                                   "url": f"{base}/pulls/{pull['number']}",
+                                   "html_url": f"{self.url}/{full_name}/pull/{pull['number']}"})
+        if method == "GET" and route[:1] == ["compare"]:
+            base_ref, head_ref = "/".join(route[1:]).split("...")
+            if repository.resolve(base_ref) is None or repository.resolve(head_ref) is None:
+                raise _NotFound()
+            files = []
+            for change in repository.changes(base_ref, head_ref):
+                file = {"filename": change["new_path"], "status": change["status"], "sha": None}
+                if change["status"] == "renamed":
+                    file["previous_filename"] = change["old_path"]
+                if change["hunks"] is not None and len(change["hunks"]) > 0:
+                    file["patch"] = "\n".join(change["hunks"])
+                files.append(file)
+            return _Response(200, {"url": f"{base}/compare/{base_ref}...{head_ref}", "status": "ahead",
+                                   "ahead_by": 1, "behind_by": 0, "total_commits": 0, "commits": [], "files": files})
+
+        # users
+        if method == "GET" and len(route) == 2 and route[0] == "collaborators":
+            if route[1] in repository.collaborators:
+                return _Response(204)
+            raise _NotFound()
+        if request == ("GET", "contributors"):
+            return self._paginate(f"/repos/{full_name}/contributors", query,
+                                  [{"login": login, "type": "User"} for login in sorted(repository.collaborators)], 30)
+
+        raise _NotFound()
+
+    def _graphql(self, data):
+        """Answer the issue conversation query of git_bob._github_utilities."""
+        variables = data.get("variables", {})
+        full_name = f"{variables['owner']}/{variables['name']}"
+        if full_name not in self.repositories or "issueOrPullRequest" not in data.get("query", ""):
+            return _Response(200, {"data": {"repository": None}, "errors": [{"type": "NOT_FOUND", "message": "Not found"}]})
+        issue = self.repositories[full_name].issues.get(variables["number"])
+        if issue is None:
+            return _Response(200, {"data": {"repository": {"issueOrPullRequest": None}}})
+
+        def actor_json(login):
+            # like GitHub, GraphQL returns bots without the "[bot]" suffix of the REST API
+            if login.endswith("[bot]"):
+                return {"__typename": "Bot", "login": login[:-len("[bot]")]}
+            return {"__typename": "User", "login": login}
+
+        start = int(variables.get("cursor") or 0)
+        page = issue["comments"][start:start + 100]
+        has_next_page = start + 100 < len(issue["comments"])
+        return _Response(200, {"data": {"repository": {"issueOrPullRequest": {
+            "number": issue["number"], "title": issue["title"], "body": issue["body"], "state": issue["state"].upper(),
+            "createdAt": issue["created_at"], "updatedAt": issue["updated_at"], "closedAt": issue["closed_at"],
+            "author": actor_json(issue["author"]),
+            "assignees": {"nodes": []}, "labels": {"nodes": []},
+            "comments": {
+                "totalCount": len(issue["comments"]),
+                "pageInfo": {"hasNextPage": has_next_page, "endCursor": str(start + 100) if has_next_page else None},
+                "nodes": [{"author": actor_json(c["author"]), "body": c["body"], "createdAt": c["created_at"]} for c in page],
+            }}}}})
+
+    # ---- GitLab ----
+
+    def _gitlab(self, method, segments, query, data):
+        data = {**query, **data}
+        if segments == ["users"]:
+            users = [{"id": _user_id(data["username"]), "username": data["username"]}] \
+                if any([data.get("username") in r.collaborators for r in self.repositories.values()]) else []
+            return _Response(200, users)
+        if len(segments) < 2 or segments[0] != "projects":
+            raise _NotFound()
+
+        projects = [r for r in self.repositories.values() if segments[1] in [r.full_name, str(r.project_id)]]
+        if len(projects) == 0:
+            raise _NotFound()
+        repository = projects[0]
+        base = f"/api/v4/projects/{repository.project_id}"
+        route = segments[2:]
+        request = (method, "/".join(route))
+
+        def issue_json(issue):
+            return {"id": issue["number"], "iid": issue["number"], "project_id": repository.project_id,
+                    "title": issue["title"], "description": issue["body"],
+                    "state": "opened" if issue["state"] == "open" else "closed",
+                    "author": {"username": issue["author"]}, "assignees": [], "labels": [],
+                    "user_notes_count": len(issue["comments"]), "created_at": issue["created_at"],
+                    "updated_at": issue["updated_at"], "closed_at": issue["closed_at"],
+                    "web_url": f"{self.url}/{repository.full_name}/-/issues/{issue['number']}"}
+
+        def note_json(note):
+            return {"id": note["id"], "body": note["body"], "author": {"username": note["author"]}, "system": False,
+                    "created_at": note["created_at"], "noteable_type": "Issue", "noteable_iid": note["issue"]}
+
+        def change_json(change):
+            return {"old_path": change["old_path"], "new_path": change["new_path"],
+                    "new_file": change["status"] == "added", "deleted_file": change["status"] == "removed",
+                    "renamed_file": change["status"] == "renamed",
+                    "diff": f"Binary files a/{change['old_path']} and b/{change['new_path']} differ\n"
+                    if change["hunks"] is None else "\n".join(change["hunks"]) + "\n"}
+
+        def issue(iid):
+            iid = int(iid)
+            if iid not in repository.issues or repository.issues[iid]["pull_request"] is not None:
+                raise _NotFound()
+            return repository.issues[iid]
+
+        def files(ref):
+            result = repository.files(ref)
+            if result is None:
+                raise _NotFound()
+            return result
+
+        if request == ("GET", ""):
+            return _Response(200, {"id": repository.project_id, "path_with_namespace": repository.full_name,
+                                   "name": repository.full_name.split("/")[1], "default_branch": repository.default_branch,
+                                   "web_url": f"{self.url}/{repository.full_name}"})
+
+        # issues, notes, award emojis, events
+        if request == ("GET", "issues"):
+            state = data.get("state", "all")
+            issues = [issue_json(i) for n, i in sorted(repository.issues.items(), key=lambda item: item[1]["updated_at"], reverse=True)
+                      if i["pull_request"] is None and state in ["all", "opened" if i["state"] == "open" else "closed"]]
+            return self._paginate(f"{base}/issues", query, issues, 20)
+        if request == ("POST", "issues"):
+            number = repository.add_issue(data["title"], data.get("description", ""), self.user)
+            return _Response(201, issue_json(repository.issues[number]))
+        if len(route) == 2 and route[0] == "issues":
+            if method == "PUT":
+                if data.get("state_event") == "close":
+                    issue(route[1])["state"] = "closed"
+                    issue(route[1])["closed_at"] = repository.now()
+                elif data.get("state_event") == "reopen":
+                    issue(route[1])["state"] = "open"
+            return _Response(200, issue_json(issue(route[1])))
+        if len(route) == 3 and route[0] == "issues" and route[2] == "notes":
+            if method == "POST":
+                return _Response(201, note_json(repository.add_comment(int(route[1]), data["body"], self.user)))
+            notes = [note_json(n) for n in issue(route[1])["comments"]]
+            if data.get("sort") == "desc":
+                notes.reverse()
+            return self._paginate(f"{base}/issues/{route[1]}/notes", query, notes, 20)
+        if method == "POST" and route[:1] == ["issues"] and route[-1] == "award_emoji":
+            target = issue(route[1])
+            if len(route) == 5:
+                notes = [n for n in target["comments"] if n["id"] == int(route[3])]
+                if len(notes) == 0:
+                    raise _NotFound()
+                target = notes[0]
+            if (self.user, data["name"]) in target["reactions"]:
+                return _Response(404, {"message": "Award Emoji Name has already been taken"})
+            target["reactions"].append((self.user, data["name"]))
+            return _Response(201, {"id": len(target["reactions"]), "name": data["name"], "user": {"username": self.user}})
+        if request == ("GET", "events"):
+            notes = sorted([n for i in repository.issues.values() if i["pull_request"] is None for n in i["comments"]],
+                           key=lambda n: (n["created_at"], n["id"]), reverse=True)
+            events = [{"id": n["id"], "action_name": "commented on", "target_type": "Note", "created_at": n["created_at"],
+                       "author": {"username": n["author"]}, "note": note_json(n)} for n in notes]
+            return self._paginate(f"{base}/events", query, events, 20)
+
+        # repository: branches, tree, files, commits, compare
+        if request == ("POST", "repository/branches"):
+            if data["branch"] in repository.branches:
+                return _Response(400, {"message": "Branch already exists"})
+            commit = repository.resolve(data["ref"])
+            if commit is None:
+                raise _NotFound()
+            repository.branches[data["branch"]] = commit
+            return _Response(201, {"name": data["branch"], "commit": {"id": commit}})
+        if request == ("GET", "repository/tree"):
+            items = [{"id": sha, "name": path.split("/")[-1], "type": "blob", "path": path, "mode": "100644"}
+                     for path, sha in sorted(files(data.get("ref", repository.default_branch)).items())]
+            return self._paginate(f"{base}/repository/tree", query, items, 20)
+        if route[:2] == ["repository", "files"] and len(route) > 2:
+            # the path is a single (url-encoded) segment
+            path, raw = route[2], route[3:] == ["raw"]
+            branch = data.get("ref", data.get("branch", repository.default_branch))
+            current = files(branch)
+            if method == "HEAD":
+                if path not in current:
+                    raise _NotFound()
+                return _Response(200, b"", headers={"X-Gitlab-File-Path": path, "X-Gitlab-Blob-Id": current[path],
+                                                   "X-Gitlab-Ref": branch})
+            if method == "GET":
+                if path not in current:
+                    raise _NotFound()
+                content = repository.blobs[current[path]]
+                if raw:
+                    return _Response(200, content, content_type="application/octet-stream")
+                return _Response(200, {"file_name": path.split("/")[-1], "file_path": path, "size": len(content),
+                                       "encoding": "base64", "content": base64.b64encode(content).decode("utf-8"),
+                                       "ref": branch, "blob_id": current[path], "commit_id": repository.resolve(branch),
+                                       "last_commit_id": repository.resolve(branch)})
+            if method in ["POST", "PUT"]:
+                if (method == "POST") == (path in current):
+                    return _Response(400, {"message": "A file with this name already exists" if method == "POST" else "File not found"})
+                content = data["content"]
+                content = base64.b64decode(content) if data.get("encoding") == "base64" else content
+                repository.commit(branch, {path: content}, data["commit_message"])
+                return _Response(201 if method == "POST" else 200, {"file_path": path, "branch": branch})
+            if method == "DELETE":
+                if path not in current:
+                    raise _NotFound()
+                repository.commit(branch, {path: None}, data["commit_message"])
+                return _Response(204)
+        if request == ("POST", "repository/commits"):
+            changes = {}
+            current = files(data["branch"])
+            for action in data["actions"]:
+                path = action["file_path"]
+                if action["action"] in ["update", "delete"] and path not in current:
+                    return _Response(400, {"message": f"A file with this name doesn't exist: {path}"})
+                if action["action"] == "create" and path in current:
+                    return _Response(400, {"message": f"A file with this name already exists: {path}"})
+                if action["action"] == "delete":
+                    changes[path] = None
+                elif action["action"] == "move":
+                    changes[path] = repository.blobs[current[action["previous_path"]]]
+                    changes[action["previous_path"]] = None
+                else:
+                    content = action.get("content", "")
+                    changes[path] = base64.b64decode(content) if action.get("encoding") == "base64" else content
+            sha = repository.commit(data["branch"], changes, data["commit_message"])
+            return _Response(201, {"id": sha, "short_id": sha[:8], "message": data["commit_message"]})
+        if request == ("GET", "repository/compare"):
+            files(data["from"]), files(data["to"])
+            return _Response(200, {"commits": [], "diffs": [change_json(c) for c in repository.changes(data["from"], data["to"])],
+                                   "compare_timeout": False, "compare_same_ref": data["from"] == data["to"]})
+        if request == ("GET", "repository/contributors"):
+            return _Response(200, [{"name": login, "email": f"{login}@example.com", "commits": 1}
+                                   for login in sorted(repository.collaborators)])
+
+        # merge requests, members
+        if request == ("POST", "merge_requests"):
+            if data["source_branch"] not in repository.branches or data["target_branch"] not in repository.branches:
+                return _Response(400, {"message": "Invalid branch"})
+            iid = repository.add_merge_request(data["title"], data["source_branch"], data["target_branch"],
+                                               data.get("description", ""), self.user)
+            return _Response(201, {"id": iid, "iid": iid, "title": data["title"], "state": "opened",
+                                   "web_url": f"{self.url}/{repository.full_name}/-/merge_requests/{iid}"})
+        if method == "GET" and len(route) == 3 and route[0] == "merge_requests" and route[2] in ["diffs", "changes"]:
+            if int(route[1]) not in repository.merge_requests or (route[2] == "diffs" and self.gitlab_version < (15, 7)):
+                raise _NotFound()
+            merge_request = repository.merge_requests[int(route[1])]
+            changes = repository.changes(merge_request["target_branch"], merge_request["source_branch"])
+            if route[2] == "changes":
+                return _Response(200, {"iid": merge_request["iid"], "changes": [change_json(c) for c in changes]})
+            return self._paginate(f"{base}/merge_requests/{route[1]}/diffs", query, [change_json(c) for c in changes], 20)
+        if method == "GET" and route[:2] == ["members", "all"] and len(route) == 3:
+            members = [u for u in repository.collaborators if _user_id(u) == int(route[2])]
+            if len(members) == 0:
+                raise _NotFound()
+            return _Response(200, {"id": int(route[2]), "username": members[0], "access_level": 30})
+
+        raise _NotFound()
@@ -0,0 +1,157 @@
+# This module provides a per-run cache of files in repositories, keyed by (repository, ref, path).
+# File contents are stored once per git blob sha (content-addressed), hence renamed and copied files
+# don't occupy memory twice. The git utilities update the cache whenever they write, rename, copy or delete
+# a file, so later reads in the same run don't need to go back to the server.
+# The size of the cache is bounded, least recently used files are evicted first.
+#
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+def git_blob_sha(content):
+    """Compute the sha git uses to identify a file with the given content (bytes)."""
+    return hashlib.sha1(b"blob " + str(len(content)).encode() + b"\0" + content).hexdigest()
+
+
+class CachedFile:
+    """A file with known content, mimicking the file objects returned by the remote host APIs."""
+
+    def __init__(self, path, sha, decoded_content):
+        self.path = path
+        self.name = path.split("/")[-1]
+        self.sha = sha
+        self.size = len(decoded_content)
+        self.decoded_content = decoded_content
+
+    def decode(self):
+        return self.decoded_content
+
+    def __repr__(self):
+        return f"CachedFile({self.path}, {self.sha})"
+
+
+class FileCache():
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(FileCache, cls).__new__(cls)
+            # files may be read concurrently, see git_bob._concurrency
+            cls._instance._lock = threading.RLock()
+            cls._instance.clear()
+        return cls._instance
+
+    def clear(self):
+        with self._lock:
+            # (repository, ref, path) -> blob sha, or None if the file is known to not exist;
+            # ordered from least to most recently used
+            self._entries = OrderedDict()
+            # blob sha -> content (bytes)
+            self._blobs = {}
+            # blob sha -> number of entries referring to it
+            self._references = {}
+            self._size = 0
+            self.max_entries = int(os.environ.get("GIT_BOB_FILE_CACHE_MAX_ENTRIES", "10000"))
+            self.max_size = int(float(os.environ.get("GIT_BOB_FILE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+    def get(self, repository, ref, path):
+        """
+        Look up a file.
+
+        Returns
+        -------
+        tuple
+            (True, CachedFile) if the file is known, (True, None) if the file is known to not exist,
+            (False, None) if the file isn't in the cache.
+        """
+        with self._lock:
+            key = (repository, ref, path)
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            sha = self._entries[key]
+            if sha is None:
+                return True, None
+            return True, CachedFile(path, sha, self._blobs[sha])
+
+    def put(self, repository, ref, path, content, sha=None):
+        """Store the content (bytes or str) of a file and return it as CachedFile."""
+        with self._lock:
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            if sha is None:
+                sha = git_blob_sha(content)
+            self._forget_entry((repository, ref, path))
+            self._entries[(repository, ref, path)] = sha
+            if sha not in self._blobs:
+                self._blobs[sha] = content
+                self._size += len(content)
+            self._references[sha] = self._references.get(sha, 0) + 1
+            self._evict()
+            return CachedFile(path, sha, content)
+
+    def put_missing(self, repository, ref, path):
+        """Remember that a file doesn't exist, e.g. after it was deleted."""
+        with self._lock:
+            self._forget_entry((repository, ref, path))
+            self._entries[(repository, ref, path)] = None
+            self._evict()
+
+    def forget(self, repository, ref, path):
+        """Remove a file from the cache, e.g. if its content is unknown after a modification."""
+        with self._lock:
+            self._forget_entry((repository, ref, path))
+
+    def copy(self, repository, ref, src_path, dest_path):
+        with self._lock:
+            key = (repository, ref, src_path)
+            if self._entries.get(key) is None:
+                self.forget(repository, ref, dest_path)
+                return
+            sha = self._entries[key]
+            self.put(repository, ref, dest_path, self._blobs[sha], sha)
+
+    def rename(self, repository, ref, old_path, new_path):
+        with self._lock:
+            self.copy(repository, ref, old_path, new_path)
+            self.put_missing(repository, ref, old_path)
+
+    def apply_changeset(self, changeset):
+        """Update the cache after a git_bob._changeset.Changeset was committed."""
+        with self._lock:
+            from ._changeset import BlobReference
+            repository, ref = changeset.repository, changeset.branch_name
+
+            # references point to files before the changeset was applied, hence they are resolved first
+            resolved = {}
+            for path, content in changeset.files.items():
+                if isinstance(content, BlobReference):
+                    known, file = self.get(repository, ref, content.path)
+                    resolved[path] = file
+
+            for path, content in changeset.files.items():
+                if content is None:
+                    self.put_missing(repository, ref, path)
+                elif isinstance(content, BlobReference):
+                    if resolved[path] is None:
+                        self.forget(repository, ref, path)
+                    else:
+                        self.put(repository, ref, path, resolved[path].decoded_content, resolved[path].sha)
+                else:
+                    self.put(repository, ref, path, content)
+
+    def _forget_entry(self, key):
+        sha = self._entries.pop(key, None)
+        if sha is None:
+            return
+        self._references[sha] -= 1
+        if self._references[sha] == 0:
+            del self._references[sha]
+            self._size -= len(self._blobs.pop(sha))
+
+    def _evict(self):
+        # the most recently added entry is kept, even if it exceeds the limits on its own
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._size > self.max_size):
+            self._forget_entry(next(iter(self._entries)))
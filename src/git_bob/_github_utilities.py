@@ -2,10 +2,10 @@
 # https://github.com/PyGithub/PyGithub (licensed LGPL3)
 # 
 import os
-from functools import lru_cache
 from ._logger import Log
+from ._changeset import get_changeset
+from ._file_cache import FileCache
 
-@lru_cache(maxsize=1)
 def get_repository_handle(repository):
     """
     Get the GitHub repository object.
@@ -20,15 +20,8 @@ def get_repository_handle(repository):
     github.Repository.Repository
         The GitHub repository object.
     """
-    from github import Github
-    from github.Auth import Token
-    access_token = os.getenv('GITHUB_API_KEY')
-
-    # Create a PyGithub instance using the access token
-    g = Github(auth=Token(access_token))
-
-    # Get the repository object
-    return g.get_repo(repository)
+    from ._client_pool import get_github_repository
+    return get_github_repository(repository)
 
 
 def add_comment_to_issue(repository, issue, comment):
@@ -57,6 +50,7 @@ def add_comment_to_issue(repository, issue, comment):
 
     # Add a new comment to the issue
     issue_obj.create_comment(comment)
+    _forget_issue_conversation(repository, issue)
 
     print(f"Comment added to issue #{issue} in repository {repository}.")
 
@@ -79,49 +73,209 @@ def get_conversation_on_issue(repository, issue):
     """
     Log().log(f"-> get_conversation_on_issue({repository}, {issue})")
 
-    repo = get_repository_handle(repository)
-
-    # Get the issue by number
-    issue_obj = repo.get_issue(issue)
+    conversation_data = get_issue_conversation(repository, issue)
 
     # Get the conversation as a string
-    conversation = f"Issue Title: {issue_obj.title}\n\n"
-    conversation += f"Issue Body:\n{issue_obj.body}\n\n"
-
-    # Get all comments on the issue
-    comments = issue_obj.get_comments()
+    conversation = f"Issue Title: {conversation_data['title']}\n\n"
+    conversation += f"Issue Body:\n{conversation_data['body']}\n\n"
 
     # Append each comment to the conversation string
-    for comment in comments:
-        conversation += f"Comment by {comment.user.login}:\n{comment.body}\n\n"
+    for comment in conversation_data['comments']:
+        conversation += f"Comment by {comment['author']}:\n{comment['body']}\n\n"
 
     return conversation
 
 
-def get_most_recently_commented_issue(repository):
+_ISSUE_CONVERSATION_FIELDS = """
+        number
+        title
+        body
+        state
+        createdAt
+        updatedAt
+        closedAt
+        author { __typename login }
+        assignees(first: 100) { nodes { login } }
+        labels(first: 100) { nodes { name } }
+        comments(first: 100, after: $cursor) {
+          totalCount
+          pageInfo { hasNextPage endCursor }
+          nodes { author { __typename login } body createdAt }
+        }
+"""
+
+_ISSUE_CONVERSATION_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    issueOrPullRequest(number: $number) {
+      ... on Issue {""" + _ISSUE_CONVERSATION_FIELDS + """      }
+      ... on PullRequest {""" + _ISSUE_CONVERSATION_FIELDS + """      }
+    }
+  }
+}
+"""
+
+# conversations fetched during this run, keyed by (repository, issue)
+_issue_conversations = {}
+
+
+def get_issue_conversation(repository, issue):
     """
-    Return the issue number of the issue in a repository where the last comment was posted.
+    Retrieve title, body, metadata and all comments of a GitHub issue or pull-request.
+
+    The data is fetched using a single paginated GraphQL query (one round trip per 100 comments).
+    If the GraphQL API is not available, the REST API is used as fallback.
+    The result is kept for the rest of the run, until the issue is modified by git-bob.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the GitHub repository (e.g., "username/repo-name").
+    issue : int
+        The issue number to retrieve the conversation for.
+
+    Returns
+    -------
+    dict
+        A dictionary with the keys number, title, body, state, created_at, updated_at, closed_at,
+        author, assignees, labels and comments. Comments are dictionaries with author, body and created_at.
     """
-    Log().log(f"-> get_most_recently_commented_issue({repository})")
+    key = (repository, int(issue))
+    if key not in _issue_conversations:
+        try:
+            _issue_conversations[key] = _get_issue_conversation_graphql(repository, issue)
+        except Exception as e:
+            print("GraphQL query failed, falling back to REST API:", e)
+            _issue_conversations[key] = _get_issue_conversation_rest(repository, issue)
+    return _issue_conversations[key]
+
+
+def _forget_issue_conversation(repository, issue):
+    """Remove a conversation from the cache, e.g. after it was modified."""
+    _issue_conversations.pop((repository, int(issue)), None)
+
+
+def forget_issue_conversations():
+    """Remove all conversations from the cache, e.g. before a long-running process handles the next event."""
+    _issue_conversations.clear()
+
+
+def _get_issue_conversation_graphql(repository, issue):
+    """Fetch an issue conversation using the GraphQL API, see get_issue_conversation."""
+    from datetime import datetime
+
+    def parse_date(text):
+        if text is None:
+            return None
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+
+    def login(actor):
+        # deleted accounts are returned as null
+        if actor is None:
+            return "ghost"
+        # GraphQL returns bots without the suffix the REST API (and hence access checks) use, e.g. "github-actions"
+        if actor.get("__typename") == "Bot" and not actor["login"].endswith("[bot]"):
+            return actor["login"] + "[bot]"
+        return actor["login"]
+
     repo = get_repository_handle(repository)
+    owner, name = repo.full_name.split("/")
+
+    conversation = None
+    cursor = None
+    while True:
+        _, data = repo.requester.graphql_query(_ISSUE_CONVERSATION_QUERY, {
+            "owner": owner, "name": name, "number": int(issue), "cursor": cursor})
+        node = data["data"]["repository"]["issueOrPullRequest"]
+        if node is None:
+            raise ValueError(f"Issue #{issue} not found in {repository}")
+
+        if conversation is None:
+            state = node["state"].lower()
+            conversation = {
+                "number": node["number"],
+                "title": node["title"],
+                "body": node["body"],
+                "state": "closed" if state == "merged" else state,
+                "created_at": parse_date(node["createdAt"]),
+                "updated_at": parse_date(node["updatedAt"]),
+                "closed_at": parse_date(node["closedAt"]),
+                "author": login(node["author"]),
+                "assignees": [a["login"] for a in node["assignees"]["nodes"]],
+                "labels": [label["name"] for label in node["labels"]["nodes"]],
+                "comments": [],
+            }
+
+        comments = node["comments"]
+        for comment in comments["nodes"]:
+            conversation["comments"].append({
+                "author": login(comment["author"]),
+                "body": comment["body"],
+                "created_at": parse_date(comment["createdAt"]),
+            })
+
+        if not comments["pageInfo"]["hasNextPage"]:
+            break
+        cursor = comments["pageInfo"]["endCursor"]
 
-    most_recent_comment = None
-    issue = None
+    return conversation
 
-    # Loop through all issues
-    for i in repo.get_issues(state="all"):
-        comments = i.get_comments()
 
-        # Loop through each comment in the issue
-        for comment in comments:
-            if most_recent_comment is None or comment.created_at > most_recent_comment.created_at:
-                most_recent_comment = comment
-                issue = i
+def _get_issue_conversation_rest(repository, issue):
+    """Fetch an issue conversation using the REST API, see get_issue_conversation."""
+    repo = get_repository_handle(repository)
+
+    # Get the issue by number
+    issue_obj = repo.get_issue(issue)
+
+    return {
+        "number": issue_obj.number,
+        "title": issue_obj.title,
+        "body": issue_obj.body,
+        "state": issue_obj.state,
+        "created_at": issue_obj.created_at,
+        "updated_at": issue_obj.updated_at,
+        "closed_at": issue_obj.closed_at,
+        "author": issue_obj.user.login,
+        "assignees": [assignee.login for assignee in issue_obj.assignees],
+        "labels": [label.name for label in issue_obj.labels],
+        "comments": [{"author": comment.user.login,
+                      "body": comment.body,
+                      "created_at": comment.created_at} for comment in issue_obj.get_comments()],
+    }
+
+
+def get_most_recently_commented_issue(repository, since=None):
+    """
+    Return the issue number of the issue in a repository where the last comment was posted.
+
+    Uses the repository-wide issue-comments endpoint sorted by creation date, hence only a single request is necessary.
+    Pull-requests count as issues here.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the GitHub repository (e.g., "username/repo-name").
+    since : datetime, optional
+        Only consider comments which were created or updated after this point in time.
+
+    Returns
+    -------
+    int
+        The number of the issue / pull-request
+    """
+    Log().log(f"-> get_most_recently_commented_issue({repository})")
+    from github.GithubObject import NotSet
+    repo = get_repository_handle(repository)
 
-    if issue is None:
+    comments = repo.get_issues_comments(sort="created", direction="desc", since=NotSet if since is None else since)
+    try:
+        most_recent_comment = comments[0]
+    except IndexError:
         raise ValueError("No issue number provided")
 
-    return issue.number
+    # e.g. https://api.github.com/repos/username/repo-name/issues/123
+    return int(most_recent_comment.issue_url.split("/")[-1])
 
 
 def get_most_recent_comment_on_issue(repository, issue):
@@ -141,26 +295,20 @@ def get_most_recent_comment_on_issue(repository, issue):
         A tuple containing the username of the commenter and the comment text.
     """
     Log().log(f"-> get_most_recent_comment_on_issue({repository}, {issue})")
-    repo = get_repository_handle(repository)
 
-
-    # Get the issue by number
-    issue_obj = repo.get_issue(issue)
-
-    # Get all comments on the issue
-    comments = issue_obj.get_comments()
+    conversation = get_issue_conversation(repository, issue)
 
     # return last comment
-    comments = list(comments)
+    comments = conversation["comments"]
     if len(comments) > 0:
         comment = comments[-1]
 
-        user = comment.user.login
-        text = comment.body
+        user = comment["author"]
+        text = comment["body"]
 
     else:
-        user = issue_obj.user.login
-        text = issue_obj.body
+        user = conversation["author"]
+        text = conversation["body"]
 
     if text is None:
         text = ""
@@ -217,32 +365,30 @@ def get_issue_details(repository: str, issue: int) -> str:
     """
     Log().log(f"-> get_github_issue_details({repository}, {issue})")
 
-    repo = get_repository_handle(repository)
-
     # Fetch the specified issue
-    issue = repo.get_issue(number=issue)
+    issue = get_issue_conversation(repository, issue)
+    comments = issue['comments']
 
     # Format issue details
     content = f"""
-Issue #{issue.number}: {issue.title}
-State: {issue.state}
-Created at: {issue.created_at}
-Updated at: {issue.updated_at}
-Closed at: {issue.closed_at}
-Author: {issue.user.login}
-Assignees: {', '.join([assignee.login for assignee in issue.assignees])}
-Labels: {', '.join([label.name for label in issue.labels])}
-Comments: {issue.comments}
+Issue #{issue['number']}: {issue['title']}
+State: {issue['state']}
+Created at: {issue['created_at']}
+Updated at: {issue['updated_at']}
+Closed at: {issue['closed_at']}
+Author: {issue['author']}
+Assignees: {', '.join(issue['assignees'])}
+Labels: {', '.join(issue['labels'])}
+Comments: {len(comments)}
 Body:
-{issue.body}
+{issue['body']}
 """
 
     # Add comments if any
-    if issue.comments > 0:
+    if len(comments) > 0:
         content += "\n\nComments:"
-        comments = issue.get_comments()
         for comment in comments:
-            content += f"\n\nComment by {comment.user.login} on {comment.created_at}:\n{comment.body}"
+            content += f"\n\nComment by {comment['author']} on {comment['created_at']}:\n{comment['body']}"
 
     return content
 
@@ -251,8 +397,8 @@ def list_repository_files(repository: str, branch_name: str = None, file_pattern
     """
     List all files in a given GitHub repository.
 
-    This function uses the GitHub API to retrieve and list all files
-    in the specified repository.
+    This function uses the Git Trees API of GitHub to retrieve the entire file tree
+    of the specified branch in a single request.
 
     Parameters
     ----------
@@ -275,26 +421,105 @@ def list_repository_files(repository: str, branch_name: str = None, file_pattern
     # Initialize Github client
     repo = get_repository_handle(repository)
 
-    # Get all contents of the repository
-    contents = repo.get_contents("", ref=branch_name)
-
     # List to store all file paths
     all_files = []
+    for element in _list_git_tree(repo, branch_name):
+        if element["type"] == "blob":
+            if file_patterns is None or any([f in element["path"] for f in file_patterns]):
+                all_files.append(element["path"])
 
-    # Iterate through all contents
-    while contents:
-        file_content = contents.pop(0)
-        if file_content.type == "dir":
-            # If it's a directory, get its contents and add them to the list
-            contents.extend(repo.get_contents(file_content.path, ref=branch_name))
-        else:
-            # If it's a file, add its path to the list
-            if file_patterns is None or any([f in file_content.path for f in file_patterns]):
-                all_files.append(file_content.path)
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        all_files = [f for f in changeset.apply_to_file_list(all_files) if file_patterns is None or any([p in f for p in file_patterns])]
 
     return all_files
 
 
+def _list_git_tree(repo, tree_sha, path_prefix=""):
+    """
+    List all elements of a git tree recursively.
+
+    If GitHub truncates the recursive listing because the tree is too large,
+    the tree is listed level by level and each sub-tree is requested recursively again.
+
+    Parameters
+    ----------
+    repo : github.Repository.Repository
+        The GitHub repository object.
+    tree_sha : str
+        The sha of the tree, or a branch name / commit sha.
+    path_prefix : str, optional
+        The path of the tree within the repository.
+
+    Returns
+    -------
+    list
+        A list of dictionaries with the keys path, mode, type and sha. Paths are relative to the repository root.
+    """
+    def with_prefix(element):
+        return {"path": path_prefix + element.path, "mode": element.mode, "type": element.type, "sha": element.sha}
+
+    tree = repo.get_git_tree(tree_sha, recursive=True)
+    if not tree.truncated:
+        return [with_prefix(element) for element in tree.tree]
+
+    print("Tree listing was truncated, listing", path_prefix if len(path_prefix) > 0 else "/", "level by level")
+    elements = []
+    for element in repo.get_git_tree(tree_sha).tree:
+        elements.append(with_prefix(element))
+        if element.type == "tree":
+            elements.extend(_list_git_tree(repo, element.sha, path_prefix + element.path + "/"))
+    return elements
+
+
+def _lookup_git_tree_entries(repo, tree_sha, file_paths):
+    """
+    Look up the given files in a git tree, without listing the whole tree.
+
+    Only the directories containing the files are listed (non-recursively), hence the number of requests
+    depends on the number of affected directories, not on the size of the repository.
+
+    Parameters
+    ----------
+    repo : github.Repository.Repository
+        The GitHub repository object.
+    tree_sha : str
+        The sha of the root tree.
+    file_paths : list of str
+        Paths relative to the repository root.
+
+    Returns
+    -------
+    dict
+        For every existing file path, a dictionary with the keys path, mode, type and sha.
+    """
+    trees = {"": tree_sha}
+    listings = {}
+
+    def list_directory(directory):
+        if directory not in listings:
+            if directory not in trees:
+                parent, _, name = directory.rpartition("/")
+                element = list_directory(parent).get(name)
+                if element is None or element["type"] != "tree":
+                    listings[directory] = {}
+                    return listings[directory]
+                trees[directory] = element["sha"]
+            prefix = directory + "/" if len(directory) > 0 else ""
+            listings[directory] = {element.path: {"path": prefix + element.path, "mode": element.mode,
+                                                  "type": element.type, "sha": element.sha}
+                                   for element in repo.get_git_tree(trees[directory]).tree}
+        return listings[directory]
+
+    entries = {}
+    for file_path in file_paths:
+        directory, _, name = file_path.rpartition("/")
+        element = list_directory(directory).get(name)
+        if element is not None and element["type"] == "blob":
+            entries[file_path] = element
+    return entries
+
+
 def get_repository_file_contents(repository: str, branch_name, file_paths: list) -> dict:
     """
     Retrieve the contents of specified files from a GitHub repository.
@@ -314,19 +539,20 @@ def get_repository_file_contents(repository: str, branch_name, file_paths: list)
         A dictionary where keys are file paths and values are the contents of the files.
     """
     Log().log(f"-> get_repository_file_contents({repository}, {branch_name}, {file_paths})")
+    from functools import partial
+    from ._concurrency import run_concurrently
+
+    # Retrieve the files concurrently
+    files = run_concurrently([partial(get_file_in_repository, repository, branch_name, file_path) for file_path in file_paths],
+                             return_exceptions=True)
 
     # Dictionary to store file contents
     file_contents = {}
-
-    # Iterate through the file paths
-    for file_path in file_paths:
+    for file_path, file in zip(file_paths, files):
         try:
-            # Get the file content
-            file_content = decode_file(get_file_in_repository(repository, branch_name, file_path))
-
-            # store the content
-            file_contents[file_path] = file_content
-
+            if isinstance(file, Exception):
+                raise file
+            file_contents[file_path] = decode_file(file)
         except Exception as e:
             file_contents[file_path] = f"Error accessing {file_path}: {str(e)}"
 
@@ -362,13 +588,19 @@ def write_file_in_branch(repository, branch_name, file_path, new_content, commit
     repo = get_repository_handle(repository)
 
     # Commit the changes
-    if check_if_file_exists(repository, branch_name, file_path):
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        print("record file", file_path)
+        changeset.write(file_path, new_content, commit_message)
+    elif check_if_file_exists(repository, branch_name, file_path):
         file = get_file_in_repository(repository, branch_name, file_path)
         print("update file", file_path, file.sha)
         repo.update_file(file.path, commit_message, new_content, file.sha, branch=branch_name)
+        FileCache().put(repository, branch_name, file_path, new_content)
     else:
         print("create file", file_path)
         repo.create_file(file_path, commit_message, new_content, branch=branch_name)
+        FileCache().put(repository, branch_name, file_path, new_content)
 
     # ensure the folder extists
     path_name = str(os.path.dirname(file_path))
@@ -468,8 +700,13 @@ def get_file_in_repository(repository, branch_name, file_path):
 
     Returns
     -------
-    github.ContentFile.ContentFile
-        The content file object of the specified file.
+    git_bob._file_cache.CachedFile
+        The file object of the specified file, or a list of github.ContentFile.ContentFile if file_path is a folder.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file doesn't exist in the branch.
     """
     print(f"-> get_file_in_repository({repository}, {branch_name}, {file_path})")
     if file_path.endswith(")"):
@@ -483,9 +720,36 @@ def get_file_in_repository(repository, branch_name, file_path):
         print("fixing file path")
         file_path = file_path[:-9]
 
-    print("loading file content...", file_path)
     repo = get_repository_handle(repository)
-    return repo.get_contents(file_path, ref=branch_name)
+
+    def read_from_branch(path):
+        # files which were read or written before in this run are served from the cache
+        known, file = FileCache().get(repository, branch_name, path)
+        if known:
+            if file is None:
+                raise FileNotFoundError(f"{path} does not exist in {repository} branch {branch_name}")
+            return file
+
+        print("loading file content...", path)
+        from github.GithubException import UnknownObjectException
+        try:
+            content_file = repo.get_contents(path, ref=branch_name)
+        except UnknownObjectException as e:
+            FileCache().put_missing(repository, branch_name, path)
+            raise FileNotFoundError(f"{path} does not exist in {repository} branch {branch_name}") from e
+        if isinstance(content_file, list):
+            # a folder
+            return content_file
+        try:
+            content = content_file.decoded_content
+        except AssertionError:
+            content = _download_content(content_file)
+        return FileCache().put(repository, branch_name, path, content, content_file.sha)
+
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None and changeset.is_modified(file_path):
+        return changeset.get_file(file_path, read_from_branch)
+    return read_from_branch(file_path)
 
 
 def send_pull_request(repository, source_branch, target_branch, title, description):
@@ -550,14 +814,14 @@ def check_access_and_ask_for_approval(user, repository, issue):
     groups = os.getenv('GIT_BOB_ACCESS_GROUPS', 'members').split(',')
 
     from ._ai_github_utilities import setup_ai_remark
+    from ._utilities import cached_access_decision
     access = False
 
     repo = get_repository_handle(repository)
 
-    members = [member.login for member in repo.get_collaborators()]
-
     if "members" in groups:
-        if user in members:
+        # a single request for the given user instead of listing all collaborators
+        if cached_access_decision(repository, user, lambda: repo.has_in_collaborators(user)):
             access = True
     if "bot" in groups:
         if user == "github-actions[bot]":
@@ -607,30 +871,31 @@ def get_diff_of_pull_request(repository, pull_request):
         
     Returns
     -------
-    str
-        The diff of the pull request.
+    git_bob._diff.Diff
+        The diff of the pull request, limited to the configured budgets. Use str() to render it.
     """
-    import requests
+    from urllib.parse import urlparse
+    from ._client_pool import get_session
+    from ._diff import Diff, parse_unified_diff
 
     Log().log(f"-> get_diff_of_pull_request({repository}, {pull_request})")
-    repo = get_repository_handle(repository)
     access_token = os.getenv('GITHUB_API_KEY')
 
-    pull_request = repo.get_pull(pull_request)
-
     # Use GitHub's REST API endpoint for diffs with proper Accept header
-    api_url = f"https://api.github.com/repos/{repository}/pulls/{pull_request.number}"
+    base_url = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+    api_url = f"{base_url}/repos/{repository}/pulls/{pull_request}"
     headers = {
         'Authorization': f'token {access_token}',
         'Accept': 'application/vnd.github.v3.diff'
     }
-    
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 200:
-        return response.text
-    else:
-        print("Error:", response.status_code, response.text)
-        return ""
+
+    # the diff is parsed while it is downloaded; downloading stops when the budget is used up
+    with get_session(urlparse(base_url).hostname).get(api_url, headers=headers, stream=True) as response:
+        if response.status_code != 200:
+            print("Error:", response.status_code, response.text)
+            return Diff()
+        lines = (line.decode("utf-8", errors="replace") for line in response.iter_lines())
+        return parse_unified_diff(lines)
 
 
 def add_reaction_to_issue(repository, issue, reaction="+1"):
@@ -697,9 +962,11 @@ def get_diff_of_branches(repository, compare_branch, base_branch=None):
         The base branch to compare against. Default is "main".
     Returns
     -------
-    str
-        The diff between the specified branches as a string.
+    git_bob._diff.Diff
+        The diff between the specified branches, limited to the configured budgets. Use str() to render it.
     """
+    from ._diff import Diff
+
     if base_branch is None:
         base_branch = get_default_branch_name(repository)
 
@@ -708,18 +975,12 @@ def get_diff_of_branches(repository, compare_branch, base_branch=None):
 
     # Get the comparison between branches
     comparison = repo.compare(base_branch, compare_branch)
-    # Initialize output variable
-    output = []
     # Collect the diff
+    diff = Diff()
     for file in comparison.files:
-        output.append(f"\nFile: {file.filename}")
-        output.append(f"Status: {file.status}")
-        output.append("-" * 40)
-        if file.patch:
-            output.append(file.patch)
-        else:
-            output.append("No diff available (possibly a binary file)")
-    return "\n".join(output)
+        # GitHub provides no patch for binary files
+        diff.add_patch(file.filename, file.patch if file.patch else None, file.status, file.previous_filename)
+    return diff
 
 
 def rename_file_in_repository(repository, branch_name, old_file_path, new_file_path, commit_message="Rename file"):
@@ -746,19 +1007,22 @@ def rename_file_in_repository(repository, branch_name, old_file_path, new_file_p
     """
     Log().log(f"-> rename_file_in_repository({repository}, {branch_name}, {old_file_path}, {new_file_path})")
 
-    # Authenticate with GitHub
-    repo = get_repository_handle(repository)
-
-    file = get_file_in_repository(repository, branch_name, old_file_path)
-    # Create a new file with the old content at the new path
-    repo.create_file(new_file_path, commit_message, decode_file(file), branch=branch_name)
-
-    # Delete the old file
-    repo.delete_file(old_file_path, commit_message, file.sha, branch=branch_name)
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        changeset.rename(old_file_path, new_file_path, commit_message)
+    else:
+        # a single commit reusing the existing blob, the file content is not transferred
+        from ._changeset import Changeset
+        changeset = Changeset(repository, branch_name)
+        changeset.rename(old_file_path, new_file_path, commit_message)
+        commit_changeset(repository, changeset)
 
     # move file locally using shutil
-    import shutil
-    shutil.move(old_file_path, new_file_path)
+    if os.path.exists(old_file_path):
+        import shutil
+        if len(os.path.dirname(new_file_path)) > 0:
+            os.makedirs(os.path.dirname(new_file_path), exist_ok=True)
+        shutil.move(old_file_path, new_file_path)
 
 
 def decode_file(file):
@@ -791,31 +1055,42 @@ def decode_file(file):
         return file.decoded_content.decode()
     except AssertionError:
         # Fallback for "encoding: none" (e.g., large files)
-        import requests
-        import base64
+        return _download_content(file).decode()
 
-        token = os.getenv("GITHUB_API_KEY")
-        headers = {"Authorization": f"token {token}"} if token else {}
 
-        # 1) Try raw download URL
-        download_url = getattr(file, "download_url", None)
-        if download_url:
-            r = requests.get(download_url, headers=headers)
-            r.raise_for_status()
-            return r.content.decode()
+def _download_content(file):
+    """
+    Download the content of a GitHub ContentFile as bytes, for files where GitHub returns encoding 'none' (e.g., large files).
 
-        # 2) Fallback to Git blob API (always base64)
-        git_url = getattr(file, "git_url", None)
-        if git_url:
-            r = requests.get(git_url, headers=headers)
-            r.raise_for_status()
-            data = r.json()
-            if data.get("encoding") == "base64" and "content" in data:
-                content = base64.b64decode(data["content"])
-                return content.decode()
+    Raises
+    ------
+    AssertionError
+        If no download path is available.
+    """
+    import requests
+    import base64
 
-        # If neither path worked, re-raise for caller to handle
-        raise
+    token = os.getenv("GITHUB_API_KEY")
+    headers = {"Authorization": f"token {token}"} if token else {}
+
+    # 1) Try raw download URL
+    download_url = getattr(file, "download_url", None)
+    if download_url:
+        r = requests.get(download_url, headers=headers)
+        r.raise_for_status()
+        return r.content
+
+    # 2) Fallback to Git blob API (always base64)
+    git_url = getattr(file, "git_url", None)
+    if git_url:
+        r = requests.get(git_url, headers=headers)
+        r.raise_for_status()
+        data = r.json()
+        if data.get("encoding") == "base64" and "content" in data:
+            return base64.b64decode(data["content"])
+
+    # If neither path worked, raise for caller to handle
+    raise AssertionError(f"Unable to download content of {file.path}")
 
 
 def delete_file_from_repository(repository, branch_name, file_path, commit_message="Delete file"):
@@ -843,8 +1118,14 @@ def delete_file_from_repository(repository, branch_name, file_path, commit_messa
     # Authenticate with GitHub
     repo = get_repository_handle(repository)
 
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        changeset.delete(file_path, commit_message)
+        return
+
     file = get_file_in_repository(repository, branch_name, file_path)
     repo.delete_file(file.path, commit_message, file.sha, branch=branch_name)
+    FileCache().put_missing(repository, branch_name, file_path)
 
 
 def copy_file_in_repository(repository, branch_name, src_file_path, dest_file_path, commit_message="Copy file"):
@@ -871,26 +1152,34 @@ def copy_file_in_repository(repository, branch_name, src_file_path, dest_file_pa
     """
     Log().log(f"-> copy_file_in_repository({repository}, {branch_name}, {src_file_path}, {dest_file_path})")
 
-    # Authenticate with GitHub
-    repo = get_repository_handle(repository)
-
-    file = get_file_in_repository(repository, branch_name, src_file_path)
-    file_content = decode_file(file)
-
-    # Create a new file with the old content at the new path
-    repo.create_file(dest_file_path, commit_message, file_content, branch=branch_name)
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        changeset.copy(src_file_path, dest_file_path, commit_message)
+    else:
+        # a single commit reusing the existing blob, the file content is not transferred
+        from ._changeset import Changeset
+        changeset = Changeset(repository, branch_name)
+        changeset.copy(src_file_path, dest_file_path, commit_message)
+        commit_changeset(repository, changeset)
 
-    # save the file
-    with open(dest_file_path, "w") as f:
-        f.write(file_content)
+    # copy the file locally
+    if os.path.exists(src_file_path):
+        import shutil
+        if len(os.path.dirname(dest_file_path)) > 0:
+            os.makedirs(os.path.dirname(dest_file_path), exist_ok=True)
+        shutil.copyfile(src_file_path, dest_file_path)
 
 
 def download_to_repository(repository, branch_name, source_url, target_filename):
-    """Download a file from a URL and upload it to a GitHub repository."""
-    import requests
-    import base64
-    from github import Github
-    from ._logger import Log
+    """
+    Download a file from a URL and upload it to a GitHub repository.
+
+    The file is streamed to disk (see git_bob._utilities.download_source_file). Files larger than
+    GIT_BOB_LFS_THRESHOLD_MB are uploaded to Git LFS and only a pointer file is committed, see git_bob._lfs.
+    """
+    import shutil
+    from ._utilities import Config, download_source_file
+    from ._lfs import lfs_threshold, lfs_gitattributes, upload_to_lfs
     Log().log(f"-> download_to_repository({repository}, {branch_name}, {source_url}, {target_filename})")
 
     if not (source_url.startswith("https://github.com") or source_url.startswith("https://raw.githubusercontent.com")):
@@ -899,32 +1188,97 @@ def download_to_repository(repository, branch_name, source_url, target_filename)
     if source_url.endswith(")"): # happens with ![]() markdown syntax
         source_url = source_url[:-1]
 
-    # Download the file
-    response = requests.get(source_url)
-    if response.status_code == 200:
-        file_content = response.content
-    else:
-        raise Exception(f"Failed to download file. Status code: {response.status_code}")
+    commit_message = f"Downloaded {source_url}, saved as {target_filename}."
 
-    # Upload the file to the GitHub repository using the GitHub API
-    repo = get_repository_handle(repository)
+    # partial downloads are kept in the cache directory, hence the next run resumes them
+    downloaded_filename, oid = download_source_file(source_url)
+    try:
+        if os.path.getsize(downloaded_filename) <= lfs_threshold():
+            with open(downloaded_filename, "rb") as file:
+                file_content = file.read()
+            # Upload the file to the GitHub repository using the GitHub API, this also saves the file locally
+            write_file_in_branch(repository, branch_name, target_filename, file_content, commit_message)
+        else:
+            pointer = upload_to_lfs(Config.git_server_url, repository, "x-access-token", os.getenv('GITHUB_API_KEY'),
+                                    downloaded_filename, oid)
+            try:
+                gitattributes = decode_file(get_file_in_repository(repository, branch_name, ".gitattributes"))
+            except FileNotFoundError:
+                gitattributes = None
+            gitattributes = lfs_gitattributes(gitattributes, target_filename)
+            if gitattributes is not None:
+                write_file_in_branch(repository, branch_name, ".gitattributes", gitattributes, f"Track {target_filename} using Git LFS")
+            write_file_in_branch(repository, branch_name, target_filename, pointer, commit_message)
+            # locally, the actual file replaces the pointer
+            shutil.move(downloaded_filename, target_filename)
+    finally:
+        if os.path.exists(downloaded_filename):
+            os.remove(downloaded_filename)
+    print(f"File '{target_filename}' successfully uploaded.")
+
+
+def commit_changeset(repository, changeset):
+    """
+    Publish all modifications collected in a changeset as a single commit, using GitHub's Git Data API.
 
-    commit_message = f"Downloaded {source_url}, saved as {target_filename}."
+    Independent of the number of modified files, this creates one tree, one commit and one reference update.
+    Renamed and copied files reuse the existing blobs, their content is not transferred.
 
-    # save the file locally
-    with open(target_filename, "wb") as f:
-        f.write(file_content)
+    Parameters
+    ----------
+    repository : str
+        The full name of the GitHub repository (e.g., "username/repo-name").
+    changeset : git_bob._changeset.Changeset
+        The collected modifications, see git_bob._changeset.start_changeset.
 
-    # Check if the file already exists
-    try:
-        contents = repo.get_contents(target_filename)
-        # If file exists, we need to update it
-        repo.update_file(contents.path, commit_message, file_content, contents.sha, branch=branch_name)
-        print(f"File '{target_filename}' successfully updated.")
-    except:
-        # If file does not exist, create a new one
-        repo.create_file(target_filename, commit_message, file_content, branch=branch_name)
-        print(f"File '{target_filename}' successfully uploaded.")
+    Returns
+    -------
+    str
+        The sha of the new commit, or None if there was nothing to commit.
+    """
+    Log().log(f"-> commit_changeset({repository}, {changeset.branch_name}, {len(changeset.files)} files)")
+    import base64
+    from github.InputGitTreeElement import InputGitTreeElement
+    from ._changeset import BlobReference
+
+    if changeset.is_empty():
+        return None
+    if get_changeset(repository, changeset.branch_name) is changeset:
+        raise RuntimeError("Stop the changeset before committing it.")
+
+    repo = get_repository_handle(repository)
+    ref = repo.get_git_ref(f"heads/{changeset.branch_name}")
+    parent = repo.get_git_commit(ref.object.sha)
+    # only the affected files are looked up, not the whole tree of the repository
+    affected_paths = set(changeset.files.keys())
+    affected_paths.update([c.path for c in changeset.files.values() if isinstance(c, BlobReference)])
+    base_files = _lookup_git_tree_entries(repo, parent.tree.sha, sorted(affected_paths))
+
+    elements = []
+    for path, content in changeset.files.items():
+        if content is None:
+            if path in base_files:
+                elements.append(InputGitTreeElement(path, base_files[path]["mode"], "blob", sha=None))
+        elif isinstance(content, BlobReference):
+            if content.path not in base_files:
+                raise FileNotFoundError(f"{content.path} does not exist in branch {changeset.branch_name}")
+            source = base_files[content.path]
+            elements.append(InputGitTreeElement(path, source["mode"], "blob", sha=source["sha"]))
+        else:
+            mode = base_files[path]["mode"] if path in base_files else "100644"
+            try:
+                elements.append(InputGitTreeElement(path, mode, "blob", content=content.decode("utf-8")))
+            except UnicodeDecodeError:
+                blob = repo.create_git_blob(base64.b64encode(content).decode("utf-8"), "base64")
+                elements.append(InputGitTreeElement(path, mode, "blob", sha=blob.sha))
+
+    tree = repo.create_git_tree(elements, parent.tree)
+    commit = repo.create_git_commit(changeset.commit_message(), tree, [parent])
+    ref.edit(commit.sha)
+    FileCache().apply_changeset(changeset)
+
+    print(f"Committed {len(changeset.files)} files to {changeset.branch_name}: {commit.sha}")
+    return commit.sha
 
 
 def create_issue(repository, title, description):
@@ -982,3 +1336,4 @@ def close_issue(repository, issue_number):
 
     # Close the issue
     issue_obj.edit(state="closed")
+    _forget_issue_conversation(repository, issue_number)
@@ -2,11 +2,11 @@
 # https://github.com/python-gitlab/python-gitlab (licensed GPLv3)
 #
 import os
-from functools import lru_cache
 from ._logger import Log
+from ._changeset import get_changeset
+from ._file_cache import FileCache
 import gitlab
 
-@lru_cache(maxsize=1)
 def get_repository_handle(repository):
     """
     Get the GitLab project object.
@@ -22,12 +22,8 @@ def get_repository_handle(repository):
         The GitLab project object.
     """
     from ._utilities import Config
-    access_token = os.getenv('GITLAB_API_KEY')
-    git_server_url = Config.git_server_url
-    print("git_server_url", git_server_url)
-    print("repository", repository)
-    gl = gitlab.Gitlab(url=git_server_url, private_token=access_token)
-    return gl.projects.get(repository)
+    from ._client_pool import get_gitlab_project
+    return get_gitlab_project(Config.git_server_url, repository)
 
 def add_comment_to_issue(repository, issue, comment):
     """
@@ -69,18 +65,49 @@ def get_conversation_on_issue(repository, issue):
     project = get_repository_handle(repository)
     issue_obj = project.issues.get(issue)
     conversation = f"Issue Title: {issue_obj.title}\n\nIssue Body:\n{issue_obj.description}\n\n"
-    notes = issue_obj.notes.list()
+    notes = issue_obj.notes.list(order_by='created_at', sort='asc', iterator=True)
     for note in notes:
         conversation += f"Comment by {note.author['username']}:\n{note.body}\n\n"
     return conversation
 
-def get_most_recently_commented_issue(repository):
+def get_most_recently_commented_issue(repository, since=None):
     """
     Return the ID of the issue in a project where the last comment was posted.
+
+    The project's events are listed newest first, hence the first comment event on an issue answers the question,
+    typically within the first page. If there is none (e.g. events expired), the most recently updated issue is returned.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the GitLab project (e.g., "username/repo-name").
+    since : datetime, optional
+        Only consider comments which were created after this point in time.
+
+    Returns
+    -------
+    int
+        The ID of the issue
     """
     Log().log(f"-> get_most_recently_commented_issue({repository})")
+    from datetime import datetime, timedelta, timezone
     project = get_repository_handle(repository)
-    issues = project.issues.list(order_by='updated_at', sort='desc')
+
+    filters = {}
+    if since is not None:
+        # GitLab filters events by date (exclusive), not by time, hence earlier events of that day are skipped below
+        filters['after'] = (since - timedelta(days=1)).date().isoformat()
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+    for event in project.events.list(action='commented', target_type='note', sort='desc', iterator=True, **filters):
+        if since is not None and datetime.fromisoformat(event.created_at.replace("Z", "+00:00")) < since:
+            # events are listed newest first
+            break
+        note = getattr(event, 'note', None) or {}
+        if note.get('noteable_type') == 'Issue' and not note.get('system', False):
+            return note['noteable_iid']
+
+    issues = project.issues.list(order_by='updated_at', sort='desc', per_page=1, get_all=False)
     if not issues:
         raise ValueError("No issues available")
     return issues[0].iid
@@ -102,20 +129,23 @@ def get_most_recent_comment_on_issue(repository, issue):
         A tuple containing the username of the commenter and the comment text.
     """
     Log().log(f"-> get_most_recent_comment_on_issue({repository}, {issue})")
-    from datetime import datetime
-
     project = get_repository_handle(repository)
     issue_obj = project.issues.get(issue)
-    notes = issue_obj.notes.list()
-
-    notes = sorted(notes, key=lambda x: datetime.strptime(x.created_at, '%Y-%m-%dT%H:%M:%S.%fZ'), reverse=False)
 
-    if notes:
-        last_note = notes[-1]
+    last_note = _get_most_recent_note(issue_obj)
+    if last_note is not None:
         return last_note.author['username'], last_note.body
     else:
         return issue_obj.author['username'], issue_obj.description
 
+
+def _get_most_recent_note(issue_obj):
+    """Return the most recent comment (non-system note) on an issue or None, typically using a single request."""
+    for note in issue_obj.notes.list(order_by='created_at', sort='desc', iterator=True):
+        if not note.system:
+            return note
+    return None
+
 def list_issues(repository: str, state: str = "opened") -> dict:
     """
     List all GitLab issues with a defined state on a specified project.
@@ -134,7 +164,7 @@ def list_issues(repository: str, state: str = "opened") -> dict:
     """
     Log().log(f"-> list_issues({repository}, {state})")
     project = get_repository_handle(repository)
-    issues = project.issues.list(state=state)
+    issues = project.issues.list(state=state, iterator=True)
     return {issue.iid: issue.title for issue in issues}
 
 def get_issue_details(repository: str, issue: int) -> str:
@@ -179,7 +209,7 @@ Description:
     # Add comments if any
     if issue.user_notes_count > 0:
         content += "\n\nComments:"
-        notes = issue.notes.list()
+        notes = issue.notes.list(order_by='created_at', sort='asc', iterator=True)
         for note in notes:
             if not note.system:  # Exclude system-generated notes
                 content += f"\n\nComment by {note.author['username']} on {note.created_at}:\n{note.body}"
@@ -210,17 +240,17 @@ def list_repository_files(repository: str, branch_name: str = None, file_pattern
     Log().log(f"-> list_repository_files({repository}, {branch_name})")
     repo = get_repository_handle(repository)
     files = []
-    path_stack = ['']
-
-    while path_stack:
-        path = path_stack.pop()
-        tree = repo.repository_tree(path=path, ref=branch_name)
-        for item in tree:
-            if item['type'] == 'blob':
-                if file_patterns is None or any([f in item['path'].path for f in file_patterns]):
-                    files.append(item['path'])
-            elif item['type'] == 'tree':
-                path_stack.append(item['path'])
+
+    # one recursive listing, paginated using keysets
+    tree = repo.repository_tree(ref=branch_name, recursive=True, iterator=True, pagination='keyset')
+    for item in tree:
+        if item['type'] == 'blob':
+            if file_patterns is None or any([f in item['path'] for f in file_patterns]):
+                files.append(item['path'])
+
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        files = [f for f in changeset.apply_to_file_list(files) if file_patterns is None or any([p in f for p in file_patterns])]
     return files
 
 def get_repository_file_contents(repository:str, branch_name, file_paths: list):
@@ -247,12 +277,16 @@ def get_repository_file_contents(repository:str, branch_name, file_paths: list):
     if branch_name is None:
         branch_name = get_default_branch_name(repository)
 
-    project = get_repository_handle(repository)
+    from functools import partial
+    from ._concurrency import run_concurrently
+    files = run_concurrently([partial(get_file_in_repository, repository, branch_name, file_path) for file_path in file_paths],
+                             return_exceptions=True)
 
     file_contents = {}
-    for file_path in file_paths:
+    for file_path, file in zip(file_paths, files):
         try:
-            file = project.files.get(file_path=file_path, ref=branch_name)
+            if isinstance(file, Exception):
+                raise file
             file_contents[file_path] = decode_file(file)
         except Exception as e:
             file_contents[file_path] = f"Error accessing {file_path}: {str(e)}"
@@ -290,33 +324,25 @@ def write_file_in_branch(repository, branch_name, file_path, new_content, commit
 
     project = get_repository_handle(repository)
 
-    if isinstance(new_content, bytes):
-        new_content = base64.b64encode(new_content).decode('utf-8')
-
-        try:
-            file = project.files.get(file_path=file_path, ref=branch_name)
-            file.content = new_content
-            file.save(branch=branch_name, commit_message=commit_message)
-        except gitlab.exceptions.GitlabGetError:
-            project.files.create({
-                'file_path': file_path,
-                'branch': branch_name,
-                'content': new_content,
-                'encoding': 'base64',
-                'commit_message': commit_message
-            })
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        print("record file", file_path)
+        changeset.write(file_path, new_content, commit_message)
     else:
-        try:
-            file = project.files.get(file_path=file_path, ref=branch_name)
-            file.content = new_content
-            file.save(branch=branch_name, commit_message=commit_message)
-        except gitlab.exceptions.GitlabGetError:
-            project.files.create({
-                'file_path': file_path,
-                'branch': branch_name,
-                'content': new_content,
-                'commit_message': commit_message
-            })
+        data = {
+            'branch': branch_name,
+            'content': new_content,
+            'commit_message': commit_message
+        }
+        if isinstance(new_content, bytes):
+            data['content'] = base64.b64encode(new_content).decode('utf-8')
+            data['encoding'] = 'base64'
+
+        if check_if_file_exists(repository, branch_name, file_path):
+            project.files.update(file_path, data)
+        else:
+            project.files.create({'file_path': file_path, **data})
+        FileCache().put(repository, branch_name, file_path, new_content)
 
     # ensure the folder extists
     path_name = str(os.path.dirname(file_path))
@@ -380,14 +406,12 @@ def check_if_file_exists(repository, branch_name, file_path):
         True if the file exists, else False.
     """
     Log().log(f"-> check_if_file_exists({repository}, {branch_name}, {file_path})")
-    project = get_repository_handle(repository)
     try:
-        project.files.get(file_path=file_path, ref=branch_name)
+        get_file_in_repository(repository, branch_name, file_path)
         return True
-    except gitlab.exceptions.GitlabGetError:
+    except FileNotFoundError:
         return False
 
-@lru_cache(maxsize=1)
 def get_file_in_repository(repository, branch_name, file_path):
     """
     Get a file object from a GitLab repository.
@@ -403,8 +427,13 @@ def get_file_in_repository(repository, branch_name, file_path):
 
     Returns
     -------
-    gitlab.v4.objects.ProjectFile
+    git_bob._file_cache.CachedFile
         The file object.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file doesn't exist in the branch.
     """
     Log().log(f"-> get_file_in_repository({repository}, {branch_name}, {file_path})")
     if file_path.endswith(")"):
@@ -419,7 +448,26 @@ def get_file_in_repository(repository, branch_name, file_path):
         file_path = file_path[:-9]
 
     project = get_repository_handle(repository)
-    return project.files.get(file_path=file_path, ref=branch_name)
+
+    def read_from_branch(path):
+        # files which were read or written before in this run are served from the cache
+        known, file = FileCache().get(repository, branch_name, path)
+        if known:
+            if file is None:
+                raise FileNotFoundError(f"{path} does not exist in {repository} branch {branch_name}")
+            return file
+
+        try:
+            project_file = project.files.get(file_path=path, ref=branch_name)
+        except gitlab.exceptions.GitlabGetError as e:
+            FileCache().put_missing(repository, branch_name, path)
+            raise FileNotFoundError(f"{path} does not exist in {repository} branch {branch_name}") from e
+        return FileCache().put(repository, branch_name, path, project_file.decode(), project_file.blob_id)
+
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None and changeset.is_modified(file_path):
+        return changeset.get_file(file_path, read_from_branch)
+    return read_from_branch(file_path)
 
 def send_pull_request(repository, source_branch, target_branch, title, description):
     """
@@ -475,14 +523,24 @@ def check_access_and_ask_for_approval(user, repository, issue):
     groups = os.getenv('GIT_BOB_ACCESS_GROUPS', 'members').split(',')
 
     from ._ai_github_utilities import setup_ai_remark
+    from ._utilities import cached_access_decision
     access = False
     project = get_repository_handle(repository)
 
+    def is_member():
+        # look up the single user instead of listing all members
+        users = project.manager.gitlab.users.list(username=user)
+        if len(users) == 0:
+            return False
+        try:
+            project.members_all.get(users[0].id)
+            return True
+        except gitlab.exceptions.GitlabGetError:
+            return False
+
     if "members" in groups:
-        members = project.members_all.list()
-        for member in members:
-            if member.username == user:
-                access = True
+        if cached_access_decision(repository, user, is_member):
+            access = True
 
     if not access:
         print("User does not have access rights.")
@@ -520,7 +578,7 @@ def get_contributors(repository):
     """
     Log().log(f"-> get_contributors({repository})")
     project = get_repository_handle(repository)
-    contributors = project.repository_contributors()
+    contributors = project.repository_contributors(get_all=True)
     return [contributor['name'] for contributor in contributors]
 
 def get_diff_of_pull_request(repository, pull_request):
@@ -536,25 +594,45 @@ def get_diff_of_pull_request(repository, pull_request):
 
     Returns
     -------
-    str
-        The diff as a string.
+    git_bob._diff.Diff
+        The diff, limited to the configured budgets. Use str() to render it.
     """
+    from ._diff import Diff
+
     Log().log(f"-> get_diff_of_pull_request({repository}, {pull_request})")
     project = get_repository_handle(repository)
-    mr = project.mergerequests.get(pull_request)
-
-    # Get the diff
-    diff = mr.changes()['changes']
-
-    output = []
 
-    # Print the diff
-    for change in diff:
-        output.append(f"File: {change['old_path']} -> {change['new_path']}")
-        output.append(change['diff'])
-        output.append("\n")
-
-    return "\n".join(output)
+    # the diffs are listed file by file (paginated); listing stops when the budget is used up
+    diff = Diff()
+    try:
+        changes = project.manager.gitlab.http_list(f"/projects/{project.encoded_id}/merge_requests/{pull_request}/diffs", iterator=True)
+    except gitlab.exceptions.GitlabError as e:
+        if e.response_code != 404:
+            raise
+        # GitLab < 15.7 has no diffs endpoint, all changes are retrieved at once
+        changes = project.mergerequests.get(pull_request, lazy=True).changes()["changes"]
+    for change in changes:
+        if diff.exhausted:
+            diff.truncated = True
+            break
+        _add_change_to_diff(diff, change)
+    return diff
+
+
+def _add_change_to_diff(diff, change):
+    """Add a change as returned by the GitLab API (merge request diffs, repository compare) to a git_bob._diff.Diff."""
+    if change.get('new_file'):
+        status = "added"
+    elif change.get('deleted_file'):
+        status = "removed"
+    elif change.get('renamed_file'):
+        status = "renamed"
+    else:
+        status = "modified"
+    patch = change.get('diff')
+    if patch is not None and (patch.startswith("Binary files ") or change.get('too_large')):
+        patch = None
+    diff.add_patch(change['new_path'], patch, status, change['old_path'])
 
 def add_reaction_to_issue(repository, issue, reaction="+1"):
     """
@@ -596,16 +674,12 @@ def add_reaction_to_last_comment_in_issue(repository, issue, reaction="+1"):
     None
     """
     Log().log(f"-> add_reaction_to_last_comment_in_issue({repository}, {issue}, {reaction})")
-    from datetime import datetime
     project = get_repository_handle(repository)
     issue = project.issues.get(issue)
-    notes = issue.notes.list()
-
-    notes = sorted(notes, key=lambda x: datetime.strptime(x.created_at, '%Y-%m-%dT%H:%M:%S.%fZ'), reverse=False)
+    last_note = _get_most_recent_note(issue)
 
     try:
-        if notes:
-            last_note = notes[-1]
+        if last_note is not None:
             last_note.awardemojis.create({"name":reaction})
         else:
             issue.awardemojis.create({"name":reaction})
@@ -627,9 +701,10 @@ def get_diff_of_branches(repository, compare_branch, base_branch=None):
 
     Returns
     -------
-    str
-        The diff as a string.
+    git_bob._diff.Diff
+        The diff, limited to the configured budgets. Use str() to render it.
     """
+    from ._diff import Diff
 
     if base_branch is None:
         base_branch = get_default_branch_name(repository)
@@ -637,9 +712,10 @@ def get_diff_of_branches(repository, compare_branch, base_branch=None):
     Log().log(f"-> get_diff_of_branches({repository}, {compare_branch}, {base_branch})")
     project = get_repository_handle(repository)
     compare = project.repository_compare(from_=base_branch, to=compare_branch)
-    return "\n".join("File:" + diff['old_path'] + " -> " + diff['new_path'] +
-                     "\n----------------------------------------\n" +
-                     diff['diff'] for diff in compare['diffs'])
+    diff = Diff()
+    for change in compare['diffs']:
+        _add_change_to_diff(diff, change)
+    return diff
 
 
 def rename_file_in_repository(repository, branch_name, old_file_path, new_file_path, commit_message="Rename file"):
@@ -664,10 +740,16 @@ def rename_file_in_repository(repository, branch_name, old_file_path, new_file_p
     None
     """
     Log().log(f"-> rename_file_in_repository({repository}, {old_file_path}, {new_file_path}, {branch_name})")
-    project = get_repository_handle(repository)
-    file = project.files.get(file_path=old_file_path, ref=branch_name)
-    file.path = new_file_path
-    file.save(branch=branch_name, commit_message=commit_message)
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        changeset.rename(old_file_path, new_file_path, commit_message)
+        return
+
+    # a single commit using the move action, the file content is not transferred
+    from ._changeset import Changeset
+    changeset = Changeset(repository, branch_name)
+    changeset.rename(old_file_path, new_file_path, commit_message)
+    commit_changeset(repository, changeset)
 
 def delete_file_from_repository(repository, branch_name, file_path, commit_message="Delete file"):
     """
@@ -689,8 +771,14 @@ def delete_file_from_repository(repository, branch_name, file_path, commit_messa
     None
     """
     Log().log(f"-> delete_file_from_repository({repository}, {file_path}, {branch_name})")
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        changeset.delete(file_path, commit_message)
+        return
+
     project = get_repository_handle(repository)
     project.files.delete(file_path=file_path, branch=branch_name, commit_message=commit_message)
+    FileCache().put_missing(repository, branch_name, file_path)
 
 def copy_file_in_repository(repository, branch_name, src_file_path, dest_file_path, commit_message="Copy file"):
     """
@@ -714,13 +802,30 @@ def copy_file_in_repository(repository, branch_name, src_file_path, dest_file_pa
     None
     """
     Log().log(f"-> copy_file_in_repository({repository}, {src_file_path}, {dest_file_path}, {branch_name})")
-    file_content = decode_file(get_file_in_repository(repository, branch_name, src_file_path))
-    write_file_in_branch(repository, branch_name, dest_file_path, file_content, commit_message)
+    changeset = get_changeset(repository, branch_name)
+    if changeset is not None:
+        changeset.copy(src_file_path, dest_file_path, commit_message)
+    else:
+        # GitLab has no copy action, hence the (binary) content is sent again, but in a single commit
+        from ._changeset import Changeset
+        changeset = Changeset(repository, branch_name)
+        changeset.copy(src_file_path, dest_file_path, commit_message)
+        commit_changeset(repository, changeset)
+
+    # copy the file locally
+    if os.path.exists(src_file_path):
+        import shutil
+        if len(os.path.dirname(dest_file_path)) > 0:
+            os.makedirs(os.path.dirname(dest_file_path), exist_ok=True)
+        shutil.copyfile(src_file_path, dest_file_path)
 
 def download_to_repository(repository, branch_name, source_url, target_filename):
     """
     Download a file from a URL and store it in the GitLab repository.
 
+    The file is streamed to disk (see git_bob._utilities.download_source_file). Files larger than
+    GIT_BOB_LFS_THRESHOLD_MB are uploaded to Git LFS and only a pointer file is committed, see git_bob._lfs.
+
     Parameters
     ----------
     repository : str
@@ -737,27 +842,123 @@ def download_to_repository(repository, branch_name, source_url, target_filename)
     None
     """
     Log().log(f"-> download_to_repository({repository}, {target_filename}, {source_url}, {branch_name})")
-    import requests
-    import base64
+    import shutil
+    from ._utilities import Config, download_source_file
+    from ._lfs import lfs_threshold, lfs_gitattributes, upload_to_lfs
 
     if source_url.endswith(")"): # happens with ![]() markdown syntax
         source_url = source_url[:-1]
 
-    response = requests.get(source_url)
-    if response.status_code == 200:
-        file_content = response.content
-    else:
-        raise Exception(f"Failed to download file. Status code: {response.status_code}")
+    commit_message = f"Downloaded {source_url}, saved as {target_filename}."
+
+    # partial downloads are kept in the cache directory, hence the next run resumes them
+    downloaded_filename, oid = download_source_file(source_url)
+    try:
+        if os.path.getsize(downloaded_filename) <= lfs_threshold():
+            with open(downloaded_filename, "rb") as file:
+                file_content = file.read()
+            # this also saves the file locally
+            write_file_in_branch(repository, branch_name, target_filename, file_content, commit_message)
+        else:
+            pointer = upload_to_lfs(Config.git_server_url, repository, "oauth2", os.getenv('GITLAB_API_KEY'),
+                                    downloaded_filename, oid)
+            try:
+                gitattributes = decode_file(get_file_in_repository(repository, branch_name, ".gitattributes"))
+            except FileNotFoundError:
+                gitattributes = None
+            gitattributes = lfs_gitattributes(gitattributes, target_filename)
+            if gitattributes is not None:
+                write_file_in_branch(repository, branch_name, ".gitattributes", gitattributes, f"Track {target_filename} using Git LFS")
+            write_file_in_branch(repository, branch_name, target_filename, pointer, commit_message)
+            # locally, the actual file replaces the pointer
+            shutil.move(downloaded_filename, target_filename)
+    finally:
+        if os.path.exists(downloaded_filename):
+            os.remove(downloaded_filename)
+
+
+def _file_exists(project, repository, branch_name, file_path):
+    """Check whether a file exists in a branch, using the file cache or a HEAD request."""
+    known, file = FileCache().get(repository, branch_name, file_path)
+    if known:
+        return file is not None
+    try:
+        project.files.head(file_path, ref=branch_name)
+        return True
+    except gitlab.exceptions.GitlabHeadError:
+        return False
 
-    #encoded_content = base64.b64encode(file_content).decode('utf-8')
 
-    commit_message = f"Downloaded {source_url}, saved as {target_filename}."
+def commit_changeset(repository, changeset):
+    """
+    Publish all modifications collected in a changeset as a single commit, using the commits API with a list of actions.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the GitLab project (e.g., "username/repo-name").
+    changeset : git_bob._changeset.Changeset
+        The collected modifications, see git_bob._changeset.start_changeset.
+
+    Returns
+    -------
+    str
+        The sha of the new commit, or None if there was nothing to commit.
+    """
+    Log().log(f"-> commit_changeset({repository}, {changeset.branch_name}, {len(changeset.files)} files)")
+    import base64
+    from ._changeset import BlobReference
+
+    if changeset.is_empty():
+        return None
+    if get_changeset(repository, changeset.branch_name) is changeset:
+        raise RuntimeError("Stop the changeset before committing it.")
+
+    project = get_repository_handle(repository)
+    branch_name = changeset.branch_name
+    # only the affected files are looked up, not the whole tree of the repository
+    affected_paths = set(changeset.files.keys())
+    affected_paths.update([c.path for c in changeset.files.values() if isinstance(c, BlobReference)])
+    existing_files = set([path for path in affected_paths if _file_exists(project, repository, branch_name, path)])
+
+    def content_action(action, path, content):
+        return {'action': action, 'file_path': path, 'content': base64.b64encode(content).decode('utf-8'), 'encoding': 'base64'}
+
+    moved_files = set()
+    actions = []
+    for path, content in changeset.files.items():
+        if isinstance(content, BlobReference):
+            source = content.path
+            if source not in existing_files:
+                raise FileNotFoundError(f"{source} does not exist in branch {branch_name}")
+            if changeset.files.get(source, "") is None and source not in moved_files:
+                # renamed: the file is moved on the server without transferring its content
+                moved_files.add(source)
+                actions.append({'action': 'move', 'previous_path': source, 'file_path': path})
+            else:
+                # copied: GitLab has no copy action, hence the content is sent again
+                known, file = FileCache().get(repository, branch_name, source)
+                content = file.decoded_content if file is not None else project.files.raw(file_path=source, ref=branch_name)
+                actions.append(content_action('update' if path in existing_files else 'create', path, content))
+
+    for path, content in changeset.files.items():
+        if content is None:
+            if path in existing_files and path not in moved_files:
+                actions.append({'action': 'delete', 'file_path': path})
+        elif isinstance(content, bytes):
+            action = 'update' if path in existing_files and path not in moved_files else 'create'
+            actions.append(content_action(action, path, content))
+
+    commit = project.commits.create({
+        'branch': branch_name,
+        'commit_message': changeset.commit_message(),
+        'actions': actions
+    })
 
-    # save the file locally
-    with open(target_filename, "wb") as f:
-        f.write(file_content)
+    FileCache().apply_changeset(changeset)
 
-    write_file_in_branch(repository, branch_name, target_filename, file_content, commit_message)
+    print(f"Committed {len(changeset.files)} files to {branch_name}: {commit.id}")
+    return commit.id
 
 def create_issue(repository, title, description):
     """
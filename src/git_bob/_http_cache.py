@@ -0,0 +1,193 @@
+# This module provides an on-disk cache for GET requests to the GitHub / GitLab APIs. Responses are stored
+# together with their ETag / Last-Modified validators. When a resource is requested again, a conditional request
+# is sent. If the resource didn't change, the server answers with "304 Not Modified", which doesn't count against
+# the rate limit, and the cached response is returned instead. The adapter is mounted in the sessions of
+# git_bob._client_pool.
+#
+# Responses with an ETag are shared between credentials, because CI jobs get a new token every run. This is safe,
+# because cached responses are only used after the server confirmed them ("304 Not Modified") for the current
+# credentials and the exact content. Responses which only have a Last-Modified date are stored per credentials,
+# because a server may confirm them based on the time alone.
+#
+# Configuration:
+# * GIT_BOB_HTTP_CACHE_MAX_AGE: seconds cached responses are kept without being used (default: 7 days)
+# * GIT_BOB_HTTP_CACHE_SIZE_MB: maximum size of the cached responses (default: 100)
+#
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+# headers which describe the transferred body and don't apply to the decoded content stored in the cache
+_TRANSFER_HEADERS = ["content-encoding", "content-length", "transfer-encoding"]
+
+# request headers which identify the client, the server validates them with every conditional request
+_CREDENTIAL_HEADERS = ["authorization", "private-token", "cookie"]
+
+# number of responses stored between two evictions
+_EVICTION_INTERVAL = 100
+
+
+class CachingHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    A transport adapter for requests, which sends conditional requests for resources in the cache.
+
+    Parameters
+    ----------
+    cache_directory : str
+        Folder where responses are stored
+    max_age : float, optional
+        Seconds cached responses are kept without being used, default: GIT_BOB_HTTP_CACHE_MAX_AGE or 7 days
+    max_size_mb : float, optional
+        Maximum size of the cached responses, default: GIT_BOB_HTTP_CACHE_SIZE_MB or 100
+    **kwargs
+        Passed to requests.adapters.HTTPAdapter
+    """
+
+    def __init__(self, cache_directory, max_age=None, max_size_mb=None, **kwargs):
+        if max_age is None:
+            max_age = float(os.environ.get("GIT_BOB_HTTP_CACHE_MAX_AGE", 7 * 24 * 3600))
+        if max_size_mb is None:
+            max_size_mb = float(os.environ.get("GIT_BOB_HTTP_CACHE_SIZE_MB", "100"))
+        self.cache_directory = cache_directory
+        self.max_age = max_age
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._stored = 0
+        self._eviction_lock = threading.Lock()
+        super().__init__(**kwargs)
+        # the cache directory may be restored from a previous run
+        self.evict()
+
+    def _cache_key(self, request, per_credentials=False):
+        # responses depend on the format asked for, and only on the credentials if requested, see module description
+        parts = [request.method, request.url, request.headers.get("Accept", "")]
+        if per_credentials:
+            parts += [request.headers.get(h, "") for h in _CREDENTIAL_HEADERS]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _varying_headers(response):
+        """Return the request headers (except credentials) the response varies by, according to its Vary header."""
+        vary = [h.strip().lower() for h in response.headers.get("Vary", "").split(",")]
+        return sorted([h for h in vary if len(h) > 0 and h not in _CREDENTIAL_HEADERS])
+
+    def _load(self, key, request):
+        filename = os.path.join(self.cache_directory, key + ".json")
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # the stored response is only valid for requests with the same headers it varies by
+        for header, value in entry.get("vary", {}).items():
+            if request.headers.get(header, "") != value:
+                return None
+        return entry
+
+    def _store(self, key, response):
+        entry = {
+            "url": response.url,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in _TRANSFER_HEADERS},
+            "vary": {h: response.request.headers.get(h, "") for h in self._varying_headers(response)},
+            "encoding": response.encoding,
+            "content": base64.b64encode(response.content).decode("utf-8"),
+        }
+        filename = os.path.join(self.cache_directory, key + ".json")
+        temporary_filename = filename + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_filename, "w") as f:
+            json.dump(entry, f)
+        os.replace(temporary_filename, filename)
+
+        self._stored += 1
+        if self._stored % _EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def _touch(self, key):
+        """Mark a cached response as recently used, see evict."""
+        try:
+            os.utime(os.path.join(self.cache_directory, key + ".json"))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove responses which were not used for max_age seconds and the least recently used ones beyond max_size."""
+        with self._eviction_lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.cache_directory):
+                filename = os.path.join(self.cache_directory, name)
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    self._remove(filename)
+                elif name.endswith(".json"):
+                    entries.append((stat.st_mtime, stat.st_size, filename))
+
+            total = sum([size for _, size, _ in entries])
+            for _, size, filename in sorted(entries):
+                if total <= self.max_size:
+                    break
+                self._remove(filename)
+                total -= size
+
+    @staticmethod
+    def _remove(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != "GET" or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = self._cache_key(request)
+        entry = self._load(key, request)
+        if entry is None:
+            key = self._cache_key(request, per_credentials=True)
+            entry = self._load(key, request)
+        if entry is not None:
+            headers = {k.lower(): v for k, v in entry["headers"].items()}
+            if "etag" in headers:
+                request.headers["If-None-Match"] = headers["etag"]
+            elif "last-modified" in headers:
+                request.headers["If-Modified-Since"] = headers["last-modified"]
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self.hits += 1
+            self._touch(key)
+            return self._cached_response(request, response, entry)
+
+        self.misses += 1
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            self._store(self._cache_key(request, per_credentials="ETag" not in response.headers), response)
+        return response
+
+    def _cached_response(self, request, not_modified_response, entry):
+        """Build a "200 OK" response from the cache entry, with up-to-date headers (e.g. rate limit) from the 304 response."""
+        response = requests.models.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = entry["url"]
+        response.request = request
+        response.connection = self
+        response.encoding = entry["encoding"]
+        response._content = base64.b64decode(entry["content"])
+        response.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+        for k, v in not_modified_response.headers.items():
+            if k.lower() not in _TRANSFER_HEADERS:
+                response.headers[k] = v
+        response.from_cache = True
+        not_modified_response.close()
+        return response
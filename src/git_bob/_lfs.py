@@ -0,0 +1,145 @@
+# This module uploads large files to the Git LFS storage of a repository, see https://github.com/git-lfs/git-lfs/blob/main/docs/api/batch.md
+# The content is streamed from disk, hence files which exceed the size limits of the file APIs of GitHub (100 MB)
+# and GitLab can be added without loading them into memory. In the repository, only a small pointer file is committed.
+# Files larger than GIT_BOB_LFS_THRESHOLD_MB (default 50) are uploaded this way by download_to_repository.
+#
+import os
+
+LFS_POINTER_VERSION = "https://git-lfs.github.com/spec/v1"
+
+
+def lfs_threshold():
+    """Size in bytes above which downloaded files are stored using Git LFS."""
+    return int(float(os.environ.get("GIT_BOB_LFS_THRESHOLD_MB", "50")) * 1024 * 1024)
+
+
+def lfs_pointer(oid, size):
+    """Return the content of the pointer file committed in place of a file stored in LFS."""
+    return f"version {LFS_POINTER_VERSION}\noid sha256:{oid}\nsize {size}\n"
+
+
+def parse_lfs_pointer(content):
+    """
+    Read the oid and size from the content of a pointer file.
+
+    Returns
+    -------
+    tuple or None
+        The sha256 (hex) and size of the object, or None if the content is not a pointer file.
+    """
+    import re
+    if isinstance(content, bytes):
+        # pointer files are small text files, see https://github.com/git-lfs/git-lfs/blob/main/docs/spec.md
+        if len(content) > 1024:
+            return None
+        content = content.decode("utf-8", errors="replace")
+    if not content.startswith(f"version {LFS_POINTER_VERSION}\n"):
+        return None
+    oid = re.search(r"^oid sha256:([0-9a-f]{64})$", content, re.MULTILINE)
+    size = re.search(r"^size (\d+)$", content, re.MULTILINE)
+    if oid is None or size is None:
+        return None
+    return oid.group(1), int(size.group(1))
+
+
+def lfs_media_url(raw_url):
+    """
+    Return the URL of the LFS object a raw.githubusercontent.com URL points to, or None for other URLs.
+
+    For files stored in LFS, raw.githubusercontent.com serves the pointer file, media.githubusercontent.com the object.
+    """
+    prefix = "https://raw.githubusercontent.com/"
+    if not raw_url.startswith(prefix):
+        return None
+    return "https://media.githubusercontent.com/media/" + raw_url[len(prefix):]
+
+
+def lfs_gitattributes(gitattributes, path):
+    """
+    Add a path to the content of a .gitattributes file, so that git clients check out the file from LFS.
+
+    Returns
+    -------
+    str or None
+        The new content, or None if the path is listed already.
+    """
+    line = f"{path.replace(' ', '[[:space:]]')} filter=lfs diff=lfs merge=lfs -text"
+    if gitattributes is None:
+        gitattributes = ""
+    if line in gitattributes.split("\n"):
+        return None
+    if len(gitattributes) > 0 and not gitattributes.endswith("\n"):
+        gitattributes += "\n"
+    return gitattributes + line + "\n"
+
+
+def upload_to_lfs(server_url, repository, username, access_token, filename, oid=None):
+    """
+    Upload a file to the LFS storage of a repository, streaming it from disk.
+
+    Parameters
+    ----------
+    server_url : str
+        The git server, e.g. "https://github.com"
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+    username : str
+        User name for authentication, e.g. "x-access-token" on GitHub or "oauth2" on GitLab.
+    access_token : str
+    filename : str
+        Local file to upload.
+    oid : str, optional
+        The sha256 of the file (hex), computed if not given.
+
+    Returns
+    -------
+    str
+        The content of the pointer file to commit instead of the file.
+    """
+    import hashlib
+    from urllib.parse import urlparse
+    from ._logger import Log
+    from ._client_pool import get_session
+    Log().log(f"-> upload_to_lfs({server_url}, {repository}, {filename})")
+
+    def session(url):
+        # the pooled sessions schedule the requests according to the rate limits, see git_bob._rate_limit
+        return get_session(urlparse(url).hostname)
+
+    size = os.path.getsize(filename)
+    if oid is None:
+        sha256 = hashlib.sha256()
+        with open(filename, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        oid = sha256.hexdigest()
+
+    headers = {"Accept": "application/vnd.git-lfs+json", "Content-Type": "application/vnd.git-lfs+json"}
+    auth = (username, access_token)
+    batch_url = f"{server_url.rstrip('/')}/{repository}.git/info/lfs/objects/batch"
+    response = session(batch_url).post(batch_url, auth=auth, headers=headers, timeout=60, json={
+        "operation": "upload",
+        "transfers": ["basic"],
+        "objects": [{"oid": oid, "size": size}],
+    })
+    response.raise_for_status()
+    lfs_object = response.json()["objects"][0]
+    if "error" in lfs_object:
+        raise Exception(f"LFS upload of {filename} rejected: {lfs_object['error'].get('message')}")
+
+    # without actions, the server has the object already
+    actions = lfs_object.get("actions", {})
+    if "upload" in actions:
+        upload = actions["upload"]
+        with open(filename, "rb") as file:
+            # passing the file object makes requests stream it instead of reading it at once
+            response = session(upload["href"]).put(upload["href"], data=file, headers=upload.get("header", {}), timeout=600)
+        response.raise_for_status()
+        print(f"Uploaded {filename} ({size} bytes) to LFS")
+    if "verify" in actions:
+        verify = actions["verify"]
+        response = session(verify["href"]).post(verify["href"], json={"oid": oid, "size": size}, timeout=60,
+                                                headers={**headers, **verify.get("header", {})})
+        response.raise_for_status()
+
+    return lfs_pointer(oid, size)
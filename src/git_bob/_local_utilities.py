@@ -0,0 +1,316 @@
+# This file contains utility functions that read repository content from the local git checkout,
+# e.g. the one git-bob runs in when executed in the GitHub/GitLab CI. Reads are answered from the
+# git object database (`git ls-tree` / `git cat-file --batch`) for any ref that has been fetched.
+# All other functions (writes, issues, pull-requests, ...) are delegated to the GitHub or GitLab utilities.
+#
+import os
+import subprocess
+from functools import lru_cache
+from ._logger import Log
+from ._file_cache import CachedFile
+
+# (repository, branch) combinations git-bob modified during this run. The local checkout doesn't know about these changes.
+_modified_branches = set()
+
+# commit shas resolved during this run, keyed by (local folder, repository, branch)
+_resolved_commits = {}
+
+# default branch names determined during this run, keyed by repository
+_default_branches = {}
+
+
+def forget_local_state():
+    """Forget modified branches and resolved commits, e.g. before a long-running process handles the next event."""
+    _modified_branches.clear()
+    _resolved_commits.clear()
+    _default_branches.clear()
+    _local_root.cache_clear()
+    _local_repository_name.cache_clear()
+
+
+def _remote():
+    """Return the utilities module of the git host, which handles everything that cannot be done locally."""
+    from ._utilities import Config
+    if "https://github.com" in Config.git_server_url:
+        import git_bob._github_utilities as gu
+    else:
+        import git_bob._gitlab_utilities as gu
+    return gu
+
+
+def __getattr__(name):
+    # delegate everything that is not implemented in this module to the remote host
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return getattr(_remote(), name)
+
+
+def _git(*args, input=None):
+    """Run a git command in the root folder of the local checkout and return its stdout as bytes."""
+    result = subprocess.run(["git", *args], input=input, capture_output=True, cwd=_local_root(os.getcwd()))
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.decode(errors='replace')}")
+    return result.stdout
+
+
+@lru_cache(maxsize=16)
+def _local_root(working_directory):
+    result = subprocess.run(["git", "rev-parse", "--show-toplevel"], capture_output=True, text=True, cwd=working_directory)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+@lru_cache(maxsize=16)
+def _local_repository_name(working_directory):
+    """Determine the "owner/name" of the repository checked out in the given folder from the origin remote url."""
+    if _local_root(working_directory) is None:
+        return None
+    result = subprocess.run(["git", "config", "--get", "remote.origin.url"], capture_output=True, text=True, cwd=working_directory)
+    url = result.stdout.strip()
+    if result.returncode != 0 or len(url) == 0:
+        return None
+    if url.endswith(".git"):
+        url = url[:-4]
+    if "://" in url:  # https://github.com/owner/name
+        path = url.split("://", 1)[1].split("/", 1)[-1]
+    else:  # git@github.com:owner/name
+        path = url.split(":", 1)[-1]
+    return path.strip("/").lower()
+
+
+def _resolve_commit(repository, branch_name):
+    """
+    Determine the commit sha of a branch in the local checkout.
+
+    Returns None if the repository isn't checked out locally, the branch wasn't fetched,
+    or git-bob modified the branch during this run.
+    """
+    if branch_name is None:
+        # asked once, instead of one request to the remote host per file read
+        if repository not in _default_branches:
+            _default_branches[repository] = _remote().get_default_branch_name(repository)
+        branch_name = _default_branches[repository]
+
+    if (repository, branch_name) in _modified_branches:
+        return None
+    key = (_local_root(os.getcwd()), repository, branch_name)
+    if key in _resolved_commits:
+        return _resolved_commits[key]
+
+    commit = None
+    if _local_repository_name(os.getcwd()) == repository.lower():
+        for ref in [f"refs/remotes/origin/{branch_name}", f"refs/heads/{branch_name}", f"refs/tags/{branch_name}", branch_name]:
+            try:
+                commit = _git("rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}").decode().strip()
+                break
+            except RuntimeError:
+                continue
+
+    _resolved_commits[key] = commit
+    return commit
+
+
+def _read_blobs(commit, file_paths):
+    """
+    Read multiple files at a given commit using a single `git cat-file --batch` call.
+
+    Returns a dictionary of file path to CachedFile; paths which don't exist or aren't files are missing.
+    """
+    requests = "".join([f"{commit}:{file_path}\n" for file_path in file_paths]).encode()
+    output = _git("cat-file", "--batch", input=requests)
+
+    files = {}
+    position = 0
+    for file_path in file_paths:
+        header_end = output.index(b"\n", position)
+        header = output[position:header_end].decode().split(" ")
+        position = header_end + 1
+        if header[-1] == "missing" or header[-1] == "ambiguous":
+            continue
+        sha, object_type, size = header[0], header[1], int(header[2])
+        content = output[position:position + size]
+        position = position + size + 1  # content is followed by a newline
+        if object_type == "blob":
+            files[file_path] = CachedFile(file_path, sha, content)
+    return files
+
+
+def _clean_file_path(file_path):
+    """Remove characters that are left over when file paths are extracted from markdown."""
+    if file_path.endswith(")"):
+        file_path = file_path[:-1]
+    if file_path.endswith("'"):
+        file_path = file_path[:-1]
+    if file_path.endswith('"'):
+        file_path = file_path[:-1]
+    if file_path.endswith("?raw=true"):
+        file_path = file_path[:-9]
+    return file_path
+
+
+def list_repository_files(repository: str, branch_name: str = None, file_patterns: list = None) -> list:
+    """
+    List all files in a given repository branch, using the local checkout if possible.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+    branch_name : str, optional
+        The name of the branch or tag (default is the default branch).
+    file_patterns : list, optional
+        A list of file patterns to filter the files by.
+
+    Returns
+    -------
+    list
+        A list of strings, where each string is the path of a file in the repository.
+    """
+    commit = _resolve_commit(repository, branch_name)
+    if commit is None:
+        return _remote().list_repository_files(repository, branch_name, file_patterns)
+
+    Log().log(f"-> list_repository_files({repository}, {branch_name}) [local]")
+    all_files = []
+    for entry in _git("ls-tree", "-r", "-z", "--full-tree", commit).split(b"\0"):
+        if len(entry) == 0:
+            continue
+        info, path = entry.decode().split("\t", 1)
+        if info.split(" ")[1] != "blob":
+            continue
+        if file_patterns is None or any([f in path for f in file_patterns]):
+            all_files.append(path)
+    return all_files
+
+
+def get_file_in_repository(repository, branch_name, file_path):
+    """
+    Get a file object from the repository, using the local checkout if possible.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+    branch_name : str
+        The name of the branch to get the file content from.
+    file_path : str
+        The path of the file in the repository.
+
+    Returns
+    -------
+    git_bob._file_cache.CachedFile or the file object of the remote host
+    """
+    commit = _resolve_commit(repository, branch_name)
+    if commit is None:
+        return _remote().get_file_in_repository(repository, branch_name, file_path)
+
+    Log().log(f"-> get_file_in_repository({repository}, {branch_name}, {file_path}) [local]")
+    file_path = _clean_file_path(file_path)
+    files = _read_blobs(commit, [file_path])
+    if file_path not in files:
+        raise FileNotFoundError(f"{file_path} does not exist in {repository} branch {branch_name}")
+    return files[file_path]
+
+
+def check_if_file_exists(repository, branch_name, file_path):
+    """
+    Checks if a specified file_path exists in the repository, using the local checkout if possible.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+    branch_name: str
+        The name of the branch to check the file in.
+    file_path : str
+        The path of the file to check.
+
+    Returns
+    -------
+    bool
+        True if the file exists, False otherwise.
+    """
+    commit = _resolve_commit(repository, branch_name)
+    if commit is None:
+        return _remote().check_if_file_exists(repository, branch_name, file_path)
+
+    Log().log(f"-> check_if_file_exists({repository}, {file_path}) [local]")
+    return file_path in _read_blobs(commit, [file_path])
+
+
+def get_repository_file_contents(repository: str, branch_name, file_paths: list) -> dict:
+    """
+    Retrieve the contents of specified files from the repository, using the local checkout if possible.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+    branch_name : str, optional
+        The name of the branch or tag.
+    file_paths : list
+        A list of file paths within the repository to retrieve the contents of.
+
+    Returns
+    -------
+    dict
+        A dictionary where keys are file paths and values are the contents of the files.
+    """
+    commit = _resolve_commit(repository, branch_name)
+    if commit is None:
+        return _remote().get_repository_file_contents(repository, branch_name, file_paths)
+
+    Log().log(f"-> get_repository_file_contents({repository}, {branch_name}, {file_paths}) [local]")
+    files = _read_blobs(commit, file_paths)
+
+    file_contents = {}
+    for file_path in file_paths:
+        try:
+            if file_path not in files:
+                raise FileNotFoundError(f"{file_path} does not exist in {repository} branch {branch_name}")
+            file_contents[file_path] = decode_file(files[file_path])
+        except Exception as e:
+            file_contents[file_path] = f"Error accessing {file_path}: {str(e)}"
+    return file_contents
+
+
+def decode_file(file):
+    """Decode a file object returned by get_file_in_repository to a text string."""
+    if isinstance(file, CachedFile):
+        return file.decoded_content.decode()
+    return _remote().decode_file(file)
+
+
+def _mark_modified(repository, branch_name):
+    _modified_branches.add((repository, branch_name))
+
+
+def write_file_in_branch(repository, branch_name, file_path, new_content, commit_message="Update file"):
+    """Write a file on the remote host, see the GitHub/GitLab utilities."""
+    _mark_modified(repository, branch_name)
+    return _remote().write_file_in_branch(repository, branch_name, file_path, new_content, commit_message)
+
+
+def rename_file_in_repository(repository, branch_name, old_file_path, new_file_path, commit_message="Rename file"):
+    """Rename a file on the remote host, see the GitHub/GitLab utilities."""
+    _mark_modified(repository, branch_name)
+    return _remote().rename_file_in_repository(repository, branch_name, old_file_path, new_file_path, commit_message)
+
+
+def delete_file_from_repository(repository, branch_name, file_path, commit_message="Delete file"):
+    """Delete a file on the remote host, see the GitHub/GitLab utilities."""
+    _mark_modified(repository, branch_name)
+    return _remote().delete_file_from_repository(repository, branch_name, file_path, commit_message)
+
+
+def copy_file_in_repository(repository, branch_name, src_file_path, dest_file_path, commit_message="Copy file"):
+    """Copy a file on the remote host, see the GitHub/GitLab utilities."""
+    _mark_modified(repository, branch_name)
+    return _remote().copy_file_in_repository(repository, branch_name, src_file_path, dest_file_path, commit_message)
+
+
+def download_to_repository(repository, branch_name, source_url, target_filename):
+    """Download a file into the repository on the remote host, see the GitHub/GitLab utilities."""
+    _mark_modified(repository, branch_name)
+    return _remote().download_to_repository(repository, branch_name, source_url, target_filename)
@@ -1,3 +1,10 @@
+import contextvars
+from contextlib import contextmanager
+
+# the log of the task handled in the current context, see Log.separate
+_context_log = contextvars.ContextVar("git_bob_log", default=None)
+
+
 class Log():
     _instance = None
 
@@ -7,12 +14,29 @@ class Log():
             cls._instance._log = []
         return cls._instance
 
+    def _current(self):
+        log = _context_log.get()
+        return self._log if log is None else log
+
     def clear(self):
-        self._log = []
+        log = _context_log.get()
+        if log is None:
+            self._log = []
+        else:
+            log.clear()
 
     def log(self, message):
         print(message)
-        self._log.append(message)
+        self._current().append(message)
 
     def get(self):
-        return self._log
+        return self._current()
+
+    @contextmanager
+    def separate(self):
+        """Within this context, messages are logged separately, e.g. per issue handled concurrently."""
+        token = _context_log.set([])
+        try:
+            yield
+        finally:
+            _context_log.reset(token)
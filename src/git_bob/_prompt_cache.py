@@ -0,0 +1,253 @@
+# This module caches the responses of the language models on disk, so that identical prompts (e.g. after a
+# retry, a re-run after a CI timeout, or `try` followed by `solve` on the same issue) are not sent again.
+# Prompts are identified by a hash of the prompt handler, the model and all other arguments, the full message
+# and the bytes of images. The responses are stored in a SQLite database in the cache directory (see
+# git_bob._utilities.get_cache_directory); least recently used responses are evicted when the cache exceeds its
+# size, and responses expire after a while.
+#
+# Configuration:
+# * GIT_BOB_PROMPT_CACHE: "true" enables the cache (default: disabled)
+# * GIT_BOB_PROMPT_CACHE_TTL: seconds responses are reused (default: 7 days)
+# * GIT_BOB_PROMPT_CACHE_SIZE_MB: maximum size of the stored responses (default: 50)
+# * GIT_BOB_PROMPT_CACHE_BYPASS: comma-separated triggers which are not deterministic, their prompts are always
+#   sent, e.g. "try,solve" (default: none)
+#
+# Code which repeats a prompt on purpose, expecting a different response, uses `with bypass_prompt_cache():`.
+#
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+_caches = {}
+_caches_lock = threading.Lock()
+# a context variable, hence workers started by git_bob._concurrency (which copy the context) are bypassed as well
+_bypass = contextvars.ContextVar("git_bob_prompt_cache_bypass", default=False)
+
+
+class PromptCache:
+    """
+    On-disk store of prompt responses, see module description.
+
+    Parameters
+    ----------
+    path : str
+        The SQLite database file.
+    ttl : float, optional
+        Seconds responses are reused, default: GIT_BOB_PROMPT_CACHE_TTL or 7 days
+    max_size_mb : float, optional
+        Maximum size of the stored responses, default: GIT_BOB_PROMPT_CACHE_SIZE_MB or 50
+    """
+
+    def __init__(self, path, ttl=None, max_size_mb=None):
+        if ttl is None:
+            ttl = float(os.environ.get("GIT_BOB_PROMPT_CACHE_TTL", 7 * 24 * 3600))
+        if max_size_mb is None:
+            max_size_mb = float(os.environ.get("GIT_BOB_PROMPT_CACHE_SIZE_MB", "50"))
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(self.path)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        """Return the stored response for a key, or None."""
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            row = connection.execute("SELECT response FROM responses WHERE key = ? AND created > ?",
+                                     (key, now - self.ttl)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def put(self, key, response):
+        """Store a response and evict expired and least recently used responses if necessary."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if size > self.max_size:
+            return
+        with closing(self._connect()) as connection, connection:
+            connection.execute("INSERT OR REPLACE INTO responses (key, response, size, created, last_used) "
+                               "VALUES (?, ?, ?, ?, ?)", (key, response, size, now, now))
+            connection.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_size:
+                evicted = []
+                for old_key, old_size in connection.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                    if total <= self.max_size:
+                        break
+                    evicted.append((old_key,))
+                    total -= old_size
+                connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def count_bypassed(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def summary(self):
+        """Describe the cache hits of this run, e.g. for the final log summary."""
+        requests = self.hits + self.misses
+        rate = f" ({100 * self.hits / requests:.0f}%)" if requests > 0 else ""
+        return f"Prompt cache: {self.hits} hits{rate}, {self.misses} misses, {self.bypassed} bypassed"
+
+
+def get_prompt_cache():
+    """Return the prompt cache configured using environment variables (see module description), or None."""
+    from ._utilities import get_cache_directory
+
+    if os.environ.get("GIT_BOB_PROMPT_CACHE", "false").lower() not in ["true", "1", "yes"]:
+        return None
+    folder = get_cache_directory("prompts")
+    if folder is None:
+        return None
+    path = os.path.join(folder, "prompts.sqlite")
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = PromptCache(path)
+        return _caches[path]
+
+
+def bypassed_triggers():
+    """Return the triggers configured in GIT_BOB_PROMPT_CACHE_BYPASS."""
+    return [t.strip() for t in os.environ.get("GIT_BOB_PROMPT_CACHE_BYPASS", "").split(",") if len(t.strip()) > 0]
+
+
+@contextmanager
+def bypass_prompt_cache(bypass=True):
+    """Within this context, prompts of the current task and its workers are sent to the language model even if cached."""
+    token = _bypass.set(_bypass.get() or bypass)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def _image_bytes(image):
+    import io
+    if image is None:
+        return b""
+    if isinstance(image, bytes):
+        return image
+    if isinstance(image, str):
+        return image.encode("utf-8")
+    if hasattr(image, "tobytes"):
+        # numpy arrays and PIL images; the shape / size distinguishes images with the same pixels
+        return repr(getattr(image, "shape", getattr(image, "size", None))).encode("utf-8") + image.tobytes()
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def prompt_cache_key(handler_name, arguments, message, image=None):
+    """
+    Return the key of a prompt: a hash of the handler, its other arguments (e.g. model), the message and the image.
+    """
+    digest = hashlib.sha256()
+    digest.update(handler_name.encode("utf-8"))
+    digest.update(repr(sorted(arguments.items())).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(message).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(_image_bytes(image))
+    return digest.hexdigest()
+
+
+def cached_prompt_handler(handler, cache=None):
+    """
+    Wrap a prompt handler, so that its responses are served from / stored in the prompt cache.
+
+    Parameters
+    ----------
+    handler : function
+        A prompt handler with the first argument being the message, e.g. git_bob._endpoints.prompt_openai
+    cache : PromptCache, optional
+        Default: get_prompt_cache() at the time of the call
+    """
+    import functools
+    import inspect
+
+    signature = inspect.signature(handler)
+    message_parameter = list(signature.parameters.keys())[0]
+    handler_name = f"{handler.__module__}.{handler.__name__}"
+
+    def lookup(args, kwargs):
+        """Return the cache and key of a prompt, or (None, None) if the cache is not used for it."""
+        prompt_cache = cache if cache is not None else get_prompt_cache()
+        if prompt_cache is None:
+            return None, None
+        if _bypass.get():
+            prompt_cache.count_bypassed()
+            return None, None
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        message = arguments.pop(message_parameter)
+        image = arguments.pop("image", None)
+        return prompt_cache, prompt_cache_key(handler_name, arguments, message, image)
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        prompt_cache, key = lookup(args, kwargs)
+        if prompt_cache is None:
+            return handler(*args, **kwargs)
+
+        response = prompt_cache.get(key)
+        if response is not None:
+            return response
+        response = handler(*args, **kwargs)
+        if isinstance(response, str):
+            prompt_cache.put(key, response)
+        return response
+
+    stream = getattr(handler, "stream", None)
+    if stream is not None:
+        # the streaming variant (see git_bob._endpoints.stream_prompt) shares the cached responses
+        def stream_wrapper(*args, **kwargs):
+            prompt_cache, key = lookup(args, kwargs)
+            if prompt_cache is None:
+                yield from stream(*args, **kwargs)
+                return
+
+            response = prompt_cache.get(key)
+            if response is not None:
+                yield response
+                return
+            chunks = []
+            for chunk in stream(*args, **kwargs):
+                chunks.append(chunk)
+                yield chunk
+            # only complete responses are stored
+            prompt_cache.put(key, "".join(chunks))
+        wrapper.stream = stream_wrapper
+    return wrapper
@@ -0,0 +1,239 @@
+# This module provides a durable event queue in a local SQLite database, which coordinates git-bob processes
+# (e.g. CI jobs on the same runner, or the workers of git_bob._server) before they respond to an event:
+# * bursts of identical requests on the same issue are debounced, only the most recent one is handled
+# * events on the same issue (or pull-/merge-request) are handled one after the other, hence two `solve` runs
+#   don't race on the same branch
+# * events on different issues are handled in parallel, up to a configurable limit
+#
+# Configuration:
+# * GIT_BOB_QUEUE_FILE: the database file, default: "queue/events.sqlite" in the cache directory (see
+#   git_bob._utilities.get_cache_directory). If caching is disabled and no file is configured, there is no queue.
+# * GIT_BOB_QUEUE_DEBOUNCE: seconds an event waits for newer identical events (default 5)
+# * GIT_BOB_MAX_CONCURRENT_EVENTS: maximum number of events handled at the same time (default 4)
+#
+import json
+import os
+import socket
+import sqlite3
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    not_before REAL NOT NULL,
+    lease_until REAL,
+    finished REAL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS events_status_key ON events (status, key);
+"""
+
+# events which are not started again after they were interrupted this often (e.g. by a crash)
+_MAX_ATTEMPTS = 2
+
+# finished events are removed after a week
+_RETENTION = 7 * 24 * 3600
+
+
+def issue_key(repository, issue):
+    """The key events are serialized by, e.g. "haesleinhuepf/git-bob#123"."""
+    return f"{repository}#{issue}"
+
+
+class EventQueue:
+    """
+    Durable queue of events, see module description.
+
+    Events are pending, running, done, failed or superseded (by a newer identical event).
+
+    Parameters
+    ----------
+    path : str
+        The SQLite database file.
+    debounce : float, optional
+        Seconds an event waits for newer identical events, default: GIT_BOB_QUEUE_DEBOUNCE or 5
+    max_concurrency : int, optional
+        Maximum number of running events, default: GIT_BOB_MAX_CONCURRENT_EVENTS or 4
+    lease : float, optional
+        Seconds after which a running event is considered interrupted (e.g. the process was killed),
+        default: TIMEOUT_IN_SECONDS + 60
+    """
+
+    def __init__(self, path, debounce=None, max_concurrency=None, lease=None):
+        if debounce is None:
+            debounce = float(os.environ.get("GIT_BOB_QUEUE_DEBOUNCE", "5"))
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get("GIT_BOB_MAX_CONCURRENT_EVENTS", "4"))
+        if lease is None:
+            lease = float(os.environ.get("TIMEOUT_IN_SECONDS", 900)) + 60
+        self.path = str(path)
+        self.debounce = debounce
+        self.max_concurrency = max(1, max_concurrency)
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.sleep = time.sleep
+
+        folder = os.path.dirname(self.path)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.executescript(_SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        return _Transaction(connection)
+
+    def enqueue(self, key, payload):
+        """
+        Add an event and return its id.
+
+        Pending events with the same key and payload are superseded by the new one.
+
+        Parameters
+        ----------
+        key : str
+            Events with the same key are handled one after the other, see issue_key.
+        payload : dict
+            JSON-serializable description of the event.
+        """
+        now = time.time()
+        payload = json.dumps(payload, sort_keys=True)
+        with self._connect() as connection:
+            connection.execute("UPDATE events SET status = 'superseded', finished = ? "
+                               "WHERE status = 'pending' AND key = ? AND payload = ?", (now, key, payload))
+            cursor = connection.execute("INSERT INTO events (key, payload, status, created, not_before) "
+                                        "VALUES (?, ?, 'pending', ?, ?)", (key, payload, now, now + self.debounce))
+            connection.execute("DELETE FROM events WHERE status NOT IN ('pending', 'running') AND finished < ?",
+                               (now - _RETENTION,))
+            return cursor.lastrowid
+
+    def claim(self, event_id=None):
+        """
+        Mark an event as running and return it, if it is its turn.
+
+        Parameters
+        ----------
+        event_id : int, optional
+            The event to claim. By default, the oldest event which is ready is claimed.
+
+        Returns
+        -------
+        dict or None
+            The event with id, key, status and payload, or None if no (or not this) event can be started now.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            self._recover_interrupted(connection, now)
+            running = [row["key"] for row in connection.execute("SELECT key FROM events WHERE status = 'running'")]
+            if len(running) >= self.max_concurrency:
+                return None
+            own_key = None if event_id is None else self._key(connection, event_id)
+            ready = connection.execute("SELECT * FROM events WHERE status = 'pending' AND not_before <= ? "
+                                       "ORDER BY not_before, id", (now,)).fetchall()
+            for row in ready:
+                if row["key"] in running:
+                    continue
+                if event_id is not None and row["id"] != event_id:
+                    # older events on the same issue go first
+                    if row["key"] == own_key:
+                        return None
+                    continue
+                connection.execute("UPDATE events SET status = 'running', attempts = attempts + 1, "
+                                   "lease_until = ?, owner = ? WHERE id = ?", (now + self.lease, self.owner, row["id"]))
+                return self._event(row, "running")
+            return None
+
+    def _key(self, connection, event_id):
+        row = connection.execute("SELECT key FROM events WHERE id = ?", (event_id,)).fetchone()
+        return None if row is None else row["key"]
+
+    def _recover_interrupted(self, connection, now):
+        connection.execute("UPDATE events SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                           "finished = CASE WHEN attempts < ? THEN NULL ELSE ? END "
+                           "WHERE status = 'running' AND lease_until < ?", (_MAX_ATTEMPTS, _MAX_ATTEMPTS, now, now))
+
+    @staticmethod
+    def _event(row, status=None):
+        return {"id": row["id"], "key": row["key"], "status": status or row["status"],
+                "payload": json.loads(row["payload"])}
+
+    def get(self, event_id):
+        """Return an event (see claim) or None if it doesn't exist."""
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+            return None if row is None else self._event(row)
+
+    def wait_for_turn(self, event_id, poll_interval=1.0):
+        """
+        Wait until the given event can be started and claim it.
+
+        Returns
+        -------
+        bool
+            True if the event is running now, False if it was superseded (or handled elsewhere).
+        """
+        while True:
+            if self.claim(event_id) is not None:
+                return True
+            event = self.get(event_id)
+            if event is None or event["status"] not in ["pending", "running"]:
+                return False
+            self.sleep(poll_interval)
+
+    def complete(self, event_id, status="done"):
+        """Mark a running event as done or failed."""
+        with self._connect() as connection:
+            connection.execute("UPDATE events SET status = ?, finished = ? WHERE id = ?",
+                               (status, time.time(), event_id))
+
+    def counts(self):
+        """Return the number of events by status, e.g. {"pending": 2, "running": 1, ...}"""
+        with self._connect() as connection:
+            return {row["status"]: row["n"] for row in
+                    connection.execute("SELECT status, COUNT(*) AS n FROM events GROUP BY status")}
+
+
+class _Transaction:
+    """Context manager running statements on a connection in one (immediate) transaction, then closing it."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.connection.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.connection.close()
+
+
+def get_event_queue(**kwargs):
+    """
+    Return the event queue configured using environment variables (see module description), or None.
+
+    Keyword arguments are passed to EventQueue, e.g. max_concurrency.
+    """
+    from ._utilities import get_cache_directory
+
+    path = os.environ.get("GIT_BOB_QUEUE_FILE")
+    if path is None:
+        folder = get_cache_directory("queue")
+        if folder is None:
+            return None
+        path = os.path.join(folder, "events.sqlite")
+    if len(path.strip()) == 0:
+        return None
+    return EventQueue(path, **kwargs)
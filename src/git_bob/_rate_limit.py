@@ -0,0 +1,183 @@
+# This module schedules the requests to the GitHub / GitLab APIs according to their rate limits.
+# It tracks the remaining budget per host from the response headers (X-RateLimit-* on GitHub,
+# RateLimit-* on GitLab), spaces requests out when the budget runs low, and retries requests which were
+# rejected because of (secondary) rate limits after the time the server asks for, or with an exponential
+# backoff with jitter. The adapter is mounted in the sessions of git_bob._client_pool.
+#
+# Configuration:
+# * GIT_BOB_RATE_LIMIT_RETRIES: retries of rejected requests (default 5)
+# * GIT_BOB_RATE_LIMIT_MAX_WAIT: maximum seconds to wait for a retry or an exhausted budget (default 300)
+# * GIT_BOB_RATE_LIMIT_MAX_PACING: maximum seconds between requests when the budget runs low (default 10)
+# * GIT_BOB_WRITE_INTERVAL: minimum seconds between requests modifying content (default 1)
+#
+import os
+import random
+import threading
+import time
+
+# methods which modify content, GitHub recommends to wait between them to avoid secondary rate limits
+_WRITE_METHODS = ["POST", "PATCH", "PUT", "DELETE"]
+
+# endpoints which are requested using POST, but only read content (GraphQL queries, Git LFS batch lookups)
+_READ_ONLY_POST_PATHS = ["/graphql", "/info/lfs/objects/batch"]
+
+
+def is_write_request(method, path=""):
+    """Determine if a request modifies content, and is hence subject to the write interval."""
+    if method not in _WRITE_METHODS:
+        return False
+    return not (method == "POST" and any([path.endswith(p) for p in _READ_ONLY_POST_PATHS]))
+
+
+class RateLimitScheduler():
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RateLimitScheduler, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance.clear()
+        return cls._instance
+
+    def clear(self):
+        # host -> dict with limit, remaining, reset (epoch seconds), requests, retries, waited (seconds) and
+        # whether requests were paced already
+        self._hosts = {}
+        self._last_write = 0
+        self.sleep = time.sleep
+        self.max_retries = int(os.environ.get("GIT_BOB_RATE_LIMIT_RETRIES", "5"))
+        self.max_wait = float(os.environ.get("GIT_BOB_RATE_LIMIT_MAX_WAIT", "300"))
+        self.write_interval = float(os.environ.get("GIT_BOB_WRITE_INTERVAL", "1"))
+        self.max_pacing = float(os.environ.get("GIT_BOB_RATE_LIMIT_MAX_PACING", "10"))
+        # when less than this fraction of the budget is left, requests are spread until the budget resets
+        self.pacing_threshold = 0.1
+
+    def _host(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = {"limit": None, "remaining": None, "reset": None, "requests": 0, "retries": 0, "waited": 0.0, "paced": False}
+        return self._hosts[host]
+
+    def _wait(self, host, seconds):
+        seconds = min(seconds, self.max_wait)
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._host(host)["waited"] += seconds
+        self.sleep(seconds)
+
+    def before_request(self, host, method, path=""):
+        """Wait if necessary before sending a request to the given host."""
+        delay = 0
+        paced = False
+        with self._lock:
+            state = self._host(host)
+            state["requests"] += 1
+            now = time.time()
+            if state["remaining"] is not None and state["reset"] is not None and state["reset"] > now:
+                if state["remaining"] <= 0:
+                    delay = state["reset"] - now
+                elif state["limit"] and state["remaining"] < state["limit"] * self.pacing_threshold:
+                    # spreading the budget until the reset could stall the run for minutes, hence the delay is limited
+                    delay = min((state["reset"] - now) / state["remaining"], self.max_pacing)
+                    paced = not state["paced"]
+                    state["paced"] = True
+            if is_write_request(method, path):
+                delay = max(delay, self._last_write + self.write_interval - now)
+                self._last_write = now + max(delay, 0)
+        if paced:
+            print(f"Rate limit budget of {host} is low ({state['remaining']} of {state['limit']} remaining), "
+                  f"spacing requests by up to {self.max_pacing:.0f} s")
+        self._wait(host, delay)
+
+    def after_response(self, host, response):
+        """Update the budget of a host from the headers of a response."""
+        headers = response.headers
+        with self._lock:
+            state = self._host(host)
+            for prefix in ["X-RateLimit-", "RateLimit-"]:
+                if prefix + "Remaining" in headers:
+                    try:
+                        state["remaining"] = int(headers[prefix + "Remaining"])
+                        state["limit"] = int(headers.get(prefix + "Limit", state["limit"] or 0)) or None
+                        state["reset"] = float(headers.get(prefix + "Reset", 0)) or None
+                    except ValueError:
+                        pass
+                    break
+
+    def retry_delay(self, response, attempt):
+        """
+        Determine how long to wait before retrying a request that was rejected because of rate limits.
+
+        Returns
+        -------
+        float or None
+            Seconds to wait, or None if the response was not caused by a rate limit.
+        """
+        if response.status_code not in [403, 429]:
+            return None
+        headers = response.headers
+        remaining = headers.get("X-RateLimit-Remaining", headers.get("RateLimit-Remaining"))
+        rate_limited = response.status_code == 429 or "Retry-After" in headers or remaining == "0" or \
+                       "rate limit" in response.text.lower()
+        if not rate_limited:
+            return None
+
+        jitter = random.uniform(0, 1)
+        if "Retry-After" in headers:
+            try:
+                return float(headers["Retry-After"]) + jitter
+            except ValueError:
+                pass
+        reset = headers.get("X-RateLimit-Reset", headers.get("RateLimit-Reset"))
+        if remaining == "0" and reset is not None:
+            return max(0, float(reset) - time.time()) + jitter
+        # exponential backoff with jitter
+        return random.uniform(0, 2 ** attempt) + jitter
+
+    def request_count(self):
+        """Return the number of requests sent to all hosts (including retries) since the last clear()."""
+        with self._lock:
+            return sum(state["requests"] for state in self._hosts.values())
+
+    def summary(self):
+        """Describe the API budget used during this run, e.g. for the final log summary."""
+        lines = []
+        for host, state in self._hosts.items():
+            line = f"{host}: {state['requests']} requests"
+            if state["remaining"] is not None and state["limit"] is not None:
+                line += f" ({state['remaining']} of {state['limit']} remaining)"
+            if state["retries"] > 0:
+                line += f", {state['retries']} retries"
+            if state["waited"] > 0:
+                line += f", waited {state['waited']:.1f} s"
+            lines.append(line)
+        return "API usage: " + "; ".join(lines)
+
+    def send(self, host, method, send_request, path=""):
+        """Send a request using the given function, respecting the rate limits of the host."""
+        attempt = 0
+        while True:
+            self.before_request(host, method, path)
+            response = send_request()
+            self.after_response(host, response)
+
+            delay = self.retry_delay(response, attempt)
+            if delay is None or attempt >= self.max_retries or delay > self.max_wait:
+                return response
+            print(f"Rate limit of {host} reached, retrying in {delay:.1f} s")
+            with self._lock:
+                self._host(host)["retries"] += 1
+            response.close()
+            self._wait(host, delay)
+            attempt += 1
+
+
+class RateLimitMixin:
+    """Mixin for requests transport adapters, which sends all requests through the RateLimitScheduler."""
+
+    def send(self, request, **kwargs):
+        from urllib.parse import urlparse
+        url = urlparse(request.url)
+        return RateLimitScheduler().send(url.hostname, request.method,
+                                         lambda: super(RateLimitMixin, self).send(request, **kwargs), url.path)
+
@@ -0,0 +1,511 @@
+# This module provides a long-running service which receives GitHub / GitLab webhooks and responds to them,
+# instead of starting a CI job (installing git-bob, importing all provider SDKs, ...) for every comment.
+# Events mentioning git-bob are queued (see git_bob._queue: bursts are debounced, events on the same issue are
+# handled one after the other) and dispatched to a pool of worker processes. The workers import the SDKs and
+# load the triggers and prompt handlers once, and keep their HTTP sessions, repository handles and caches
+# (see git_bob._client_pool, git_bob._file_cache) between events. Hence, one warm instance can serve many
+# repositories.
+#
+# Usage:
+#     git-bob-serve [port] [--insecure]
+#
+# Configuration, in addition to the environment variables of the command line interface:
+# * GIT_BOB_WEBHOOK_SECRET: the secret configured for the webhook on GitHub (signature) / GitLab (token). The
+#   service refuses to start without it, because anyone reaching the port could trigger git-bob in the name of
+#   any user otherwise. Unverified webhooks are only accepted with --insecure or GIT_BOB_WEBHOOK_INSECURE=true.
+# * GIT_BOB_SERVE_HOST: address to listen on (default 127.0.0.1, e.g. 0.0.0.0 to accept webhooks from other
+#   machines), the port can also be set using GIT_BOB_SERVE_PORT
+# * GIT_BOB_WORKERS: number of worker processes (default 4)
+#
+# The queue is stored in GIT_BOB_QUEUE_FILE (see git_bob._queue), hence events are not lost on restart.
+#
+# GET /health returns the number of events received, dispatched, ignored, completed and failed, and the queue.
+#
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# number of delivery ids remembered, to ignore webhooks which are delivered again
+_REMEMBERED_DELIVERIES = 1000
+
+
+class EventTimeout(BaseException):
+    """
+    Raised when handling an event takes longer than TIMEOUT_IN_SECONDS.
+
+    Like sys.exit in the command line interface, this is not an Exception, hence it is not caught
+    by handlers which continue after errors (e.g. with the next instruction).
+    """
+
+
+def parse_github_event(event, payload):
+    """
+    Turn a GitHub webhook payload into a job for handle_event, or None if the event is not relevant.
+
+    Parameters
+    ----------
+    event : str
+        The value of the X-GitHub-Event header, e.g. "issue_comment"
+    payload : dict
+
+    Returns
+    -------
+    dict or None
+    """
+    action = payload.get("action")
+    if event == "issue_comment" and action == "created":
+        text, user = payload["comment"]["body"], payload["comment"]["user"]["login"]
+        number, is_pull_request = payload["issue"]["number"], "pull_request" in payload["issue"]
+    elif event == "pull_request_review_comment" and action == "created":
+        text, user = payload["comment"]["body"], payload["comment"]["user"]["login"]
+        number, is_pull_request = payload["pull_request"]["number"], True
+    elif event == "issues" and action == "opened":
+        text, user = payload["issue"]["body"], payload["issue"]["user"]["login"]
+        number, is_pull_request = payload["issue"]["number"], False
+    elif event == "pull_request" and action == "opened":
+        text, user = payload["pull_request"]["body"], payload["pull_request"]["user"]["login"]
+        number, is_pull_request = payload["pull_request"]["number"], True
+    else:
+        return None
+
+    repository = payload["repository"]["full_name"]
+    server_url = payload["repository"]["html_url"][:-len(repository)]
+    return {"host": "github", "server_url": server_url, "repository": repository, "issue": number,
+            "is_pull_request": is_pull_request, "user": user, "text": text or ""}
+
+
+def parse_gitlab_event(event, payload):
+    """
+    Turn a GitLab webhook payload into a job for handle_event, or None if the event is not relevant.
+
+    Parameters
+    ----------
+    event : str
+        The value of the X-Gitlab-Event header, e.g. "Note Hook"
+    payload : dict
+
+    Returns
+    -------
+    dict or None
+    """
+    attributes = payload.get("object_attributes", {})
+    if event == "Note Hook" and attributes.get("noteable_type") in ["Issue", "MergeRequest"]:
+        text = attributes["note"]
+        is_pull_request = attributes["noteable_type"] == "MergeRequest"
+        number = payload["merge_request"]["iid"] if is_pull_request else payload["issue"]["iid"]
+    elif event in ["Issue Hook", "Merge Request Hook"] and attributes.get("action") == "open":
+        text = attributes["description"]
+        is_pull_request = event == "Merge Request Hook"
+        number = attributes["iid"]
+    else:
+        return None
+
+    repository = payload["project"]["path_with_namespace"]
+    server_url = payload["project"]["web_url"][:-len(repository)]
+    return {"host": "gitlab", "server_url": server_url, "repository": repository, "issue": number,
+            "is_pull_request": is_pull_request, "user": payload["user"]["username"], "text": text or ""}
+
+
+def _initialize_worker():
+    """Import the host and provider modules and load the extensions once per worker process."""
+    from ._terminal import init_prompt_handlers, init_triggers
+    import git_bob._ai_github_utilities
+    import git_bob._github_utilities
+    import git_bob._gitlab_utilities
+
+    init_prompt_handlers()
+    init_triggers()
+
+
+def _forget_state():
+    """Clear the file, conversation and contributor caches and leftover changesets of the previous event in this process."""
+    from ._file_cache import FileCache
+    from ._changeset import forget_changesets
+    from ._github_utilities import forget_issue_conversations
+    from ._local_utilities import forget_local_state
+    from ._utilities import forget_contributors
+
+    FileCache().clear()
+    forget_issue_conversations()
+    forget_contributors()
+    forget_local_state()
+    forget_changesets()
+
+
+def handle_event(job):
+    """
+    Respond to an event in the current (worker) process, like command_line_interface does in the CI.
+
+    Parameters
+    ----------
+    job : dict
+        see parse_github_event and parse_gitlab_event
+
+    Returns
+    -------
+    dict
+        The job with "status" (done, ignored, denied, failed or timeout), "trigger", "seconds" and "log" added, and
+        the "checkpoints" of partial responses (see git_bob._streaming) in case of a timeout.
+    """
+    import signal
+    import tempfile
+    import traceback
+    from ._utilities import Config, quick_first_response
+    from ._logger import Log
+    from ._ai_github_utilities import setup_ai_remark
+    from ._terminal import select_prompt_function, init_triggers
+    from ._prompt_cache import bypass_prompt_cache, bypassed_triggers
+
+    start = time.time()
+    result = dict(job)
+    result["trigger"] = None
+
+    # the configuration and the caches are global, they must not leak from one event into the next:
+    # other events may have modified files and conversations meanwhile
+    Log().clear()
+    _forget_state()
+    Config.remarks = []
+    Config.llm_name = os.environ.get("GIT_BOB_LLM_NAME", "gpt-4o-2024-08-06")
+    Config.run_id = None
+    Config.git_server_url = job["server_url"]
+    if job["host"] == "github":
+        import git_bob._github_utilities as gu
+    else:
+        import git_bob._gitlab_utilities as gu
+    Config.git_utilities = gu
+    Config.running_in_github_ci = False
+    Config.running_in_gitlab_ci = False
+    Config.repository = repository = job["repository"]
+    Config.issue = issue = job["issue"]
+    Config.is_pull_request = job["is_pull_request"]
+    Config.pull_request = None
+
+    agent_name = os.environ.get("GIT_BOB_AGENT_NAME", "git-bob")
+    timeout_in_seconds = int(os.environ.get("TIMEOUT_IN_SECONDS", 900))
+
+    def timeout_handler(signum, frame):
+        raise EventTimeout(f"Timeout after {timeout_in_seconds} s")
+
+    # signals can only be used in the main thread of a process, e.g. not if the workers are threads
+    use_alarm = threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, timeout_handler)
+        signal.alarm(timeout_in_seconds)
+    working_directory = os.getcwd()
+    try:
+        text = job["text"].lower()
+        text, prompt_function = select_prompt_function(text, agent_name)
+        text = text.replace(f"{agent_name}, ", f"{agent_name} ")
+        text = text.replace(f"{agent_name} please ", f"{agent_name} ")
+
+        triggers = init_triggers()
+        trigger = next((t for t in triggers.keys() if f"{agent_name} {t}" in text), None)
+        if trigger is None or setup_ai_remark() in text:
+            result["status"] = "ignored"
+            return result
+        result["trigger"] = trigger
+        if not Config.git_utilities.check_access_and_ask_for_approval(job["user"], repository, issue):
+            result["status"] = "denied"
+            return result
+
+        quick_first_response(repository, issue)
+
+        if job["host"] == "github":
+            repo = Config.git_utilities.get_repository_handle(repository)
+            if job["is_pull_request"]:
+                Config.pull_request = repo.get_pull(issue)
+                base_branch = Config.pull_request.head.ref
+            else:
+                base_branch = repo.default_branch
+        else:
+            base_branch = Config.git_utilities.get_default_branch_name(repository)
+
+        # handlers store copies of modified files in the working directory, which is hence separate per event
+        with tempfile.TemporaryDirectory() as folder:
+            os.chdir(folder)
+            try:
+                with bypass_prompt_cache(trigger in bypassed_triggers()):
+                    triggers[trigger](repository=repository, issue=issue, prompt_function=prompt_function,
+                                      base_branch=base_branch)
+            finally:
+                os.chdir(working_directory)
+        result["status"] = "done"
+    except EventTimeout:
+        from ._streaming import active_checkpoints
+        result["status"] = "timeout"
+        result["checkpoints"] = active_checkpoints()
+    except Exception:
+        traceback.print_exc()
+        result["status"] = "failed"
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous_handler)
+        result["seconds"] = round(time.time() - start, 3)
+        result["log"] = list(Log().get())
+    return result
+
+
+class WebhookService:
+    """
+    HTTP server receiving webhooks and dispatching relevant events to a pool of workers, see module description.
+
+    Parameters
+    ----------
+    secret : str, optional
+        The webhook secret, default: GIT_BOB_WEBHOOK_SECRET. If empty, all webhooks are rejected unless insecure.
+    insecure : bool, optional
+        Accept webhooks without verification if no secret is configured, default: GIT_BOB_WEBHOOK_INSECURE or False
+    max_workers : int, optional
+        Number of worker processes, default: GIT_BOB_WORKERS or 4
+    executor : concurrent.futures.Executor, optional
+        Executes handle_event, e.g. a ThreadPoolExecutor for testing. By default, a process pool is started.
+    queue : git_bob._queue.EventQueue, optional
+        By default, the queue configured by GIT_BOB_QUEUE_FILE or a temporary one.
+    """
+
+    def __init__(self, secret=None, max_workers=None, executor=None, queue=None, insecure=None):
+        if secret is None:
+            secret = os.environ.get("GIT_BOB_WEBHOOK_SECRET", "")
+        if insecure is None:
+            insecure = os.environ.get("GIT_BOB_WEBHOOK_INSECURE", "False").lower() == "true"
+        if max_workers is None:
+            max_workers = int(os.environ.get("GIT_BOB_WORKERS", "4"))
+        self.secret = secret
+        self.insecure = insecure
+        self.agent_name = os.environ.get("GIT_BOB_AGENT_NAME", "git-bob")
+        self.max_workers = max_workers
+        self.executor = executor
+        self.queue = queue
+        self.statistics = {"received": 0, "dispatched": 0, "ignored": 0, "completed": 0, "failed": 0}
+        self._deliveries = OrderedDict()
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._dispatcher = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+    def verify(self, headers, body):
+        """Return True if the webhook was sent by the host, i.e. signed with / containing the secret."""
+        if len(self.secret) == 0:
+            return self.insecure
+        if "X-Hub-Signature-256" in headers:
+            signature = "sha256=" + hmac.new(self.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            return hmac.compare_digest(signature, headers["X-Hub-Signature-256"])
+        if "X-Gitlab-Token" in headers:
+            return hmac.compare_digest(self.secret, headers["X-Gitlab-Token"])
+        return False
+
+    def parse(self, headers, body):
+        """
+        Return the job for a webhook, or None if git-bob is not mentioned or the webhook was delivered before.
+
+        Raises
+        ------
+        PermissionError
+            If the webhook can not be verified.
+        """
+        if not self.verify(headers, body):
+            raise PermissionError("Invalid webhook signature")
+        payload = json.loads(body)
+        if "X-GitHub-Event" in headers:
+            job = parse_github_event(headers["X-GitHub-Event"], payload)
+            delivery = headers.get("X-GitHub-Delivery")
+        elif "X-Gitlab-Event" in headers:
+            job = parse_gitlab_event(headers["X-Gitlab-Event"], payload)
+            delivery = headers.get("X-Gitlab-Event-UUID")
+        else:
+            return None
+        if job is None or self.agent_name not in job["text"].lower():
+            return None
+
+        with self._lock:
+            if delivery is not None:
+                if delivery in self._deliveries:
+                    return None
+                self._deliveries[delivery] = True
+                while len(self._deliveries) > _REMEMBERED_DELIVERIES:
+                    self._deliveries.popitem(last=False)
+        return job
+
+    def enqueue(self, job):
+        """Queue a job for handle_event, returns the id of the event in the queue."""
+        from ._queue import issue_key
+        event_id = self.queue.enqueue(issue_key(job["repository"], job["issue"]), job)
+        self._wakeup.set()
+        return event_id
+
+    def _dispatch_events(self):
+        """Start queued events in the workers when it is their turn, until the service is stopped."""
+        from functools import partial
+        while not self._stopping.is_set():
+            event = self.queue.claim()
+            if event is None:
+                # new and finished events wake us up, debounced events become ready over time
+                self._wakeup.wait(timeout=0.5)
+                self._wakeup.clear()
+                continue
+            future = self.executor.submit(handle_event, event["payload"])
+            with self._lock:
+                self.statistics["dispatched"] += 1
+                self._futures.add(future)
+            future.add_done_callback(partial(self._done, event["id"]))
+
+    def _done(self, event_id, future):
+        failed = future.exception() is not None or future.result()["status"] in ["failed", "timeout"]
+        self.queue.complete(event_id, "failed" if failed else "done")
+        with self._lock:
+            self._futures.discard(future)
+            self.statistics["failed" if failed else "completed"] += 1
+        self._wakeup.set()
+        if future.exception() is not None:
+            print("Worker failed:", future.exception())
+        else:
+            result = future.result()
+            print(f"{result['repository']}#{result['issue']} {result['trigger']}: {result['status']} "
+                  f"after {result['seconds']} s")
+
+    def join(self, timeout=None):
+        """Wait until all queued events are handled, returns False if the timeout (s) passed before."""
+        start = time.time()
+        while True:
+            counts = self.queue.counts()
+            with self._lock:
+                busy = len(self._futures) > 0
+            if not busy and counts.get("pending", 0) == 0 and counts.get("running", 0) == 0:
+                return True
+            if timeout is not None and time.time() - start > timeout:
+                return False
+            time.sleep(0.05)
+
+    def receive(self, headers, body):
+        """Handle a webhook, returns the HTTP status and the response body."""
+        with self._lock:
+            self.statistics["received"] += 1
+        try:
+            job = self.parse(headers, body)
+        except PermissionError as e:
+            return 401, {"error": str(e)}
+        except (ValueError, KeyError) as e:
+            return 400, {"error": f"Invalid payload: {e}"}
+        if job is None:
+            with self._lock:
+                self.statistics["ignored"] += 1
+            return 200, {"queued": False}
+        return 202, {"queued": True, "event": self.enqueue(job)}
+
+    def start(self, host="127.0.0.1", port=0):
+        """Start the workers and serve in a background thread, returns the server url."""
+        import multiprocessing
+        import tempfile
+        from concurrent.futures import ProcessPoolExecutor
+        from ._queue import EventQueue, get_event_queue
+        service = self
+
+        if self.queue is None:
+            self.queue = get_event_queue(max_concurrency=self.max_workers)
+        if self.queue is None:
+            self.queue = EventQueue(os.path.join(tempfile.mkdtemp(), "events.sqlite"), max_concurrency=self.max_workers)
+
+        if self.executor is None:
+            # workers are started fresh (not forked), because the server runs threads already
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_initialize_worker)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length > 0 else b""
+                status, response = service.receive(dict(self.headers.items()), body)
+                self._send(status, response)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/health":
+                    with service._lock:
+                        self._send(200, dict(service.statistics, running=len(service._futures),
+                                             queue=service.queue.counts()))
+                else:
+                    self._send(404, {"error": "Not found"})
+
+            def _send(self, status, response):
+                content = json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self._stopping.clear()
+        self._dispatcher = threading.Thread(target=self._dispatch_events, daemon=True)
+        self._dispatcher.start()
+        return self.url
+
+    def stop(self, wait=True):
+        """
+        Stop receiving webhooks and shut the workers down, by default after the running events are handled.
+
+        Events which are still queued are handled after the next start.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._dispatcher is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._dispatcher.join()
+            self._dispatcher = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve():
+    """
+    Entry point of git-bob-serve: receive webhooks until interrupted, see module description.
+    """
+    import sys
+
+    arguments = [argument for argument in sys.argv[1:] if argument != "--insecure"]
+    host = os.environ.get("GIT_BOB_SERVE_HOST", "127.0.0.1")
+    port = int(arguments[0] if len(arguments) > 0 else os.environ.get("GIT_BOB_SERVE_PORT", "8000"))
+
+    service = WebhookService(insecure=True if "--insecure" in sys.argv[1:] else None)
+    if len(service.secret) == 0:
+        if not service.insecure:
+            print("Error: GIT_BOB_WEBHOOK_SECRET is not set. Configure the secret of the webhook, or start "
+                  "git-bob-serve with --insecure to accept webhooks without verification.")
+            sys.exit(1)
+        print("Warning: GIT_BOB_WEBHOOK_SECRET is not set, webhooks are not verified.")
+    url = service.start(host, port)
+    print(f"git-bob is listening on {url} with {service.max_workers} workers")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("Shutting down, waiting for running events")
+    finally:
+        service.stop()
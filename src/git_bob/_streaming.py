@@ -0,0 +1,136 @@
+# This module consumes the responses of language models while they are streamed (see
+# git_bob._endpoints.stream_prompt): the text is accumulated, <original_part>/<new_part> blocks are parsed as soon
+# as they are complete, and the partial response is checkpointed to a file regularly. If git-bob is interrupted
+# (e.g. by the CI timeout), the checkpoint still contains the output received so far; the locations of
+# unfinished checkpoints are printed when the process times out. Checkpoints of completed responses are removed.
+#
+# Configuration:
+# * GIT_BOB_CHECKPOINT_DIR: folder the checkpoints are written to, default: "checkpoints" in the cache directory
+#   (see git_bob._utilities.get_cache_directory) or a temporary folder if caching is disabled
+# * GIT_BOB_CHECKPOINT_INTERVAL: seconds between checkpoint writes (default 2)
+#
+import os
+import re
+import threading
+import time
+
+_active_checkpoints = []
+_active_checkpoints_lock = threading.Lock()
+
+
+class StreamingContent:
+    """
+    Accumulates a streamed response and parses replacement blocks incrementally, see module description.
+
+    Parameters
+    ----------
+    checkpoint_file : str, optional
+        File the partial response is written to regularly. By default, no checkpoint is written.
+    checkpoint_interval : float, optional
+        Seconds between checkpoint writes, default: GIT_BOB_CHECKPOINT_INTERVAL or 2
+    """
+
+    def __init__(self, checkpoint_file=None, checkpoint_interval=None):
+        if checkpoint_interval is None:
+            checkpoint_interval = float(os.environ.get("GIT_BOB_CHECKPOINT_INTERVAL", "2"))
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self.replacements = []
+        self._chunks = []
+        self._unparsed = ""
+        self._last_checkpoint = None
+        if checkpoint_file is not None:
+            with _active_checkpoints_lock:
+                if checkpoint_file not in _active_checkpoints:
+                    _active_checkpoints.append(checkpoint_file)
+
+    @property
+    def text(self):
+        """The response received so far."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the response.
+
+        Returns
+        -------
+        list of tuple
+            The (original_part, new_part) replacements completed by this chunk.
+        """
+        self._chunks.append(chunk)
+        self._unparsed = self._unparsed + chunk
+
+        completed = []
+        while "</new_part>" in self._unparsed:
+            part, self._unparsed = self._unparsed.split("</new_part>", 1)
+            replacement = _parse_replacement(part)
+            if replacement is not None:
+                completed.append(replacement)
+        self.replacements.extend(completed)
+
+        if self.checkpoint_file is not None and (self._last_checkpoint is None or
+                                                 time.time() - self._last_checkpoint >= self.checkpoint_interval):
+            self.checkpoint()
+        return completed
+
+    def consume(self, chunks):
+        """Feed all chunks of a response and return the complete text."""
+        for chunk in chunks:
+            self.feed(chunk)
+        return self.text
+
+    def checkpoint(self):
+        """Write the response received so far to the checkpoint file."""
+        if self.checkpoint_file is None:
+            return
+        folder = os.path.dirname(self.checkpoint_file)
+        if len(folder) > 0:
+            os.makedirs(folder, exist_ok=True)
+        # write completely before replacing, hence the checkpoint is never truncated by an interruption
+        temporary_file = self.checkpoint_file + ".tmp"
+        with open(temporary_file, "w", encoding="utf-8") as file:
+            file.write(self.text)
+        os.replace(temporary_file, self.checkpoint_file)
+        self._last_checkpoint = time.time()
+
+    def done(self):
+        """Mark the response as complete and remove its checkpoint."""
+        if self.checkpoint_file is None:
+            return
+        with _active_checkpoints_lock:
+            if self.checkpoint_file in _active_checkpoints:
+                _active_checkpoints.remove(self.checkpoint_file)
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+
+def _parse_replacement(part):
+    """Return (original_part, new_part) of the text before a </new_part> tag, or None if it is incomplete."""
+    if "<original_part>" not in part or "</original_part>" not in part or "<new_part>" not in part:
+        return None
+    original_part = part.split("<original_part>")[1].split("</original_part>")[0].strip("\n")
+    new_part = part.split("<new_part>")[1].strip("\n")
+    return original_part, new_part
+
+
+def checkpoint_path(repository, issue, filename):
+    """
+    Return the checkpoint file for the response modifying a file while working on an issue.
+    """
+    import tempfile
+    from ._utilities import get_cache_directory
+
+    folder = os.environ.get("GIT_BOB_CHECKPOINT_DIR")
+    if folder is None or len(folder.strip()) == 0:
+        folder = get_cache_directory("checkpoints")
+    if folder is None:
+        folder = os.path.join(tempfile.gettempdir(), "git-bob-checkpoints")
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", f"{repository}_{issue}_{filename}")
+    return os.path.join(os.path.abspath(folder), name + ".partial")
+
+
+def active_checkpoints():
+    """Return the checkpoint files of responses which are not complete (yet)."""
+    with _active_checkpoints_lock:
+        return [f for f in _active_checkpoints if os.path.exists(f)]
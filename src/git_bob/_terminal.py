@@ -6,7 +6,6 @@ def command_line_interface():
     import os 
     import sys
     import signal
-    from functools import partial
 
     from ._github_utilities import get_most_recent_comment_on_issue, add_comment_to_issue
     from ._ai_github_utilities import setup_ai_remark, solve_github_issue, review_pull_request, comment_on_issue, split_issue_in_sub_issues
@@ -15,10 +14,13 @@ def command_line_interface():
     from ._logger import Log
     from github.GithubException import UnknownObjectException
     from ._utilities import run_cli
-    import inspect
 
     print("Hello")
 
+    # record / replay host and language model traffic, see git_bob._cassette
+    from ._cassette import start_cassette, stop_cassette, cassette_prompt_function
+    start_cassette()
+
     # read environment variables
     timeout_in_seconds = os.environ.get("TIMEOUT_IN_SECONDS", 900) # 15 minutes
     Config.llm_name = os.environ.get("GIT_BOB_LLM_NAME", "gpt-4o-2024-08-06")
@@ -39,26 +41,6 @@ def command_line_interface():
     Log().log(f"I am {agent_name} " + str(__version__))
     Log().log(f"Accessing {Config.git_server_url}")
 
-    # initialize prompt handlers
-    prompt_handlers = init_prompt_handlers()
-
-    # determine values for aliases
-    model_aliases = {}
-    for key, value in prompt_handlers.items():
-        if value is not None:
-            try:
-                signature = inspect.signature(value)
-                model_aliases[key] = key + ":" + signature.parameters['model'].default
-            except:
-                continue
-    print("model aliases:\n", model_aliases)
-
-    available_handlers = {}
-    for key, value in prompt_handlers.items():
-        if value is not None:
-            available_handlers[key] = value
-    print("Available prompt handlers:", ", ".join([p.replace(":","") for p in list(available_handlers.keys())]))
-
     # Print out all arguments passed to the script
     print("Script arguments:")
     for arg in sys.argv[1:]:
@@ -71,12 +53,23 @@ def command_line_interface():
     Config.running_in_gitlab_ci = task.endswith("-action") and not "https://github.com" in Config.git_server_url
     task = task.replace("-action", "")
 
+    # in the CI, we run inside a checkout of the repository and can read files from there (opt-in, because the
+    # checkout may be shallow or lack other branches)
+    use_local_checkout = os.environ.get("GIT_BOB_USE_LOCAL_CHECKOUT", "False")
+    if use_local_checkout.lower() in ["true", "1", "yes"]:
+        import git_bob._local_utilities as lu
+        Config.git_utilities = lu
+        print("Reading repository content from local checkout")
+
     # setting timeout
     if Config.running_in_github_ci or Config.running_in_gitlab_ci:
         print(f"Running in CI. Setting timeout to {timeout_in_seconds / 60} minutes.")
         # in case we run in the github-CI, we set a timeout
         def handler(signum, frame):
+            from ._streaming import active_checkpoints
             print("Process timed out")
+            for checkpoint in active_checkpoints():
+                print("Partial response saved in", checkpoint)
             sys.exit(1)
         signal.signal(signal.SIGALRM, handler)
         signal.alarm(timeout_in_seconds)  # Set the timeout to 3 minutes
@@ -106,45 +99,8 @@ def command_line_interface():
     print("text: ", text)
     print(f"{agent_name} ask in text", f"{agent_name} ask" in text)
 
-    # handle ask-llm task option (using model names or aliases to select the LLM)
-    if f"{agent_name} ask" in text:
-        # example:
-        # git-bob ask gpt-4o to solve this issue -> git-bob solve this issue
-        print("Dynamic LLM selection using aliases")
-        new_llm_name = text.split(f"{agent_name} ask")[-1].strip().split(" ")[0]
-        text = text.replace(f"{agent_name} ask {new_llm_name} to ", f"{agent_name} ")
-
-        # Apply model alias if it exists
-        if new_llm_name in model_aliases:
-            new_llm_name  = model_aliases[new_llm_name]
-        for key in prompt_handlers:
-            if key in new_llm_name:
-                Config.llm_name = new_llm_name
-                break
-
-
-    prompt_function = None
-    prompt_handlers = init_prompt_handlers() # reinitialize, because configured LLM may have changed
-
-    # search for the leading model provider (left of : )
-    if ":" in Config.llm_name:
-        provider = Config.llm_name.split(":")[0]
-        for key, value in prompt_handlers.items():
-            if key == provider:
-                Log().log(f"Selecting prompt handler by provider name ({provider}): " + value.__name__)
-                prompt_function = partial(value, model=Config.llm_name)
-                break
-    else:
-        for key, value in prompt_handlers.items():
-            if key in Config.llm_name:
-                Log().log("Selecting prompt handler by llm_name: " + value.__name__)
-                prompt_function = partial(value, model=Config.llm_name)
-                break
-
-    if prompt_function is None:
-        llm_name = Config.llm_name[1:]
-        raise NotImplementedError(f"Make sure to specify the environment variables GIT_BOB_LLM_NAME and corresponding API KEYs (llm_name:_{llm_name}).")
-    Log().log("Using language model: _" + Config.llm_name[1:])
+    text, prompt_function = select_prompt_function(text, agent_name)
+    prompt_function = cassette_prompt_function(prompt_function)
 
     text = text.replace(f"{agent_name}, ", f"{agent_name} ")
     text = text.replace(f"{agent_name} please ", f"{agent_name} ")
@@ -202,26 +158,138 @@ def command_line_interface():
     else:
         base_branch = "main"
 
+    # in the CI, wait until other git-bob runs on this issue are done, see git_bob._queue
+    queue, event_id = None, None
+    if Config.running_in_github_ci or Config.running_in_gitlab_ci:
+        from ._queue import get_event_queue, issue_key
+        queue = get_event_queue()
+    if queue is not None:
+        event_id = queue.enqueue(issue_key(repository, issue), {"task": task, "text": text})
+        if not queue.wait_for_turn(event_id):
+            print("A more recent request on this issue supersedes this one. I show myself out.")
+            sys.exit(0)
+
     # execute the task
+    from ._prompt_cache import bypass_prompt_cache, bypassed_triggers, get_prompt_cache
     something_done = False
-    for trigger, handler in triggers.items():
-        if f"{agent_name} {trigger}" in text:
-            print("Using trigger:", trigger)
-            handler(repository=repository,
-                    issue=issue,
-                    prompt_function=prompt_function,
-                    base_branch=base_branch)
-
-            something_done = True
-            break
+    try:
+        for trigger, handler in triggers.items():
+            if f"{agent_name} {trigger}" in text:
+                print("Using trigger:", trigger)
+                with bypass_prompt_cache(trigger in bypassed_triggers()):
+                    handler(repository=repository,
+                            issue=issue,
+                            prompt_function=prompt_function,
+                            base_branch=base_branch)
+
+                something_done = True
+                break
+    finally:
+        if queue is not None:
+            queue.complete(event_id, "done" if something_done else "failed")
 
     if not something_done:
         raise NotImplementedError(f"Unknown task. I show myself out.")
 
+    from ._rate_limit import RateLimitScheduler
+    from ._endpoints import TokenUsage
+    Log().log(RateLimitScheduler().summary())
+    Log().log(TokenUsage().summary())
+    if get_prompt_cache() is not None:
+        Log().log(get_prompt_cache().summary())
+    stop_cassette()
+
     print("Done. Summary:")
     print("* " + "\n* ".join(Log().get()))
 
 
+def select_prompt_function(text, agent_name):
+    """
+    Select the language model and its prompt handler.
+
+    The model is configured in Config.llm_name and can be overwritten in the text,
+    e.g. "git-bob ask gpt-4o to solve this issue". Config.llm_name is updated accordingly.
+
+    Parameters
+    ----------
+    text : str
+        The (lower case) comment git-bob was called with.
+    agent_name : str
+        The name git-bob is called by, e.g. "git-bob".
+
+    Returns
+    -------
+    text : str
+        The text without the model selection, e.g. "git-bob solve this issue"
+    prompt_function : function
+        The prompt handler, with the model set.
+    """
+    import inspect
+    from functools import partial
+    from ._utilities import Config
+    from ._logger import Log
+
+    # initialize prompt handlers
+    prompt_handlers = init_prompt_handlers()
+
+    # determine values for aliases
+    model_aliases = {}
+    for key, value in prompt_handlers.items():
+        if value is not None:
+            try:
+                signature = inspect.signature(value)
+                model_aliases[key] = key + ":" + signature.parameters['model'].default
+            except:
+                continue
+    print("model aliases:\n", model_aliases)
+
+    available_handlers = {}
+    for key, value in prompt_handlers.items():
+        if value is not None:
+            available_handlers[key] = value
+    print("Available prompt handlers:", ", ".join([p.replace(":","") for p in list(available_handlers.keys())]))
+
+    # handle ask-llm task option (using model names or aliases to select the LLM)
+    if f"{agent_name} ask" in text:
+        # example:
+        # git-bob ask gpt-4o to solve this issue -> git-bob solve this issue
+        print("Dynamic LLM selection using aliases")
+        new_llm_name = text.split(f"{agent_name} ask")[-1].strip().split(" ")[0]
+        text = text.replace(f"{agent_name} ask {new_llm_name} to ", f"{agent_name} ")
+
+        # Apply model alias if it exists
+        if new_llm_name in model_aliases:
+            new_llm_name  = model_aliases[new_llm_name]
+        for key in prompt_handlers:
+            if key in new_llm_name:
+                Config.llm_name = new_llm_name
+                break
+
+    prompt_function = None
+    prompt_handlers = init_prompt_handlers() # reinitialize, because configured LLM may have changed
+
+    # search for the leading model provider (left of : )
+    if ":" in Config.llm_name:
+        provider = Config.llm_name.split(":")[0]
+        for key, value in prompt_handlers.items():
+            if key == provider:
+                Log().log(f"Selecting prompt handler by provider name ({provider}): " + value.__name__)
+                prompt_function = partial(value, model=Config.llm_name)
+                break
+    else:
+        for key, value in prompt_handlers.items():
+            if key in Config.llm_name:
+                Log().log("Selecting prompt handler by llm_name: " + value.__name__)
+                prompt_function = partial(value, model=Config.llm_name)
+                break
+
+    if prompt_function is None:
+        llm_name = Config.llm_name[1:]
+        raise NotImplementedError(f"Make sure to specify the environment variables GIT_BOB_LLM_NAME and corresponding API KEYs (llm_name:_{llm_name}).")
+    Log().log("Using language model: _" + Config.llm_name[1:])
+    return text, prompt_function
+
+
 def init_prompt_handlers():
     """Initialize and return prompt handlers from entry points.
 
@@ -234,6 +302,11 @@ def init_prompt_handlers():
     import os
     import re
     
+    from ._prompt_cache import get_prompt_cache, cached_prompt_handler
+
+    # identical prompts are answered from the prompt cache, if enabled
+    use_prompt_cache = get_prompt_cache() is not None
+
     handlers = {}
     module_filter = os.environ.get("GIT_BOB_EXTENSIONS_FILTER_REGEXP", ".*")
     for entry_point in entry_points(group='git_bob.prompt_handlers'):
@@ -241,6 +314,8 @@ def init_prompt_handlers():
             if not re.match(module_filter, entry_point.module):
                 continue
             handler_func = entry_point.load()
+            if use_prompt_cache:
+                handler_func = cached_prompt_handler(handler_func)
             key = entry_point.name
             handlers[key] = handler_func
         except Exception as e:
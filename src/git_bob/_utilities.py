@@ -1,6 +1,8 @@
 # This module provides utility functions for text processing, including functions to remove indentation and outer markdown from text.
+import contextvars
 import sys
 import warnings
+from contextlib import contextmanager
 from functools import lru_cache
 from functools import wraps
 from toolz import curry
@@ -53,7 +55,32 @@ def remove_outer_markdown(text):
     return text
 
 
-class Config:
+# attributes of Config which describe the task currently handled, see task_context
+_TASK_ATTRIBUTES = ["repository", "issue", "is_pull_request", "pull_request", "remarks"]
+
+# the task attributes of the current context, or None to use the class attributes of Config
+_task_state = contextvars.ContextVar("git_bob_task_state", default=None)
+
+
+class _ConfigType(type):
+    """Reads and writes the task attributes of Config in the current task_context, if any."""
+
+    def __getattribute__(cls, name):
+        if name in _TASK_ATTRIBUTES:
+            state = _task_state.get()
+            if state is not None:
+                return state[name]
+        return super().__getattribute__(name)
+
+    def __setattr__(cls, name, value):
+        state = _task_state.get()
+        if name in _TASK_ATTRIBUTES and state is not None:
+            state[name] = value
+        else:
+            super().__setattr__(name, value)
+
+
+class Config(metaclass=_ConfigType):
     llm_name = None
     run_id = None
     repository = None
@@ -71,6 +98,58 @@ class ErrorReporting:
     status = False
 
 
+@contextmanager
+def task_context(**attributes):
+    """
+    Handle a task (e.g. one issue) separately from tasks handled concurrently in other threads.
+
+    Within this context, the task attributes of Config (repository, issue, is_pull_request, pull_request and
+    remarks) and the log (see git_bob._logger) belong to this task. They start from the current values, with
+    empty remarks and log, and are shared with the worker threads of git_bob._concurrency.
+
+    Parameters
+    ----------
+    **attributes
+        Initial values of task attributes, e.g. issue=12
+    """
+    from ._logger import Log
+
+    state = {name: type.__getattribute__(Config, name) for name in _TASK_ATTRIBUTES}
+    state["remarks"] = []
+    state.update(attributes)
+    token = _task_state.set(state)
+    try:
+        with Log().separate():
+            yield
+    finally:
+        _task_state.reset(token)
+
+
+def get_cache_directory(name):
+    """
+    Return the folder where git-bob caches data of the given kind (e.g. "http") between runs.
+
+    The location can be configured using the environment variable GIT_BOB_CACHE_DIR, e.g. to persist it
+    using the cache action in the CI. Setting it to an empty string disables caching.
+
+    Parameters
+    ----------
+    name : str
+        Name of the sub-folder
+
+    Returns
+    -------
+    str or None
+        The path to the folder, or None if caching is disabled.
+    """
+    cache_directory = os.environ.get("GIT_BOB_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "git-bob"))
+    if len(cache_directory.strip()) == 0:
+        return None
+    folder = os.path.join(cache_directory, name)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
 def quick_first_response(repository, issue):
     """
     Response to a comment to the GitHub issue just mentioning that we're on it.
@@ -101,8 +180,9 @@ def split_content_and_summary(text):
 
     Parameters
     ----------
-    text : str
-        The input text containing content and summary.
+    text : str or iterable of str
+        The input text containing content and summary, or the chunks of a streamed response
+        (see git_bob._endpoints.stream_prompt), which are consumed as they arrive.
 
     Returns
     -------
@@ -111,6 +191,9 @@ def split_content_and_summary(text):
         - str: The content with outer markdown removed.
         - str: The summary.
     """
+    if not isinstance(text, str):
+        from ._streaming import StreamingContent
+        text = StreamingContent().consume(text)
     text = text.strip("\n").strip()
     temp = text.split("\n")
     summary = temp[-1].strip()
@@ -264,7 +347,9 @@ def image_to_url(image):
 def modify_discussion(discussion, prompt_visionlm=prompt_openai, repository=None, branch_name=None):
     import re
     import docx2markdown
+    from functools import partial
     from ._ai_github_utilities import is_ignored
+    from ._concurrency import run_concurrently
     #from ._github_utilities import get_conversation_on_issue, get_diff_of_pull_request, get_file_in_repository
 
     # Regex to find URLs in the discussion
@@ -277,15 +362,8 @@ def modify_discussion(discussion, prompt_visionlm=prompt_openai, repository=None
     if branch_name is None:
         branch_name = "main"
 
-    # Process each URL based on its type
-    for url in urls:
-        if url.endswith(")"): # happens with ![](url) syntax
-            url = url[:-1]
-        if url.endswith("'"):
-            url = url[:-1]
-        if url.endswith('"'):
-            url = url[:-1]
-            
+    # Read a URL based on its type, returns the URL under which the content is listed and the content
+    def read_url(url):
         url_type = is_github_url(url)
         print("URL:", url)
         print("Type:", url_type)
@@ -294,7 +372,7 @@ def modify_discussion(discussion, prompt_visionlm=prompt_openai, repository=None
         current_datetime = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
         if "### File {url} content" in discussion:
-            continue
+            return url, None
 
         try:
             if url_type == 'issue':
@@ -303,25 +381,26 @@ def modify_discussion(discussion, prompt_visionlm=prompt_openai, repository=None
                 try:
                     issue_number = int(parts[-1])
                 except:
-                    continue
-                additional_content[url] = Config.git_utilities.get_conversation_on_issue(repo, issue_number)
+                    return url, None
+                return url, Config.git_utilities.get_conversation_on_issue(repo, issue_number)
             elif url_type == 'pull_request':
                 parts = url.split('/')
                 repo = parts[3] + '/' + parts[4]
                 try:
                     pr_number = int(parts[-1])
                 except:
-                    continue
+                    return url, None
 
                 # Get both the diff and discussion on pull request
-                additional_content[url] = (Config.git_utilities.get_conversation_on_issue(repo, pr_number) +
-                                           Config.git_utilities.get_diff_of_pull_request(repo, pr_number))
+                return url, (Config.git_utilities.get_conversation_on_issue(repo, pr_number) +
+                             str(Config.git_utilities.get_diff_of_pull_request(repo, pr_number)))
             elif url_type == 'file':
                 parts = url.split('/')
                 #repo = parts[3] + '/' + parts[4]
                 #branch_name = parts[6]
                 file_path = '/'.join(parts[7:])
-                temp_file_name = current_datetime + "_" + file_path.split('/')[-1]
+                # URLs are read concurrently, hence the temporary file names must be unique
+                temp_file_name = current_datetime + "_" + str(abs(hash(url))) + "_" + file_path.split('/')[-1]
                 url = url.replace("/blob/", "/raw/")
                 download_url(url, temp_file_name)
                 #file_contents = Config.git_utilities.get_file_in_repository (repo, branch_name, file_path).decoded_content.decode()
@@ -338,13 +417,29 @@ def modify_discussion(discussion, prompt_visionlm=prompt_openai, repository=None
 
                 os.remove(temp_file_name)
 
-                additional_content[url] = file_contents
+                return url, file_contents
             elif url_type == 'image':
                 image = load_image_from_url(url)
-                image_content = prompt_visionlm(VISION_SYSTEM_MESSAGE + "\n\nDescribe this image.", image=image)
-                additional_content[url] = image_content
+                return url, prompt_visionlm(VISION_SYSTEM_MESSAGE + "\n\nDescribe this image.", image=image)
         except Exception as e:
             print(f"Error while processing URL {url}: {e}")
+        return url, None
+
+    # Remove characters of the surrounding markdown syntax
+    for i, url in enumerate(urls):
+        if url.endswith(")"): # happens with ![](url) syntax
+            url = url[:-1]
+        if url.endswith("'"):
+            url = url[:-1]
+        if url.endswith('"'):
+            url = url[:-1]
+        urls[i] = url
+    urls = list(dict.fromkeys(urls))
+
+    # linked issues, pull-requests and files are independent of each other and retrieved concurrently
+    for url, content in run_concurrently([partial(read_url, url) for url in urls]):
+        if content is not None:
+            additional_content[url] = content
 
     # read local files
     temp = discussion.replace("\n", " ")
@@ -409,6 +504,171 @@ def download_url(url, output_path):
         print(f"Error occurred while downloading the file: {e}")
 
 
+def download_file(url, output_path, expected_sha256=None, headers=None, max_attempts=3, chunk_size=1024 * 1024):
+    """
+    Download a file in chunks without holding it in memory, resuming interrupted downloads.
+
+    The file is written to output_path + ".part" first and moved to output_path once complete.
+    If a partial file exists (e.g. from an interrupted attempt), only the remaining bytes are requested. The ETag or
+    Last-Modified header of the response is stored next to the partial file and sent as If-Range, hence the server
+    sends the complete file if it changed in the meantime. Partial files without such a validator are not resumed.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the file to download.
+    output_path : str
+        The path where the file will be saved.
+    expected_sha256 : str, optional
+        If given, the download is verified against this hash.
+    headers : dict, optional
+        Additional request headers, e.g. for authentication.
+    max_attempts : int, optional
+        Number of attempts, each continuing where the previous one stopped.
+    chunk_size : int, optional
+        Number of bytes read and written at once.
+
+    Returns
+    -------
+    str
+        The sha256 hash of the downloaded file (hex).
+    """
+    import hashlib
+    import requests
+
+    print("Downloading ", url, " to ", output_path)
+    partial_path = output_path + ".part"
+    validator_path = partial_path + ".validator"
+    for attempt in range(max_attempts):
+        validator = None
+        if os.path.exists(validator_path):
+            with open(validator_path, encoding="utf-8") as file:
+                validator = file.read().strip()
+        if os.path.exists(partial_path) and not validator:
+            # we cannot tell whether the remote file changed since, hence appending to it might corrupt it
+            os.remove(partial_path)
+
+        # hash what was downloaded before, to continue hashing the remaining bytes
+        sha256 = hashlib.sha256()
+        downloaded = 0
+        if os.path.exists(partial_path):
+            with open(partial_path, "rb") as file:
+                for chunk in iter(lambda: file.read(chunk_size), b""):
+                    sha256.update(chunk)
+                    downloaded += len(chunk)
+
+        request_headers = dict(headers or {})
+        if downloaded > 0:
+            request_headers["Range"] = f"bytes={downloaded}-"
+            request_headers["If-Range"] = validator
+        try:
+            with requests.get(url, headers=request_headers, stream=True, timeout=60) as response:
+                if response.status_code == 416:
+                    # range not satisfiable: the partial file is complete already, or outdated
+                    expected_size = response.headers.get("Content-Range", "").split("/")[-1]
+                    if expected_size != str(downloaded):
+                        os.remove(partial_path)
+                        continue
+                else:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        # the server ignored the range request or the file changed, start from scratch
+                        sha256 = hashlib.sha256()
+                        downloaded = 0
+                        _store_download_validator(validator_path, response.headers)
+                    with open(partial_path, "ab" if downloaded > 0 else "wb") as file:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            sha256.update(chunk)
+                            file.write(chunk)
+                            downloaded += len(chunk)
+                    expected_size = response.headers.get("Content-Length")
+                    if response.status_code == 206:
+                        expected_size = response.headers.get("Content-Range", "").split("/")[-1]
+                    if expected_size is not None and expected_size.isdigit() and int(expected_size) != downloaded:
+                        raise IOError(f"Incomplete download: {downloaded} of {expected_size} bytes")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError, IOError) as e:
+            print(f"Download interrupted ({e}), attempt {attempt + 1} of {max_attempts}")
+            if attempt + 1 == max_attempts:
+                raise
+            continue
+
+        digest = sha256.hexdigest()
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        if expected_sha256 is not None and digest != expected_sha256:
+            os.remove(partial_path)
+            raise ValueError(f"Downloaded file {url} has sha256 {digest}, expected {expected_sha256}")
+        os.replace(partial_path, output_path)
+        print(f"File downloaded successfully and saved to {output_path}")
+        return digest
+
+    raise IOError(f"Failed to download {url}")
+
+
+def _store_download_validator(validator_path, headers):
+    """Store the strong ETag or the Last-Modified date of a download, which can be sent as If-Range when resuming."""
+    validator = headers.get("ETag")
+    if validator is None or validator.startswith("W/"):
+        # weak ETags cannot be used in If-Range
+        validator = headers.get("Last-Modified")
+    if validator is None:
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        return
+    with open(validator_path, "w", encoding="utf-8") as file:
+        file.write(validator)
+
+
+def download_source_file(url):
+    """
+    Download a file which is going to be committed to a repository, see download_to_repository of the git utilities.
+
+    The file is stored in the cache directory ("downloads", see get_cache_directory), hence an interrupted download
+    is resumed by the next run. Files on GitHub are downloaded from raw.githubusercontent.com; if that serves a
+    Git LFS pointer, the object is downloaded from LFS and verified against the sha256 of the pointer.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the file, e.g. "https://github.com/<owner>/<repository>/raw/<branch>/<path>"
+
+    Returns
+    -------
+    tuple
+        The path of the downloaded file and its sha256 (hex). The caller removes the file when done.
+    """
+    import re
+    import hashlib
+    import tempfile
+    from ._lfs import parse_lfs_pointer, lfs_media_url
+
+    # same content as github.com/.../raw/..., but files stored in LFS are served as pointer files
+    match = re.match(r"https://github\.com/([^/]+)/([^/]+)/raw/(.+)$", url)
+    if match is not None:
+        url = f"https://raw.githubusercontent.com/{match.group(1)}/{match.group(2)}/{match.group(3)}"
+
+    folder = get_cache_directory("downloads")
+    if folder is None:
+        folder = os.path.join(tempfile.gettempdir(), "git-bob-downloads")
+        os.makedirs(folder, exist_ok=True)
+    # the same url is downloaded to the same path, where partial downloads of previous runs are found
+    name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + "_" + os.path.basename(url.split("?")[0])
+    output_path = os.path.join(folder, name)
+
+    oid = download_file(url, output_path)
+
+    if os.path.getsize(output_path) <= 1024:
+        with open(output_path, "rb") as file:
+            pointer = parse_lfs_pointer(file.read())
+        media_url = lfs_media_url(url)
+        if pointer is not None and media_url is not None:
+            os.remove(output_path)
+            output_path = output_path + ".lfs"
+            oid = download_file(media_url, output_path, expected_sha256=pointer[0])
+    return output_path, oid
+
+
 def execute_notebook(notebook_content, timeout=600, kernel_name='python3'):
     """
     Execute a Jupyter notebook and return whether an error occurred.
@@ -533,12 +793,111 @@ def clean_output(repository, text):
     for i in range(0, len(temp), 2):
         temp[i] = temp[i].replace("@", "@ ")
     text = "```".join(temp)
-    contributors = Config.git_utilities.get_contributors(repository)
-    for c in contributors:
-        text = text.replace("@ " + c, "@" + c)
+
+    # restore tags of contributors
+    import re
+    contributors = get_contributor_set(repository)
+    text = re.sub(r"@ ([\w-]+(?:\.[\w-]+)*(?:\[bot\])?)", lambda match: "@" + match.group(1) if match.group(1) in contributors else match.group(0), text)
     return text
 
 
+# contributors of repositories, read during this run
+_contributors = {}
+
+
+def forget_contributors():
+    """Forget the contributors read during this run, e.g. before a long-running process handles the next event."""
+    _contributors.clear()
+
+# access decisions of this run, keyed by (server, repository, user)
+_access_decisions = {}
+
+
+def cached_access_decision(repository, user, determine_access):
+    """
+    Determine if a user has access to a repository, reusing recent decisions.
+
+    Decisions are kept in memory only, hence they are never reused by following runs (e.g. from a restored
+    cache directory), where access may have been granted or revoked meanwhile. Within a long-running process
+    (see git_bob._server), they are reused for GIT_BOB_ACCESS_CACHE_TTL seconds (default: 10 minutes), so
+    that repeated comments from the same person don't query the server again.
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+    user : str
+        The user name
+    determine_access : function
+        Asks the server, returns True if the user has access.
+
+    Returns
+    -------
+    bool
+    """
+    import time
+
+    ttl = float(os.environ.get("GIT_BOB_ACCESS_CACHE_TTL", 10 * 60))
+    key = (Config.git_server_url, repository, user)
+    if key in _access_decisions and time.time() - _access_decisions[key][0] < ttl:
+        return _access_decisions[key][1]
+
+    access = bool(determine_access())
+    _access_decisions[key] = (time.time(), access)
+    return access
+
+
+def get_contributor_set(repository):
+    """
+    Return the set of contributors of a repository.
+
+    The set is determined once per run. It is also stored in the cache directory (see get_cache_directory) and
+    reused by following runs until it is older than GIT_BOB_CONTRIBUTORS_TTL seconds (default: one day).
+
+    Parameters
+    ----------
+    repository : str
+        The full name of the repository (e.g., "username/repo-name").
+
+    Returns
+    -------
+    set
+        The user names of the contributors.
+    """
+    import json
+    import time
+    import hashlib
+
+    key = Config.git_server_url + repository
+    if key in _contributors:
+        return _contributors[key]
+
+    filename = None
+    cache_directory = get_cache_directory("contributors")
+    if cache_directory is not None:
+        filename = os.path.join(cache_directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+    ttl = float(os.environ.get("GIT_BOB_CONTRIBUTORS_TTL", 24 * 60 * 60))
+
+    contributors = None
+    if filename is not None and os.path.exists(filename):
+        try:
+            with open(filename) as f:
+                stored = json.load(f)
+            if time.time() - stored["time"] < ttl:
+                contributors = set(stored["contributors"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if contributors is None:
+        contributors = set(Config.git_utilities.get_contributors(repository))
+        if filename is not None:
+            with open(filename, "w") as f:
+                json.dump({"time": time.time(), "contributors": sorted(contributors)}, f)
+
+    _contributors[key] = contributors
+    return contributors
+
+
 SENSIBLE_ENV_KEYS = ["ANTHROPIC_API_KEY",
                     "GOOGLE_API_KEY",
                     "OPENAI_API_KEY",
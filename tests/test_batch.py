@@ -0,0 +1,37 @@
+def test_filter_issues():
+    from git_bob._batch import filter_issues
+
+    issues = {1: "Fix plotting", 2: "Add docs", 3: "plot colors", 12: "Bug"}
+    assert filter_issues(issues) == [1, 2, 3, 12]
+    assert filter_issues(issues, "1-3, 12") == [1, 2, 3, 12]
+    assert filter_issues(issues, "2") == [2]
+    assert filter_issues(issues, "plot") == [1, 3]
+
+
+def test_run_batch(tmp_path, monkeypatch):
+    from git_bob._fake_server import FakeServer
+    from git_bob._batch import run_batch, filter_issues, format_report
+    from git_bob._utilities import Config
+    from git_bob import _github_utilities as github
+    from test_fake_server import _use_fake_server
+
+    def prompt_fake(message, model="fake"):
+        return "[]" if "JSON list" in message else "Triaged"
+
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        monkeypatch.setattr(Config, "git_utilities", github)
+        repository = server.add_repository("someone/something", {"README.md": "# Hello\n"})
+        for title in ["Plot is empty", "Add docs", "Plot colors"]:
+            repository.add_issue(title, "Please have a look")
+
+        issues = filter_issues(github.list_issues("someone/something"), "plot")
+        report = run_batch("someone/something", "comment-on-issue", issues, prompt_fake, max_concurrency=2)
+
+        assert report["issues"] == 2
+        assert report["failed"] == {}
+        assert report["api_calls"] > 0
+        assert "2 of 2 issues handled" in format_report(report)
+        for issue in [1, 3]:
+            assert "Triaged" in repository.issues[issue]["comments"][-1]["body"]
+        assert len(repository.issues[2]["comments"]) == 0
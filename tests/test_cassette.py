@@ -0,0 +1,52 @@
+def test_cassette_replays_host_traffic(tmp_path, monkeypatch):
+    from git_bob._fake_server import FakeServer
+    from git_bob._file_cache import FileCache
+    from git_bob._cassette import start_cassette, stop_cassette
+    from git_bob import _github_utilities as github
+    from test_fake_server import _use_fake_server
+
+    cassette_file = str(tmp_path / "cassette.json.gz")
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        repository = server.add_repository("someone/something", {"README.md": "# Hello\n", "src/code.py": "print(1)\n"})
+        issue = repository.add_issue("Greeting", "Please say hello")
+
+        start_cassette(cassette_file, "record")
+        recorded_conversation = github.get_conversation_on_issue("someone/something", issue)
+        recorded_files = github.list_repository_files("someone/something")
+        stop_cassette()
+        number_of_requests = len(server.requests)
+
+    # the server is gone, everything comes from the cassette
+    FileCache().clear()
+    monkeypatch.setattr(github, "_issue_conversations", {})
+    start_cassette(cassette_file, "replay", time_scale=0)
+    try:
+        assert github.get_conversation_on_issue("someone/something", issue) == recorded_conversation
+        assert github.list_repository_files("someone/something") == recorded_files
+    finally:
+        stop_cassette()
+    assert number_of_requests > 0
+
+
+def test_cassette_prompt_function(tmp_path):
+    import pytest
+    from git_bob._cassette import start_cassette, stop_cassette, cassette_prompt_function
+
+    cassette_file = str(tmp_path / "cassette.json")
+    start_cassette(cassette_file, "record")
+    prompt = cassette_prompt_function(lambda message, model=None: message.upper())
+    assert prompt("hello") == "HELLO"
+    assert prompt("bye") == "BYE"
+    stop_cassette()
+
+    start_cassette(cassette_file, "replay", time_scale=0)
+    try:
+        prompt = cassette_prompt_function(lambda message, model=None: "not replayed")
+        assert prompt("bye") == "BYE"
+        # unknown prompts get the next recorded response
+        assert prompt("hello at 12:00") == "HELLO"
+        with pytest.raises(LookupError):
+            prompt("hello")
+    finally:
+        stop_cassette()
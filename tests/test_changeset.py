@@ -0,0 +1,92 @@
+def test_changeset_records_modifications():
+    from git_bob._changeset import Changeset, BlobReference
+
+    changeset = Changeset("someone/something", "main")
+    assert changeset.is_empty()
+
+    changeset.write("README.md", "# Hello", "Update README.md")
+    changeset.rename("docs/a.md", "docs/b.md", "Rename a.md")
+    changeset.copy("README.md", "README2.md", "Copy README.md")
+    changeset.delete("old.txt", "Delete old.txt")
+
+    assert changeset.files["README.md"] == b"# Hello"
+    assert changeset.files["README2.md"] == b"# Hello"
+    assert isinstance(changeset.files["docs/b.md"], BlobReference)
+    assert changeset.files["docs/b.md"].path == "docs/a.md"
+    assert changeset.files["docs/a.md"] is None
+
+    assert changeset.apply_to_file_list(["README.md", "docs/a.md", "old.txt", "setup.py"]) == \
+           ["setup.py", "README.md", "docs/b.md", "README2.md"]
+    assert changeset.commit_message().startswith("Modify 5 files\n\n* Update README.md")
+
+
+def test_changeset_reads_pending_files():
+    from git_bob._changeset import Changeset, git_blob_sha
+
+    changeset = Changeset("someone/something", "main")
+    changeset.write("README.md", "# Hello", "Update README.md")
+    changeset.rename("docs/a.md", "docs/b.md", "Rename a.md")
+
+    assert changeset.get_file("README.md", None).decode() == b"# Hello"
+    # same sha as `git hash-object` would compute
+    assert git_blob_sha(b"") == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+    assert changeset.get_file("docs/b.md", lambda path: "content of " + path) == "content of docs/a.md"
+
+    import pytest
+    with pytest.raises(FileNotFoundError):
+        changeset.get_file("docs/a.md", None)
+    with pytest.raises(FileNotFoundError):
+        changeset.copy("docs/a.md", "docs/c.md", "Copy a.md")
+
+
+def test_active_changesets():
+    from git_bob._changeset import start_changeset, get_changeset, stop_changeset
+
+    changeset = start_changeset("someone/something", "my-branch")
+    assert get_changeset("someone/something", "my-branch") is changeset
+    assert get_changeset("someone/something", "main") is None
+    stop_changeset(changeset)
+    assert get_changeset("someone/something", "my-branch") is None
+
+
+def test_commit_changeset_looks_up_affected_files_only(tmp_path, monkeypatch):
+    import pytest
+    from test_fake_server import _use_fake_server
+    from git_bob._fake_server import FakeServer
+    from git_bob._changeset import start_changeset, stop_changeset
+    from git_bob import _github_utilities as github
+    from git_bob import _gitlab_utilities as gitlab
+
+    files = {f"other/file{i}.txt": f"{i}\n" for i in range(50)}
+    files.update({"README.md": "# Hello\n", "src/code.py": "print(1)\n", "src/old.py": "print(0)\n"})
+
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        repository = server.add_repository("someone/something", files)
+
+        for utilities in [github, gitlab]:
+            branch = utilities.create_branch("someone/something")
+            changeset = start_changeset("someone/something", branch)
+            utilities.write_file_in_branch("someone/something", branch, "src/code.py", "print(2)\n")
+            # README.md is not in the local folder, copies are applied to it
+            utilities.rename_file_in_repository("someone/something", branch, "README.md", "docs/README.md")
+            utilities.copy_file_in_repository("someone/something", branch, "src/code.py", "src/copy.py")
+            assert (tmp_path / "src" / "copy.py").read_text() == "print(2)\n"
+            (tmp_path / "src" / "copy.py").unlink()
+            utilities.delete_file_from_repository("someone/something", branch, "src/old.py")
+            with pytest.raises(RuntimeError):
+                utilities.commit_changeset("someone/something", changeset)
+            stop_changeset(changeset)
+
+            server.requests.clear()
+            utilities.commit_changeset("someone/something", changeset)
+
+            # the tree of the repository is not listed completely
+            trees = [path for method, path in server.requests if "/git/trees/" in path or path.endswith("/repository/tree")]
+            assert len(trees) <= 3
+            assert repository.read(branch, "src/code.py") == b"print(2)\n"
+            assert repository.read(branch, "docs/README.md") == b"# Hello\n"
+            assert repository.read(branch, "src/copy.py") == b"print(2)\n"
+            assert repository.read(branch, "README.md") is None
+            assert repository.read(branch, "src/old.py") is None
+            assert repository.read(branch, "other/file7.txt") == b"7\n"
@@ -0,0 +1,49 @@
+def test_repository_handles_are_cached(monkeypatch):
+    from git_bob import _client_pool
+
+    monkeypatch.setenv("GIT_BOB_MAX_REPOSITORY_HANDLES", "2")
+    _client_pool.forget_repository_handles()
+    opened = []
+
+    def open_repository(name):
+        opened.append(name)
+        return "handle of " + name
+
+    def get(name):
+        return _client_pool._get_repository_handle("api.github.com", name, lambda: open_repository(name))
+
+    assert get("someone/main-repo") == "handle of someone/main-repo"
+    get("someone/other-repo")
+    get("someone/main-repo")
+    get("someone/third-repo")  # evicts the least recently used: other-repo
+    get("someone/main-repo")
+    assert opened == ["someone/main-repo", "someone/other-repo", "someone/third-repo"]
+
+    get("someone/other-repo")
+    assert opened[-1] == "someone/other-repo"
+    _client_pool.forget_repository_handles()
+
+
+def test_one_session_per_host(monkeypatch):
+    from git_bob._client_pool import get_session
+
+    monkeypatch.setenv("GIT_BOB_CACHE_DIR", "")
+    assert get_session("api.github.com") is get_session("api.github.com")
+    assert get_session("api.github.com") is not get_session("gitlab.com")
+
+
+def test_llm_clients_are_reused():
+    from git_bob._client_pool import get_openai_client, get_anthropic_client, forget_llm_clients
+
+    forget_llm_clients()
+    client = get_openai_client(base_url="https://llm.example.com/v1", api_key="key-1")
+    assert get_openai_client(base_url="https://llm.example.com/v1", api_key="key-1") is client
+    other = get_openai_client(base_url="https://llm.example.com/v1", api_key="key-2")
+    assert other is not client
+    # all OpenAI-compatible clients share one connection pool
+    assert other._client is client._client
+
+    assert get_anthropic_client(api_key="key-1") is get_anthropic_client(api_key="key-1")
+    forget_llm_clients()
+    assert get_openai_client(base_url="https://llm.example.com/v1", api_key="key-1") is not client
+    forget_llm_clients()
@@ -0,0 +1,55 @@
+def test_run_concurrently():
+    import time
+    import threading
+    from functools import partial
+    from git_bob._concurrency import run_concurrently
+
+    running = []
+    maximum_running = []
+    lock = threading.Lock()
+
+    def request(number):
+        with lock:
+            running.append(number)
+            maximum_running.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.remove(number)
+        if number == 3:
+            raise ValueError("not found")
+        return number * 2
+
+    start = time.time()
+    results = run_concurrently([partial(request, n) for n in range(6)], max_concurrency=3, return_exceptions=True)
+    duration = time.time() - start
+
+    assert results[:3] == [0, 2, 4]
+    assert isinstance(results[3], ValueError)
+    assert results[4:] == [8, 10]
+    assert max(maximum_running) == 3
+    assert duration < 0.5
+
+
+def test_async_git_utilities():
+    import asyncio
+    import types
+    import pytest
+    from functools import partial
+    from git_bob._concurrency import AsyncGitUtilities, run_concurrently
+
+    git_utilities = types.SimpleNamespace(
+        get_conversation_on_issue=lambda repository, issue: f"Discussion of {repository}#{issue}",
+        list_repository_files=lambda repository: ["README.md"],
+        write_file_in_branch=lambda *args: None)
+    host = AsyncGitUtilities(git_utilities)
+
+    async def main():
+        conversation, files = await asyncio.gather(host.get_conversation_on_issue("someone/something", 1),
+                                                   host.list_repository_files("someone/something"))
+        # the synchronous facade also works from within a running event loop
+        nested = run_concurrently([partial(git_utilities.list_repository_files, "a/b")] * 2)
+        return conversation, files, nested
+
+    assert asyncio.run(main()) == ("Discussion of someone/something#1", ["README.md"], [["README.md"], ["README.md"]])
+    with pytest.raises(AttributeError):
+        host.write_file_in_branch
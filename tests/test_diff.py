@@ -0,0 +1,75 @@
+def test_parse_unified_diff():
+    from git_bob._diff import parse_unified_diff
+
+    text = """diff --git a/README.md b/README.md
+index 1111111..2222222 100644
+--- a/README.md
++++ b/README.md
+@@ -1,2 +1,2 @@
+ # Hello
+-world
++git-bob
+diff --git a/package-lock.json b/package-lock.json
+index 1111111..2222222 100644
+--- a/package-lock.json
++++ b/package-lock.json
+@@ -1,2 +1,3 @@
++  "a": 1,
++  "b": 2,
+-  "c": 3
+diff --git a/docs/image.png b/docs/image.png
+new file mode 100644
+index 0000000..3333333
+Binary files /dev/null and b/docs/image.png differ
+diff --git a/old.py b/new.py
+similarity index 100%
+rename from old.py
+rename to new.py"""
+
+    diff = parse_unified_diff(text.split("\n"))
+
+    assert [f.path for f in diff.files] == ["README.md", "package-lock.json", "docs/image.png", "new.py"]
+    readme, lockfile, image, renamed = diff.files
+    assert readme.patch == "@@ -1,2 +1,2 @@\n # Hello\n-world\n+git-bob"
+    assert (lockfile.added, lockfile.removed) == (2, 1)
+    assert "Lockfile, diff not shown." in str(lockfile)
+    assert "\"a\"" not in str(diff)
+    assert image.binary and image.status == "added"
+    assert renamed.status == "renamed" and renamed.old_path == "old.py"
+    assert diff.summary() == "4 files changed (+3 -2)"
+
+
+def test_diff_budgets():
+    from git_bob._diff import Diff, parse_unified_diff
+
+    patch = "\n".join(["@@ -0,0 +1,100 @@"] + [f"+line {i}" for i in range(100)])
+    diff = Diff(max_file_lines=10, max_file_bytes=10000, max_total_bytes=10000)
+    file = diff.add_patch("a.txt", patch, "added")
+    assert len(file.lines) == 10
+    assert file.added == 100
+    assert "[... 91 more lines of this diff not shown]" in str(diff)
+
+    diff = Diff(max_file_lines=1000, max_file_bytes=10000, max_total_bytes=50)
+    text = "\n".join([f"diff --git a/{name} b/{name}\n{patch}" for name in ["a.txt", "b.txt", "c.txt"]])
+    parse_unified_diff(text.split("\n"), diff)
+    assert [f.path for f in diff.files] == ["a.txt"]
+    assert diff.truncated
+    assert str(diff).endswith("[... further files not shown]")
+
+
+def test_diff_budget_stops_reading():
+    from git_bob._diff import Diff, parse_unified_diff
+
+    lines_read = []
+
+    def huge_diff():
+        yield "diff --git a/data.csv b/data.csv"
+        yield "@@ -0,0 +1,100000 @@"
+        for i in range(100000):
+            lines_read.append(i)
+            yield f"+{i},{i * 2}"
+
+    diff = parse_unified_diff(huge_diff(), Diff(max_file_lines=1000000, max_file_bytes=1000000, max_total_bytes=1000))
+    assert len(lines_read) < 200
+    assert diff.truncated
+    assert diff.size <= 1000
@@ -0,0 +1,138 @@
+def _use_fake_server(server, monkeypatch, tmp_path):
+    from git_bob._utilities import Config
+    from git_bob._file_cache import FileCache
+    from git_bob._rate_limit import RateLimitScheduler
+    from git_bob._client_pool import forget_repository_handles
+    from git_bob import _github_utilities
+
+    for key, value in server.environment().items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.setenv("GIT_BOB_CACHE_DIR", "")
+    monkeypatch.setenv("GIT_BOB_WRITE_INTERVAL", "0")
+    monkeypatch.setattr(Config, "git_server_url", server.url + "/")
+    monkeypatch.setattr(_github_utilities, "_issue_conversations", {})
+    monkeypatch.chdir(tmp_path)
+    FileCache().clear()
+    RateLimitScheduler().clear()
+    RateLimitScheduler().sleep = lambda seconds: None
+    forget_repository_handles()
+
+
+def test_fake_github(tmp_path, monkeypatch):
+    from git_bob._fake_server import FakeServer
+    from git_bob import _github_utilities as github
+
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        repository = server.add_repository("someone/something", {"README.md": "# Hello\n", "src/code.py": "print(1)\n"})
+        issue = repository.add_issue("Greeting", "Please say hello")
+        repository.add_comment(issue, "In English, please", author="someone-else")
+
+        assert "Comment by someone-else:\nIn English, please" in github.get_conversation_on_issue("someone/something", issue)
+        assert github.get_most_recently_commented_issue("someone/something") == issue
+        assert github.list_repository_files("someone/something") == ["README.md", "src/code.py"]
+
+        branch = github.create_branch("someone/something")
+        github.write_file_in_branch("someone/something", branch, "README.md", "# Hello world\n")
+        github.rename_file_in_repository("someone/something", branch, "README.md", "docs/README.md")
+        github.send_pull_request("someone/something", branch, "main", "Say hello", "closes #1")
+
+        diff = github.get_diff_of_pull_request("someone/something", 2)
+        assert sorted([(f.path, f.status) for f in diff.files]) == [("README.md", "removed"), ("docs/README.md", "added")]
+        assert repository.read(branch, "docs/README.md") == b"# Hello world\n"
+        assert (tmp_path / "docs" / "README.md").read_text() == "# Hello world\n"
+
+        assert github.check_access_and_ask_for_approval("someone", "someone/something", issue)
+        assert not github.check_access_and_ask_for_approval("stranger", "someone/something", issue)
+        assert repository.issues[issue]["comments"][-1]["author"] == "git-bob"
+
+
+def test_github_bot_logins(tmp_path, monkeypatch):
+    from git_bob._fake_server import FakeServer
+    from git_bob import _github_utilities as github
+
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        monkeypatch.setenv("GIT_BOB_ACCESS_GROUPS", "bot")
+        repository = server.add_repository("someone/something", {"README.md": "# Hello\n"})
+        issue = repository.add_issue("Greeting", "Please say hello", author="github-actions[bot]")
+        repository.add_comment(issue, "git-bob comment", author="github-actions[bot]")
+
+        # the conversation is read using GraphQL, the logins are the same as in the REST API
+        assert github.get_issue_conversation("someone/something", issue)["author"] == "github-actions[bot]"
+        assert github.get_most_recent_comment_on_issue("someone/something", issue) == ("github-actions[bot]", "git-bob comment")
+        assert github.check_access_and_ask_for_approval("github-actions[bot]", "someone/something", issue)
+
+
+def test_fake_gitlab(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+    from git_bob._fake_server import FakeServer
+    from git_bob import _gitlab_utilities as gitlab
+
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        repository = server.add_repository("someone/something", {"README.md": "# Hello\n", "data.bin": b"\0\1"})
+        issue = repository.add_issue("Greeting", "Please say hello")
+        repository.add_comment(issue, "In English, please", author="someone-else")
+
+        assert gitlab.get_most_recent_comment_on_issue("someone/something", issue) == ("someone-else", "In English, please")
+        assert gitlab.get_most_recently_commented_issue("someone/something") == issue
+        # comments before the given time are not considered, then the most recently updated issue is returned
+        other_issue = repository.add_issue("Farewell", "Please say goodbye")
+        since = datetime.fromisoformat(repository.issues[other_issue]["created_at"].replace("Z", "+00:00"))
+        assert gitlab.get_most_recently_commented_issue("someone/something", since=since - timedelta(seconds=5)) == issue
+        assert gitlab.get_most_recently_commented_issue("someone/something", since=since) == other_issue
+
+        branch = gitlab.create_branch("someone/something")
+        gitlab.write_file_in_branch("someone/something", branch, "README.md", "# Hello world\n")
+        gitlab.copy_file_in_repository("someone/something", branch, "data.bin", "copy.bin")
+        gitlab.send_pull_request("someone/something", branch, "main", "Say hello", "closes #1")
+
+        diff = gitlab.get_diff_of_pull_request("someone/something", 1)
+        assert [(f.path, f.status, f.binary) for f in diff.files] == [("README.md", "modified", False), ("copy.bin", "added", True)]
+        assert repository.read(branch, "copy.bin") == b"\0\1"
+
+
+def test_fake_server_rate_limits(tmp_path, monkeypatch):
+    import time
+    from functools import partial
+    from git_bob._fake_server import FakeServer
+    from git_bob._rate_limit import RateLimitScheduler
+    from git_bob._concurrency import run_concurrently
+    from git_bob import _github_utilities as github
+
+    with FakeServer(latency=0.1, rate_limit=100) as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        files = {f"file{i}.txt": f"content {i}" for i in range(8)}
+        server.add_repository("someone/something", files)
+        github.get_repository_handle("someone/something")
+
+        # rejected requests are retried
+        server.inject_rate_limit(2, status=429, retry_after=1)
+        assert github.get_default_branch_name("someone/something") == "main"
+        assert "2 retries" in RateLimitScheduler().summary()
+        assert "of 100 remaining" in RateLimitScheduler().summary()
+
+        # independent requests overlap, hence take about as long as a single one
+        start = time.time()
+        contents = run_concurrently([partial(github.get_file_in_repository, "someone/something", "main", f) for f in files])
+        assert time.time() - start < 0.1 * len(files) / 2
+        assert [c.decode().decode() for c in contents] == list(files.values())
+
+
+def test_fake_gitlab_without_diffs_endpoint(tmp_path, monkeypatch):
+    from git_bob._fake_server import FakeServer
+    from git_bob import _gitlab_utilities as gitlab
+
+    # GitLab < 15.7 only provides all changes of a merge request at once
+    with FakeServer(gitlab_version=(15, 6)) as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        server.add_repository("someone/something", {"README.md": "# Hello\n"})
+
+        branch = gitlab.create_branch("someone/something")
+        gitlab.write_file_in_branch("someone/something", branch, "README.md", "# Hello world\n")
+        gitlab.send_pull_request("someone/something", branch, "main", "Say hello", "closes #1")
+
+        diff = gitlab.get_diff_of_pull_request("someone/something", 1)
+        assert [(f.path, f.status) for f in diff.files] == [("README.md", "modified")]
+        assert "+# Hello world" in str(diff)
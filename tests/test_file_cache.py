@@ -0,0 +1,68 @@
+def test_file_cache():
+    from git_bob._file_cache import FileCache, git_blob_sha
+
+    cache = FileCache()
+    cache.clear()
+    assert cache is FileCache()
+
+    assert cache.get("someone/something", "main", "README.md") == (False, None)
+    cache.put("someone/something", "main", "README.md", "# Hello")
+    known, file = cache.get("someone/something", "main", "README.md")
+    assert known
+    assert file.decode() == b"# Hello"
+    assert file.sha == git_blob_sha(b"# Hello")
+    assert cache.get("someone/something", "other-branch", "README.md") == (False, None)
+
+    cache.copy("someone/something", "main", "README.md", "docs/index.md")
+    cache.rename("someone/something", "main", "README.md", "README2.md")
+    assert cache.get("someone/something", "main", "README.md") == (True, None)
+    assert cache.get("someone/something", "main", "README2.md")[1].sha == file.sha
+    assert cache.get("someone/something", "main", "docs/index.md")[1].decoded_content == b"# Hello"
+    # content is stored once
+    assert len(cache._blobs) == 1
+
+    cache.put_missing("someone/something", "main", "README2.md")
+    cache.forget("someone/something", "main", "docs/index.md")
+    assert len(cache._blobs) == 0
+    cache.clear()
+
+
+def test_file_cache_apply_changeset():
+    from git_bob._file_cache import FileCache
+    from git_bob._changeset import Changeset
+
+    cache = FileCache()
+    cache.clear()
+    cache.put("someone/something", "main", "a.txt", "A")
+
+    changeset = Changeset("someone/something", "main")
+    changeset.rename("a.txt", "b.txt", "Rename a.txt")
+    changeset.copy("unknown.txt", "c.txt", "Copy unknown.txt")
+    changeset.write("d.txt", "D", "Create d.txt")
+    cache.put("someone/something", "main", "c.txt", "outdated")
+
+    cache.apply_changeset(changeset)
+    assert cache.get("someone/something", "main", "a.txt") == (True, None)
+    assert cache.get("someone/something", "main", "b.txt")[1].decoded_content == b"A"
+    assert cache.get("someone/something", "main", "c.txt") == (False, None)
+    assert cache.get("someone/something", "main", "d.txt")[1].decoded_content == b"D"
+    cache.clear()
+
+
+def test_file_cache_is_bounded():
+    from git_bob._file_cache import FileCache
+
+    cache = FileCache()
+    cache.clear()
+    cache.max_entries = 2
+    cache.put("someone/something", "main", "a.txt", "A")
+    cache.put("someone/something", "main", "b.txt", "B")
+    cache.get("someone/something", "main", "a.txt")
+    cache.put("someone/something", "main", "c.txt", "C")  # evicts b.txt, the least recently used
+    assert cache.get("someone/something", "main", "b.txt") == (False, None)
+    assert cache.get("someone/something", "main", "a.txt")[0]
+
+    cache.max_size = 5
+    cache.put("someone/something", "main", "big.txt", "0123456789")
+    assert list(cache._entries.keys()) == [("someone/something", "main", "big.txt")]
+    cache.clear()
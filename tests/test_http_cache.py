@@ -0,0 +1,124 @@
+def test_conditional_requests(tmp_path):
+    import threading
+    import requests
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from git_bob._http_cache import CachingHTTPAdapter
+
+    requests_received = []
+    dated_requests_received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_received.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("X-RateLimit-Remaining", "4999")
+                self.end_headers()
+                return
+            body = b'{"default_branch": "main"}'
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/repos/someone/something"
+
+    try:
+        adapter = CachingHTTPAdapter(str(tmp_path))
+        session = requests.Session()
+        session.mount("http://", adapter)
+
+        first = session.get(url)
+        second = session.get(url)
+    finally:
+        server.shutdown()
+
+    assert requests_received == [None, '"v1"']
+    assert first.json() == second.json() == {"default_branch": "main"}
+    assert second.status_code == 200
+    assert second.from_cache
+    assert second.headers["X-RateLimit-Remaining"] == "4999"
+    assert adapter.hits == 1
+
+
+def test_cache_across_tokens_and_eviction(tmp_path):
+    import os
+    import time
+    import threading
+    import requests
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from git_bob._http_cache import CachingHTTPAdapter
+
+    requests_received = []
+    dated_requests_received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.endswith("/dated"):
+                dated_requests_received.append((self.headers.get("Authorization"), self.headers.get("If-Modified-Since")))
+                if self.headers.get("If-Modified-Since") is not None:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = b'{"content": "dated"}'
+                self.send_response(200)
+                self.send_header("Last-Modified", "Sat, 17 Oct 2026 10:00:00 GMT")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            requests_received.append((self.headers.get("Authorization"), self.headers.get("If-None-Match")))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b'{"default_branch": "main"}'
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Vary", "Accept, Authorization")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/repos/someone/something"
+
+    try:
+        # every CI job gets a new token, the responses of previous jobs are reused nevertheless
+        for token in ["token 1", "token 2"]:
+            session = requests.Session()
+            session.mount("http://", CachingHTTPAdapter(str(tmp_path)))
+            assert session.get(url, headers={"Authorization": token}).json() == {"default_branch": "main"}
+        # a different format
+        session.get(url, headers={"Authorization": "token 2", "Accept": "application/vnd.github.raw"})
+
+        # servers may confirm responses without ETag based on the time alone, these are not shared between tokens
+        for token in ["token 1", "token 2", "token 1"]:
+            assert session.get(url + "/dated", headers={"Authorization": token}).json() == {"content": "dated"}
+    finally:
+        server.shutdown()
+
+    assert requests_received == [("token 1", None), ("token 2", '"v1"'), ("token 2", None)]
+    assert dated_requests_received == [("token 1", None), ("token 2", None),
+                                       ("token 1", "Sat, 17 Oct 2026 10:00:00 GMT")]
+
+    # responses which were not used for a while are evicted, then the least recently used ones
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 4
+    old = time.time() - 3600
+    os.utime(tmp_path / files[0], (old, old))
+    CachingHTTPAdapter(str(tmp_path), max_age=60)
+    assert sorted(os.listdir(tmp_path)) == files[1:]
+    CachingHTTPAdapter(str(tmp_path), max_size_mb=0)
+    assert os.listdir(tmp_path) == []
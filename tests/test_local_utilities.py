@@ -0,0 +1,64 @@
+def _create_checkout(folder):
+    import subprocess
+
+    def git(*args):
+        subprocess.run(["git", *args], cwd=folder, check=True, capture_output=True)
+
+    git("init", "-q")
+    (folder / "docs").mkdir()
+    (folder / "README.md").write_text("# Hello world")
+    (folder / "docs" / "image.png").write_bytes(b"\x89PNG\x00\x01")
+    git("add", "-A")
+    git("-c", "user.name=test", "-c", "user.email=test@test", "commit", "-q", "-m", "initial")
+    git("remote", "add", "origin", "https://github.com/someone/something.git")
+    git("update-ref", "refs/remotes/origin/main", "HEAD")
+
+
+def test_read_from_local_checkout(tmp_path, monkeypatch):
+    from git_bob import _local_utilities as lu
+    _create_checkout(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    assert lu.list_repository_files("someone/something", "main") == ["README.md", "docs/image.png"]
+    assert lu.list_repository_files("someone/something", "main", file_patterns=[".png"]) == ["docs/image.png"]
+    assert lu.check_if_file_exists("someone/something", "main", "README.md")
+    assert not lu.check_if_file_exists("someone/something", "main", "docs")
+    assert lu.get_repository_file_contents("someone/something", "main", ["README.md"]) == {"README.md": "# Hello world"}
+    assert lu.get_file_in_repository("someone/something", "main", "docs/image.png)").decoded_content == b"\x89PNG\x00\x01"
+
+
+def test_modified_branches_are_not_read_locally(tmp_path, monkeypatch):
+    from git_bob import _local_utilities as lu
+    _create_checkout(tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    assert lu._resolve_commit("someone/something", "main") is not None
+    assert lu._resolve_commit("someone/something", "not-fetched") is None
+    assert lu._resolve_commit("someone/other-repository", "main") is None
+
+    lu._mark_modified("someone/something", "main")
+    assert lu._resolve_commit("someone/something", "main") is None
+
+
+def test_default_branch_is_resolved_once(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from git_bob import _local_utilities as lu
+    _create_checkout(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    lu.forget_local_state()
+
+    requests = []
+
+    def get_default_branch_name(repository):
+        requests.append(repository)
+        return "main"
+
+    monkeypatch.setattr(lu, "_remote", lambda: SimpleNamespace(get_default_branch_name=get_default_branch_name))
+
+    assert lu.get_repository_file_contents("someone/something", None, ["README.md"]) == {"README.md": "# Hello world"}
+    assert lu.check_if_file_exists("someone/something", None, "README.md")
+    assert requests == ["someone/something"]
+
+    lu.forget_local_state()
+    assert lu._resolve_commit("someone/something", None) is not None
+    assert requests == ["someone/something", "someone/something"]
@@ -0,0 +1,50 @@
+def test_prompt_cache(tmp_path):
+    from functools import partial
+    from git_bob._prompt_cache import PromptCache, cached_prompt_handler, bypass_prompt_cache
+    from git_bob._concurrency import run_concurrently
+
+    calls = []
+
+    def prompt_fake(message, model="fake-1", image=None):
+        calls.append((message, model))
+        return f"response {len(calls)}"
+
+    cache = PromptCache(tmp_path / "prompts.sqlite")
+    prompt = cached_prompt_handler(prompt_fake, cache=cache)
+
+    assert prompt("Hello", model="fake-1") == "response 1"
+    assert prompt("Hello", model="fake-1") == "response 1"
+    assert prompt("Hello") == "response 1"  # same as the default model
+    assert prompt("Hello", model="fake-2") == "response 2"
+    assert prompt("Hello", image=b"\x89PNG") == "response 3"
+    with bypass_prompt_cache():
+        assert prompt("Hello") == "response 4"
+        # also in workers, e.g. describing images concurrently
+        assert run_concurrently([partial(prompt, "Hello")]) == ["response 5"]
+    assert len(calls) == 5
+    assert (cache.hits, cache.misses, cache.bypassed) == (2, 3, 2)
+    assert "2 hits (40%)" in cache.summary()
+
+    # the responses are stored on disk, e.g. for the next run
+    prompt = cached_prompt_handler(prompt_fake, cache=PromptCache(tmp_path / "prompts.sqlite"))
+    assert prompt("Hello", model="fake-2") == "response 2"
+    assert len(calls) == 5
+
+
+def test_prompt_cache_eviction(tmp_path):
+    import time
+    from git_bob._prompt_cache import PromptCache
+
+    cache = PromptCache(tmp_path / "prompts.sqlite", max_size_mb=10 / 1024 / 1024)
+    cache.put("a", "12345")
+    time.sleep(0.01)
+    cache.put("b", "12345")
+    cache.get("a")  # a is used more recently than b now
+    time.sleep(0.01)
+    cache.put("c", "12345")
+    assert cache.get("a") == "12345"
+    assert cache.get("b") is None
+    assert cache.get("c") == "12345"
+
+    expired = PromptCache(tmp_path / "prompts.sqlite", ttl=0)
+    assert expired.get("a") is None
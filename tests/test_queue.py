@@ -0,0 +1,50 @@
+def test_event_queue_serializes_issues(tmp_path):
+    from git_bob._queue import EventQueue, issue_key
+
+    queue = EventQueue(tmp_path / "events.sqlite", debounce=0, max_concurrency=2)
+    first = queue.enqueue(issue_key("someone/something", 1), {"text": "git-bob solve"})
+    second = queue.enqueue(issue_key("someone/something", 1), {"text": "git-bob comment"})
+    other = queue.enqueue(issue_key("someone/something", 2), {"text": "git-bob comment"})
+
+    # the second event on issue 1 waits for the first one, issue 2 runs in parallel
+    assert queue.claim(second) is None
+    assert queue.claim()["id"] == first
+    assert queue.claim(second) is None
+    assert queue.claim()["id"] == other
+    assert queue.claim() is None
+
+    queue.complete(first)
+    event = queue.claim(second)
+    assert event["payload"] == {"text": "git-bob comment"}
+    assert queue.counts() == {"done": 1, "running": 2}
+
+
+def test_event_queue_debounces(tmp_path):
+    from git_bob._queue import EventQueue
+
+    queue = EventQueue(tmp_path / "events.sqlite", debounce=3600, max_concurrency=1)
+    first = queue.enqueue("someone/something#1", {"text": "git-bob solve"})
+    second = queue.enqueue("someone/something#1", {"text": "git-bob solve"})
+
+    # the identical event is superseded, the newer one waits for the debounce time
+    assert queue.get(first)["status"] == "superseded"
+    assert not queue.wait_for_turn(first)
+    assert queue.claim() is None
+
+    queue.debounce = 0
+    third = queue.enqueue("someone/something#1", {"text": "git-bob solve"})
+    assert queue.get(second)["status"] == "superseded"
+    assert queue.wait_for_turn(third)
+
+
+def test_event_queue_recovers_interrupted_events(tmp_path):
+    from git_bob._queue import EventQueue
+
+    queue = EventQueue(tmp_path / "events.sqlite", debounce=0, lease=-1)
+    event = queue.enqueue("someone/something#1", {})
+    assert queue.claim()["id"] == event
+
+    # the lease of the running event is over, hence it's started again, and given up after the second attempt
+    assert queue.claim()["id"] == event
+    assert queue.claim() is None
+    assert queue.get(event)["status"] == "failed"
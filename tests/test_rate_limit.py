@@ -0,0 +1,87 @@
+class _Response:
+    def __init__(self, status_code, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+    def close(self):
+        pass
+
+
+def test_retry_after_secondary_rate_limit():
+    from git_bob._rate_limit import RateLimitScheduler
+
+    scheduler = RateLimitScheduler()
+    scheduler.clear()
+    scheduler.write_interval = 0
+    waits = []
+    scheduler.sleep = waits.append
+
+    responses = [_Response(403, {"Retry-After": "3"}, "You have exceeded a secondary rate limit"),
+                 _Response(200, {"X-RateLimit-Remaining": "4990", "X-RateLimit-Limit": "5000"})]
+    response = scheduler.send("api.github.com", "POST", lambda: responses.pop(0))
+
+    assert response.status_code == 200
+    assert len(waits) == 1 and 3 <= waits[0] <= 4
+    assert "api.github.com: 2 requests (4990 of 5000 remaining), 1 retries" in scheduler.summary()
+    scheduler.clear()
+
+
+def test_no_retry_for_permission_errors():
+    from git_bob._rate_limit import RateLimitScheduler
+
+    scheduler = RateLimitScheduler()
+    scheduler.clear()
+    waits = []
+    scheduler.sleep = waits.append
+
+    response = scheduler.send("gitlab.com", "GET", lambda: _Response(403, {"RateLimit-Remaining": "100"}, "Forbidden"))
+    assert response.status_code == 403
+    assert waits == []
+    scheduler.clear()
+
+
+def test_pacing_when_budget_is_low():
+    import time
+    from git_bob._rate_limit import RateLimitScheduler
+
+    scheduler = RateLimitScheduler()
+    scheduler.clear()
+    waits = []
+    scheduler.sleep = waits.append
+
+    reset = str(time.time() + 100)
+    scheduler.send("api.github.com", "GET", lambda: _Response(200, {"X-RateLimit-Remaining": "10", "X-RateLimit-Limit": "5000", "X-RateLimit-Reset": reset}))
+    assert waits == []
+    scheduler.send("api.github.com", "GET", lambda: _Response(200, {}))
+    assert len(waits) == 1 and 9 < waits[0] <= 10
+    scheduler.clear()
+
+
+def test_pacing_is_limited_and_reads_are_not_paced_as_writes():
+    import time
+    from git_bob._rate_limit import RateLimitScheduler, is_write_request
+
+    assert is_write_request("PATCH", "/repos/someone/something/issues/1")
+    assert is_write_request("POST", "/repos/someone/something/issues/1/comments")
+    assert not is_write_request("POST", "/graphql")
+    assert not is_write_request("POST", "/someone/something.git/info/lfs/objects/batch")
+    assert not is_write_request("GET", "/repos/someone/something")
+
+    scheduler = RateLimitScheduler()
+    scheduler.clear()
+    scheduler.write_interval = 1
+    waits = []
+    scheduler.sleep = waits.append
+
+    # GraphQL queries are not spaced like writes
+    scheduler.send("api.github.com", "POST", lambda: _Response(200, {}), "/graphql")
+    scheduler.send("api.github.com", "POST", lambda: _Response(200, {}), "/graphql")
+    assert waits == []
+
+    # with a low budget long before the reset, the delay between requests is limited
+    reset = str(time.time() + 3000)
+    scheduler.send("api.github.com", "GET", lambda: _Response(200, {"X-RateLimit-Remaining": "2", "X-RateLimit-Limit": "5000", "X-RateLimit-Reset": reset}))
+    scheduler.send("api.github.com", "GET", lambda: _Response(200, {}))
+    assert waits == [scheduler.max_pacing]
+    scheduler.clear()
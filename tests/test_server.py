@@ -0,0 +1,134 @@
+def test_webhook_parsing():
+    import hmac
+    import hashlib
+    import json
+    import pytest
+    from git_bob._server import WebhookService
+
+    service = WebhookService(secret="secret")
+    payload = {"action": "created",
+               "comment": {"body": "git-bob comment on this", "user": {"login": "someone"}},
+               "issue": {"number": 3, "pull_request": {}},
+               "repository": {"full_name": "someone/something", "html_url": "https://github.com/someone/something"}}
+    body = json.dumps(payload).encode("utf-8")
+    signature = "sha256=" + hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+    headers = {"X-GitHub-Event": "issue_comment", "X-GitHub-Delivery": "1", "X-Hub-Signature-256": signature}
+
+    job = service.parse(headers, body)
+    assert job["host"] == "github"
+    assert job["server_url"] == "https://github.com/"
+    assert (job["repository"], job["issue"], job["is_pull_request"], job["user"]) == ("someone/something", 3, True, "someone")
+
+    # the same delivery again
+    assert service.parse(headers, body) is None
+
+    with pytest.raises(PermissionError):
+        service.parse(dict(headers, **{"X-Hub-Signature-256": "sha256=0"}), body)
+
+    payload = {"object_attributes": {"noteable_type": "Issue", "note": "Hi git-bob, please solve this"},
+               "issue": {"iid": 5}, "user": {"username": "someone"},
+               "project": {"path_with_namespace": "group/project", "web_url": "https://gitlab.com/group/project"}}
+    job = service.parse({"X-Gitlab-Event": "Note Hook", "X-Gitlab-Token": "secret"}, json.dumps(payload).encode("utf-8"))
+    assert (job["host"], job["server_url"], job["issue"], job["is_pull_request"]) == ("gitlab", "https://gitlab.com/", 5, False)
+
+    # git-bob is not mentioned
+    payload["object_attributes"]["note"] = "Thanks!"
+    assert service.parse({"X-Gitlab-Event": "Note Hook", "X-Gitlab-Token": "secret"}, json.dumps(payload).encode("utf-8")) is None
+
+
+def test_webhook_service(tmp_path, monkeypatch):
+    import json
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+    from git_bob._fake_server import FakeServer
+    from git_bob._server import WebhookService
+    from git_bob._queue import EventQueue
+    from git_bob import _terminal
+    from test_fake_server import _use_fake_server
+
+    def prompt_fake(message, model="fake"):
+        return "[]" if "JSON list" in message else "Hello from the service"
+
+    monkeypatch.setattr(_terminal, "init_prompt_handlers", lambda: {"fake": prompt_fake})
+    monkeypatch.setenv("GIT_BOB_LLM_NAME", "fake:model")
+
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        repository = server.add_repository("someone/something", {"README.md": "# Hello\n"})
+        issue = repository.add_issue("Greeting", "Please say hello")
+        repository.add_comment(issue, "git-bob comment", author="someone")
+
+        queue = EventQueue(tmp_path / "events.sqlite", debounce=0)
+        assert not WebhookService(secret="", insecure=False).verify({}, b"{}")
+        with WebhookService(secret="", insecure=True, executor=ThreadPoolExecutor(max_workers=1), queue=queue) as service:
+            payload = {"action": "created",
+                       "comment": {"body": "git-bob comment", "user": {"login": "someone"}},
+                       "issue": {"number": issue},
+                       "repository": {"full_name": "someone/something",
+                                      "html_url": server.url + "/someone/something"}}
+            response = requests.post(service.url, data=json.dumps(payload),
+                                     headers={"X-GitHub-Event": "issue_comment", "X-GitHub-Delivery": "1"})
+            assert response.status_code == 202
+
+            response = requests.post(service.url, data=json.dumps(dict(payload, action="deleted")),
+                                     headers={"X-GitHub-Event": "issue_comment", "X-GitHub-Delivery": "2"})
+            assert response.json() == {"queued": False}
+            assert service.join(timeout=30)
+
+        assert service.statistics["completed"] == 1
+        assert service.statistics["ignored"] == 1
+        assert queue.counts() == {"done": 1}
+        comments = repository.issues[issue]["comments"]
+        assert comments[-1]["author"] == "git-bob"
+        assert "Hello from the service" in comments[-1]["body"]
+
+
+def test_handle_event_timeout_and_state(tmp_path, monkeypatch):
+    import time
+    from git_bob._fake_server import FakeServer
+    from git_bob._server import handle_event
+    from git_bob._file_cache import FileCache
+    from git_bob._changeset import start_changeset, get_changeset
+    from git_bob import _terminal, _github_utilities, _utilities
+    from test_fake_server import _use_fake_server
+
+    def prompt_fake(message, model="fake"):
+        return "Hello"
+
+    state = {}
+
+    def stubborn_trigger(repository, issue, prompt_function, base_branch):
+        # caches of the previous event were cleared
+        state["file_cache"] = FileCache().get(repository, base_branch, "README.md")[0]
+        state["conversations"] = len(_github_utilities._issue_conversations)
+        state["changeset"] = get_changeset(repository, "old-branch")
+        state["contributors"] = len(_utilities._contributors)
+        # handlers continue after errors, but not after the timeout
+        while True:
+            try:
+                time.sleep(0.1)
+            except Exception:
+                pass
+
+    monkeypatch.setattr(_terminal, "init_prompt_handlers", lambda: {"fake": prompt_fake})
+    monkeypatch.setattr(_terminal, "init_triggers", lambda: {"solve": stubborn_trigger})
+    monkeypatch.setenv("GIT_BOB_LLM_NAME", "fake:model")
+    monkeypatch.setenv("TIMEOUT_IN_SECONDS", "1")
+
+    with FakeServer() as server:
+        _use_fake_server(server, monkeypatch, tmp_path)
+        repository = server.add_repository("someone/something", {"README.md": "# Hello\n"})
+        issue = repository.add_issue("Greeting", "Please say hello")
+
+        # state of a previous event in the same process
+        FileCache().put("someone/something", "main", "README.md", b"# Old\n", "0" * 40)
+        _github_utilities._issue_conversations[("someone/something", issue)] = {"comments": []}
+        start_changeset("someone/something", "old-branch")
+        _utilities._contributors["https://github.com/someone/something"] = {"someone"}
+
+        job = {"host": "github", "server_url": server.url + "/", "repository": "someone/something", "issue": issue,
+               "is_pull_request": False, "user": "someone", "text": "git-bob solve"}
+        result = handle_event(job)
+
+    assert result["status"] == "timeout"
+    assert state == {"file_cache": False, "conversations": 0, "changeset": None, "contributors": 0}
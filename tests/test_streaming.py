@@ -0,0 +1,89 @@
+def test_streaming_content(tmp_path):
+    import os
+    from git_bob._streaming import StreamingContent, active_checkpoints
+
+    checkpoint = str(tmp_path / "response.partial")
+    stream = StreamingContent(checkpoint, checkpoint_interval=0)
+
+    assert stream.feed("<original_part>\na = 1\n</orig") == []
+    assert stream.feed("inal_part>\n<new_part>\na = 2\n</new_part>\n<original_part>") == [("a = 1", "a = 2")]
+    # partial output is checkpointed while the response arrives
+    with open(checkpoint) as file:
+        assert file.read() == stream.text
+    assert checkpoint in active_checkpoints()
+
+    stream.feed("b = 1</original_part><new_part>b = 3</new_part>\nChanged a and b")
+    assert stream.replacements == [("a = 1", "a = 2"), ("b = 1", "b = 3")]
+    assert stream.text.endswith("Changed a and b")
+
+    stream.done()
+    assert not os.path.exists(checkpoint)
+    assert checkpoint not in active_checkpoints()
+
+
+def test_split_content_and_summary_streamed():
+    from git_bob._utilities import split_content_and_summary
+
+    chunks = ["```python\nprint(", "'hello')\n", "```\nPrint hello"]
+    assert split_content_and_summary(iter(chunks)) == split_content_and_summary("".join(chunks))
+
+
+def test_stream_prompt(tmp_path):
+    from functools import partial
+    from git_bob._endpoints import stream_prompt
+    from git_bob._prompt_cache import PromptCache, cached_prompt_handler
+
+    # handlers without streaming variant respond in one chunk
+    def prompt_fake(message, model="fake-1", image=None):
+        return f"{model}: {message}"
+    assert list(stream_prompt(partial(prompt_fake, model="fake-2"), "Hi")) == ["fake-2: Hi"]
+
+    calls = []
+
+    def stream_fake(message, model="fake-1", image=None):
+        calls.append(model)
+        yield from [model, ": ", message]
+    prompt_fake.stream = stream_fake
+    assert list(stream_prompt(partial(prompt_fake, model="fake-2"), "Hi")) == ["fake-2", ": ", "Hi"]
+
+    # complete streamed responses are cached
+    prompt = cached_prompt_handler(prompt_fake, cache=PromptCache(tmp_path / "prompts.sqlite"))
+    assert list(stream_prompt(partial(prompt, model="fake-3"), "Hi")) == ["fake-3", ": ", "Hi"]
+    assert list(stream_prompt(partial(prompt, model="fake-3"), "Hi")) == ["fake-3: Hi"]
+    assert prompt("Hi", model="fake-3") == "fake-3: Hi"
+    assert calls == ["fake-2", "fake-3"]
+
+
+def test_prompt_openai_streams_the_same_response(monkeypatch):
+    import warnings
+    from types import SimpleNamespace
+    from git_bob import _client_pool
+    from git_bob._endpoints import prompt_openai, stream_openai
+
+    # a long response, which is continued, and repeats the code fence in the continuation
+    rounds = [(["```python\n", "a = 1\n"], "length"), (["```py", "thon\nb = 2\n```\n", "Set a and b"], "stop")]
+
+    class FakeClient:
+        def __init__(self):
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+            self.requests = 0
+
+        def create(self, stream=False, **kwargs):
+            chunks, finish_reason = rounds[self.requests % len(rounds)]
+            self.requests += 1
+            if not stream:
+                message = SimpleNamespace(content="".join(chunks))
+                return SimpleNamespace(usage=None, choices=[SimpleNamespace(finish_reason=finish_reason, message=message)])
+            return iter([SimpleNamespace(usage=None, choices=[SimpleNamespace(
+                finish_reason=finish_reason if i == len(chunks) - 1 else None, delta=SimpleNamespace(content=chunk))])
+                for i, chunk in enumerate(chunks)])
+
+    client = FakeClient()
+    monkeypatch.setattr(_client_pool, "get_openai_client", lambda **kwargs: client)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        chunks = list(stream_openai("Hello"))
+        response = prompt_openai("Hello")
+
+    assert len(chunks) > 2
+    assert "".join(chunks) == response == "```python\na = 1\n\nb = 2\n```\nSet a and b"
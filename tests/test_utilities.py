@@ -140,6 +140,18 @@ Just tagging strangers: @anyoneelse and friends: @haesleinhuepf
 
 
 
+
+
+def test_clean_output_restores_bot_tags(monkeypatch):
+    from git_bob import _utilities
+    from git_bob._utilities import Config, clean_output
+
+    monkeypatch.setitem(_utilities._contributors, Config.git_server_url + "someone/something",
+                        {"someone", "dependabot[bot]"})
+    result = clean_output("someone/something", "Thanks @someone and @dependabot[bot], but not @stranger")
+
+    assert "@someone and @dependabot[bot]" in result
+    assert "@stranger" not in result
 def test_clean_output2():
     from git_bob._utilities import Config
     import git_bob._github_utilities as gu
@@ -263,3 +275,280 @@ def test_read_local_files_in_discussion():
     modified_discussion = modify_discussion(discussion)
     assert "# git-bob ![](logo_32x32.png)" in modified_discussion
 
+
+
+def test_clean_output_restores_contributor_tags(tmp_path, monkeypatch):
+    from git_bob import _utilities
+    from git_bob._utilities import clean_output, Config
+
+    class FakeUtilities:
+        calls = 0
+
+        @staticmethod
+        def get_contributors(repository):
+            FakeUtilities.calls += 1
+            return ["haesleinhuepf", "some.one"]
+
+    monkeypatch.setenv("GIT_BOB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "git_utilities", FakeUtilities)
+    monkeypatch.setattr(_utilities, "_contributors", {})
+
+    text = "Thanks @haesleinhuepf, @some.one. and @haesleinhuepfx!\n```python\n@decorator\n```"
+    result = clean_output("someone/fake-repository", text)
+    assert result == "Thanks @haesleinhuepf, @some.one. and @ haesleinhuepfx!\n```python\n@decorator\n```"
+
+    # contributors are determined once per run and persisted between runs
+    clean_output("someone/fake-repository", text)
+    monkeypatch.setattr(_utilities, "_contributors", {})
+    clean_output("someone/fake-repository", text)
+    assert FakeUtilities.calls == 1
+
+
+def test_cached_access_decision(tmp_path, monkeypatch):
+    from git_bob import _utilities
+    from git_bob._utilities import cached_access_decision
+
+    monkeypatch.setenv("GIT_BOB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(_utilities, "_access_decisions", {})
+    requests = []
+
+    def ask_server():
+        requests.append(1)
+        return True
+
+    assert cached_access_decision("someone/something", "someone", ask_server)
+    assert cached_access_decision("someone/something", "someone", ask_server)
+    assert len(requests) == 1
+
+    # decisions are not stored on disk, the next run asks again, e.g. after access was revoked
+    monkeypatch.setattr(_utilities, "_access_decisions", {})
+    assert cached_access_decision("someone/something", "someone", ask_server)
+    assert len(requests) == 2
+    assert not (tmp_path / "access").exists()
+
+    monkeypatch.setenv("GIT_BOB_ACCESS_CACHE_TTL", "0")
+    assert cached_access_decision("someone/something", "someone", ask_server)
+    assert len(requests) == 3
+
+
+def test_download_file_resumes(tmp_path):
+    import hashlib
+    import threading
+    import pytest
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from git_bob._utilities import download_file
+
+    content = bytes(range(256)) * 1000
+    ranges_received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            ranges_received.append((self.headers.get("Range"), self.headers.get("If-Range")))
+            start = 0
+            if self.headers.get("Range") is not None and self.headers.get("If-Range") == '"v1"':
+                start = int(self.headers["Range"][len("bytes="):-1])
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+            else:
+                self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(content) - start))
+            self.end_headers()
+            self.wfile.write(content[start:])
+
+        def log_message(self, *args):
+            pass
+
+    def interrupted_download(path, validator):
+        # a download interrupted by a previous run, or a partial file of unknown origin
+        with open(path + ".part", "wb") as file:
+            file.write(content[:100000] if validator != '"v0"' else content[::-1][:100000])
+        if validator is not None:
+            with open(path + ".part.validator", "w") as file:
+                file.write(validator)
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/data.bin"
+    expected_sha256 = hashlib.sha256(content).hexdigest()
+
+    try:
+        for name, validator in [("resumed.bin", '"v1"'), ("changed.bin", '"v0"'), ("unknown.bin", None)]:
+            output_path = str(tmp_path / name)
+            interrupted_download(output_path, validator)
+            assert download_file(url, output_path, expected_sha256, chunk_size=4096) == expected_sha256
+            with open(output_path, "rb") as file:
+                assert file.read() == content
+            assert not (tmp_path / (name + ".part.validator")).exists()
+
+        with pytest.raises(ValueError):
+            download_file(url, str(tmp_path / "other.bin"), "0" * 64)
+    finally:
+        server.shutdown()
+
+    assert ranges_received == [("bytes=100000-", '"v1"'), ("bytes=100000-", '"v0"'), (None, None), (None, None)]
+    assert not (tmp_path / "other.bin").exists()
+    assert not (tmp_path / "other.bin.part").exists()
+
+
+def test_lfs_gitattributes():
+    from git_bob._lfs import lfs_gitattributes, lfs_pointer
+
+    gitattributes = lfs_gitattributes("*.png binary", "data/my file.tif")
+    assert gitattributes == "*.png binary\ndata/my[[:space:]]file.tif filter=lfs diff=lfs merge=lfs -text\n"
+    assert lfs_gitattributes(gitattributes, "data/my file.tif") is None
+    assert lfs_pointer("abc", 3) == "version https://git-lfs.github.com/spec/v1\noid sha256:abc\nsize 3\n"
+
+
+
+
+def test_upload_to_lfs_is_rate_limited(tmp_path, monkeypatch):
+    import json
+    import threading
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from git_bob._lfs import upload_to_lfs, parse_lfs_pointer
+    from git_bob._rate_limit import RateLimitScheduler
+
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            received.append(("POST", self.path))
+            response = {}
+            if self.path.endswith("/info/lfs/objects/batch"):
+                lfs_object = json.loads(body)["objects"][0]
+                base_url = f"http://127.0.0.1:{self.server.server_port}"
+                lfs_object["actions"] = {"upload": {"href": base_url + "/upload"}, "verify": {"href": base_url + "/verify"}}
+                response = {"objects": [lfs_object]}
+            self._respond(response)
+
+        def do_PUT(self):
+            received.append(("PUT", self.path, self.rfile.read(int(self.headers["Content-Length"]))))
+            self._respond({})
+
+        def _respond(self, response):
+            body = json.dumps(response).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    monkeypatch.setenv("GIT_BOB_CACHE_DIR", str(tmp_path / "cache"))
+    scheduler = RateLimitScheduler()
+    scheduler.clear()
+    waits = []
+    scheduler.sleep = waits.append
+
+    (tmp_path / "data.bin").write_bytes(b"large file")
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        pointer = upload_to_lfs(f"http://127.0.0.1:{server.server_port}", "someone/something", "x-access-token",
+                                "secret", str(tmp_path / "data.bin"))
+        scheduler_summary = scheduler.summary()
+    finally:
+        server.shutdown()
+        scheduler.clear()
+
+    assert parse_lfs_pointer(pointer)[1] == len(b"large file")
+    assert received == [("POST", "/someone/something.git/info/lfs/objects/batch"), ("PUT", "/upload", b"large file"),
+                        ("POST", "/verify")]
+    # the requests were scheduled, only the upload and the verification are paced as writes
+    assert "127.0.0.1: 3 requests" in scheduler_summary
+    assert len(waits) <= 1
+def test_task_context():
+    from functools import partial
+    from git_bob._utilities import Config, task_context
+    from git_bob._logger import Log
+    from git_bob._concurrency import run_concurrently
+
+    def remark(text):
+        Config.remarks.append(text)
+        Log().log(text)
+
+    def handle(issue):
+        with task_context(issue=issue):
+            # worker threads of the task share its state
+            run_concurrently([partial(remark, f"#{issue} a"), partial(remark, f"#{issue} b")])
+            return Config.issue, sorted(Config.remarks), sorted(Log().get())
+
+    remarks = list(Config.remarks)
+    results = run_concurrently([partial(handle, 1), partial(handle, 2)], max_concurrency=2)
+
+    assert results == [(1, ["#1 a", "#1 b"], ["#1 a", "#1 b"]), (2, ["#2 a", "#2 b"], ["#2 a", "#2 b"])]
+    # outside of task contexts, the global configuration is unchanged
+    assert Config.remarks == remarks
+    assert not any([message.startswith("#1") for message in Log().get()])
+
+
+def test_download_source_file_verifies_lfs_objects(tmp_path, monkeypatch):
+    import hashlib
+    import os
+    import threading
+    import pytest
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    import git_bob._lfs
+    from git_bob._lfs import lfs_pointer, parse_lfs_pointer, lfs_media_url
+    from git_bob._utilities import download_source_file
+
+    content = bytes(range(256)) * 1000
+    oid = hashlib.sha256(content).hexdigest()
+    files = {"/raw/data.bin": lfs_pointer(oid, len(content)).encode("utf-8"), "/media/data.bin": content}
+    ranges_received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            ranges_received.append((self.path, self.headers.get("Range")))
+            data = files[self.path]
+            start = 0
+            if self.headers.get("Range") is not None:
+                start = int(self.headers["Range"][len("bytes="):-1])
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+            else:
+                self.send_response(200)
+            self.send_header("Last-Modified", "Sat, 17 Oct 2026 10:00:00 GMT")
+            self.send_header("Content-Length", str(len(data) - start))
+            self.end_headers()
+            self.wfile.write(data[start:])
+
+        def log_message(self, *args):
+            pass
+
+    assert parse_lfs_pointer(files["/raw/data.bin"]) == (oid, len(content))
+    assert parse_lfs_pointer(content) is None
+    assert lfs_media_url("https://raw.githubusercontent.com/o/r/main/data.bin") == \
+           "https://media.githubusercontent.com/media/o/r/main/data.bin"
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setenv("GIT_BOB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(git_bob._lfs, "lfs_media_url", lambda url: url.replace("/raw/", "/media/"))
+
+    try:
+        # a download interrupted by a previous run is found in the cache directory
+        output_path, _ = download_source_file(base_url + "/raw/data.bin")
+        os.remove(output_path)
+        with open(output_path + ".part", "wb") as file:
+            file.write(content[:100000])
+        with open(output_path + ".part.validator", "w") as file:
+            file.write("Sat, 17 Oct 2026 10:00:00 GMT")
+        ranges_received.clear()
+
+        output_path, downloaded_oid = download_source_file(base_url + "/raw/data.bin")
+
+        files["/media/data.bin"] = content[::-1]
+        os.remove(output_path)
+        with pytest.raises(ValueError):
+            download_source_file(base_url + "/raw/data.bin")
+    finally:
+        server.shutdown()
+
+    assert downloaded_oid == oid
+    assert os.path.dirname(output_path) == str(tmp_path / "downloads")
+    assert ranges_received[:2] == [("/raw/data.bin", None), ("/media/data.bin", "bytes=100000-")]